@@ -0,0 +1,317 @@
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def _merge_top_k(
+    ids: np.ndarray, sims: np.ndarray, new_ids: np.ndarray, new_sims: np.ndarray, k: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Merge two per-row candidate lists and keep the ``k`` most similar."""
+    all_ids = np.concatenate([ids, new_ids], axis=1)
+    all_sims = np.concatenate([sims, new_sims], axis=1)
+    if all_sims.shape[1] > k:
+        part = np.argpartition(-all_sims, k - 1, axis=1)[:, :k]
+        all_ids = np.take_along_axis(all_ids, part, axis=1)
+        all_sims = np.take_along_axis(all_sims, part, axis=1)
+    order = np.argsort(-all_sims, axis=1, kind="stable")
+    return np.take_along_axis(all_ids, order, axis=1), np.take_along_axis(all_sims, order, axis=1)
+
+
+def exact_search(
+    vectors: np.ndarray, queries: np.ndarray, k: int = 10, block_size: int = 4096
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Brute-force cosine top-k; returns ``(row_indices, similarities)``."""
+    X = _normalize(vectors)
+    Q = _normalize(queries)
+    k = min(k, X.shape[0])
+    rows = np.full((Q.shape[0], 0), -1, dtype=np.int64)
+    sims = np.zeros((Q.shape[0], 0), dtype=np.float32)
+    for start in range(0, X.shape[0], block_size):
+        block = Q @ X[start : start + block_size].T
+        block_rows = np.broadcast_to(
+            np.arange(start, start + block.shape[1], dtype=np.int64), block.shape
+        )
+        rows, sims = _merge_top_k(rows, sims, block_rows, block, k)
+    return rows, sims
+
+
+def ann_index_path(summary_path: Path) -> Path:
+    """Directory of the ANN index stored next to ``summary_path``."""
+    summary_path = Path(summary_path)
+    return summary_path.with_name(summary_path.stem + ".ann")
+
+
+class IVFFlatIndex:
+    """Inverted-file index over L2-normalised vectors for cosine top-k search.
+
+    Vectors are bucketed by a k-means coarse quantizer with ``n_lists`` cells
+    and stored contiguously per cell, so a query only scans the cells of its
+    ``n_probe`` closest centroids. Inputs with fewer than ``exact_below`` rows
+    get a single cell, i.e. exact search. Results are reported as the ids the
+    index was built with (nugget ids in the pipeline).
+    """
+
+    def __init__(
+        self,
+        vectors: np.ndarray,
+        ids: np.ndarray,
+        centroids: np.ndarray,
+        offsets: np.ndarray,
+    ):
+        self.vectors = vectors
+        self.ids = ids
+        self.centroids = centroids
+        self.offsets = offsets
+
+    @classmethod
+    def build(
+        cls,
+        embeddings: np.ndarray,
+        ids: Optional[Sequence[int]] = None,
+        *,
+        n_lists: Optional[int] = None,
+        exact_below: int = 4096,
+        random_state: int = 0,
+    ) -> "IVFFlatIndex":
+        X = np.asarray(embeddings, dtype=np.float32)
+        n = X.shape[0]
+        ids = np.arange(n, dtype=np.int64) if ids is None else np.asarray(ids, dtype=np.int64)
+        if n == 0:
+            # No cells: every search returns padding.
+            dim = X.shape[1] if X.ndim == 2 else 0
+            empty = np.zeros((0, dim), dtype=np.float32)
+            return cls(empty, ids, empty, np.zeros(1, dtype=np.int64))
+        X = _normalize(X)
+        if n_lists is None:
+            n_lists = 1 if n < exact_below else max(1, int(np.sqrt(n)))
+        n_lists = max(1, min(n_lists, n))
+        if n_lists == 1:
+            assign = np.zeros(n, dtype=np.int64)
+            centroids = _normalize(X.mean(axis=0, keepdims=True))
+        else:
+            from sklearn.cluster import MiniBatchKMeans
+
+            quantizer = MiniBatchKMeans(n_clusters=n_lists, n_init=1, random_state=random_state)
+            assign = quantizer.fit_predict(X)
+            centroids = _normalize(quantizer.cluster_centers_)
+        order = np.argsort(assign, kind="stable")
+        counts = np.bincount(assign, minlength=n_lists)
+        offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        return cls(np.ascontiguousarray(X[order]), ids[order], centroids, offsets)
+
+    def __len__(self) -> int:
+        return int(self.ids.shape[0])
+
+    @property
+    def n_lists(self) -> int:
+        return int(self.centroids.shape[0])
+
+    def search(
+        self, queries: np.ndarray, k: int = 10, n_probe: int = 8, block_size: int = 1024
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Return ``(ids, similarities)`` of the top ``k`` matches per query.
+
+        Queries are processed in blocks of ``block_size``. Rows with fewer than
+        ``k`` candidates are padded with id ``-1`` and similarity ``-inf``.
+        """
+        if k < 0:
+            raise ValueError(f"k must not be negative, got {k}")
+        Q = _normalize(np.atleast_2d(queries))
+        ids = np.full((Q.shape[0], k), -1, dtype=np.int64)
+        sims = np.full((Q.shape[0], k), -np.inf, dtype=np.float32)
+        if k == 0 or not len(self):
+            return ids, sims
+        for start in range(0, Q.shape[0], block_size):
+            rows, block_sims = self._search_block(Q[start : start + block_size], k, n_probe)
+            found = rows >= 0
+            ids[start : start + len(rows), : rows.shape[1]] = np.where(
+                found, self.ids[np.maximum(rows, 0)], -1
+            )
+            sims[start : start + len(rows), : rows.shape[1]] = block_sims
+        return ids, sims
+
+    def _search_block(
+        self, Q: np.ndarray, k: int, n_probe: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        k = min(k, len(self))
+        best = np.full((Q.shape[0], k), -1, dtype=np.int64)
+        best_sims = np.full((Q.shape[0], k), -np.inf, dtype=np.float32)
+        n_probe = max(1, min(n_probe, self.n_lists))
+        if n_probe == self.n_lists:
+            probes = np.broadcast_to(np.arange(self.n_lists), (Q.shape[0], self.n_lists))
+        else:
+            probes = np.argpartition(-(Q @ self.centroids.T), n_probe - 1, axis=1)[:, :n_probe]
+        # Visit each probed cell once, together with every query that probes it.
+        cells = probes.ravel()
+        queries = np.repeat(np.arange(Q.shape[0]), probes.shape[1])
+        order = np.argsort(cells, kind="stable")
+        cells, queries = cells[order], queries[order]
+        bounds = np.flatnonzero(np.diff(cells)) + 1
+        for cell, qs in zip(cells[np.r_[0, bounds]], np.split(queries, bounds)):
+            start, stop = self.offsets[cell], self.offsets[cell + 1]
+            if start == stop:
+                continue
+            cell_sims = Q[qs] @ self.vectors[start:stop].T
+            cell_rows = np.broadcast_to(np.arange(start, stop, dtype=np.int64), cell_sims.shape)
+            best[qs], best_sims[qs] = _merge_top_k(best[qs], best_sims[qs], cell_rows, cell_sims, k)
+        return best, best_sims
+
+    def updated(
+        self,
+        ids: Sequence[int],
+        embeddings: np.ndarray,
+        remove_ids: Iterable[int] = (),
+        *,
+        rebuild_fraction: float = 0.2,
+        **build_options,
+    ) -> "IVFFlatIndex":
+        """Return a new index without ``remove_ids`` and with the given rows added.
+
+        Small updates keep the trained centroids and file new rows under their
+        nearest cell; once more than ``rebuild_fraction`` of the index changes
+        (or a single-cell index outgrows ``exact_below``) it is rebuilt.
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        if not len(self):
+            return IVFFlatIndex.build(embeddings, ids, **build_options)
+        embeddings = _normalize(
+            np.asarray(embeddings, dtype=np.float32).reshape(-1, self.vectors.shape[1])
+        )
+        drop = np.concatenate([np.fromiter(remove_ids, dtype=np.int64), ids])
+        keep = ~np.isin(self.ids, drop)
+        all_vectors = np.concatenate([np.asarray(self.vectors)[keep], embeddings])
+        all_ids = np.concatenate([np.asarray(self.ids)[keep], ids])
+        changed = len(ids) + int((~keep).sum())
+        outgrown = self.n_lists == 1 and len(all_ids) >= build_options.get("exact_below", 4096)
+        if outgrown or changed > rebuild_fraction * max(len(self), 1):
+            return IVFFlatIndex.build(all_vectors, all_ids, **build_options)
+        cells = np.repeat(np.arange(self.n_lists), np.diff(self.offsets))[keep]
+        if len(ids):
+            cells = np.concatenate([cells, np.argmax(embeddings @ self.centroids.T, axis=1)])
+        order = np.argsort(cells, kind="stable")
+        counts = np.bincount(cells, minlength=self.n_lists)
+        offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        return IVFFlatIndex(
+            np.ascontiguousarray(all_vectors[order]), all_ids[order], self.centroids, offsets
+        )
+
+    def save(self, path: Path) -> None:
+        """Write the index to the directory ``path``.
+
+        The files are written to a sibling directory that then replaces
+        ``path``, so a reader never loads files of two different versions.
+        Indexes already memory-mapped from ``path`` stay valid on POSIX.
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = Path(tempfile.mkdtemp(prefix=f".{path.name}.", dir=path.parent))
+        try:
+            self._write(tmp)
+            if path.exists():
+                old = Path(tempfile.mkdtemp(prefix=f".{path.name}.old.", dir=path.parent))
+                os.replace(path, old / path.name)
+                os.replace(tmp, path)
+                shutil.rmtree(old, ignore_errors=True)
+            else:
+                os.replace(tmp, path)
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    def _write(self, path: Path) -> None:
+        for name in ("vectors", "ids", "centroids", "offsets"):
+            np.save(path / f"{name}.npy", getattr(self, name))
+        with open(path / "index.json", "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "type": "ivf_flat",
+                    "metric": "cosine",
+                    "count": len(self),
+                    "dim": int(self.vectors.shape[1]),
+                    "n_lists": self.n_lists,
+                },
+                f,
+                indent=2,
+            )
+
+    @classmethod
+    def load(cls, path: Path, mmap: bool = True) -> "IVFFlatIndex":
+        """Load an index saved with :meth:`save`; vectors are memory-mapped."""
+        path = Path(path)
+        mode = "r" if mmap else None
+        return cls(
+            np.load(path / "vectors.npy", mmap_mode=mode),
+            np.load(path / "ids.npy", mmap_mode=mode),
+            np.load(path / "centroids.npy"),
+            np.load(path / "offsets.npy"),
+        )
+
+
+def benchmark(
+    index: IVFFlatIndex,
+    queries: np.ndarray,
+    k: int = 10,
+    n_probes: Sequence[int] = (1, 2, 4, 8, 16),
+) -> List[Dict[str, float]]:
+    """Measure recall@k and latency of ``index`` against brute-force search."""
+    start = time.perf_counter()
+    exact_rows, _ = exact_search(index.vectors, queries, k)
+    exact_time = time.perf_counter() - start
+    truth = index.ids[exact_rows]
+    n_q = len(queries)
+    results = [
+        {
+            "n_probe": "exact",
+            "recall": 1.0,
+            "ms_per_query": 1000 * exact_time / n_q,
+        }
+    ]
+    for n_probe in n_probes:
+        start = time.perf_counter()
+        ids, _ = index.search(queries, k, n_probe=n_probe)
+        elapsed = time.perf_counter() - start
+        hits = sum(len(set(a) & set(b)) for a, b in zip(ids.tolist(), truth.tolist()))
+        results.append(
+            {
+                "n_probe": n_probe,
+                "recall": hits / truth.size,
+                "ms_per_query": 1000 * elapsed / n_q,
+            }
+        )
+    return results
+
+
+if __name__ == "__main__":  # pragma: no cover - manual benchmark
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark IVFFlatIndex against brute force")
+    parser.add_argument("--n", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(args.clusters, args.dim))
+    data = centers[rng.integers(args.clusters, size=args.n)] + 0.5 * rng.normal(
+        size=(args.n, args.dim)
+    )
+    t0 = time.perf_counter()
+    idx = IVFFlatIndex.build(data)
+    print(f"built {idx.n_lists} lists over {len(idx)} vectors in {time.perf_counter() - t0:.1f}s")
+    for row in benchmark(idx, data[rng.choice(args.n, args.queries, replace=False)], args.k):
+        print(f"n_probe={row['n_probe']!s:>5}  recall={row['recall']:.3f}  {row['ms_per_query']:.3f} ms/query")
@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+
+@dataclass
+class ImportStats:
+    """Outcome of a bulk import."""
+
+    objects: int = 0
+    failed: int = 0
+    skipped: int = 0
+    deleted: int = 0
+    batches: int = 0
+    retries: int = 0
+    elapsed: float = 0.0
+    errors: List[str] = field(default_factory=list)
+
+    def as_metadata(self) -> Dict[str, Any]:
+        return {
+            "objects": self.objects,
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "deleted": self.deleted,
+            "batches": self.batches,
+            "retries": self.retries,
+            "elapsed": round(self.elapsed, 3),
+            "objects_per_sec": round(self.objects / self.elapsed, 1) if self.elapsed else None,
+            "errors": self.errors,
+        }
+
+
+class BulkImporter:
+    """Upload objects to Weaviate through the ``/v1/batch/objects`` endpoint.
+
+    Objects added with :meth:`add` are grouped into batches of ``batch_size``
+    and posted by up to ``concurrency`` threads. :meth:`add` blocks while that
+    many batches are in flight, so memory stays bounded. A batch that fails
+    as a whole (connection error, 429 or 5xx) is retried, as are the objects
+    the server reports as failed; retries wait ``backoff * 2 ** attempt``
+    seconds and give up after ``max_retries`` attempts.
+    """
+
+    max_errors = 20
+
+    def __init__(
+        self,
+        url: str,
+        *,
+        batch_size: int = 100,
+        concurrency: int = 4,
+        max_retries: int = 3,
+        backoff: float = 0.5,
+        timeout: float = 30.0,
+        headers: Optional[Dict[str, str]] = None,
+    ):
+        if batch_size < 1 or concurrency < 1:
+            raise ValueError("batch_size and concurrency must be positive")
+        self.endpoint = url.rstrip("/") + "/v1/batch/objects"
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.headers = {"Content-Type": "application/json", **(headers or {})}
+        self.stats = ImportStats()
+        self.failed_ids: set = set()
+        self._buffer: List[Dict[str, Any]] = []
+        self._pool = ThreadPoolExecutor(max_workers=concurrency)
+        self._slots = threading.Semaphore(concurrency)
+        self._futures: List[Future] = []
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+
+    def add(
+        self,
+        class_name: str,
+        properties: Dict[str, Any],
+        uuid: Optional[str] = None,
+        vector: Optional[List[float]] = None,
+    ) -> None:
+        obj: Dict[str, Any] = {"class": class_name, "properties": properties}
+        if uuid is not None:
+            obj["id"] = uuid
+        if vector is not None:
+            obj["vector"] = [float(x) for x in vector]
+        self._buffer.append(obj)
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Send the buffered objects as one batch."""
+        if not self._buffer:
+            return
+        batch, self._buffer = self._buffer, []
+        self._slots.acquire()
+        future = self._pool.submit(self._send, batch)
+        future.add_done_callback(lambda _: self._slots.release())
+        self._futures.append(future)
+
+    def delete(self, class_name: str, uuid: str) -> None:
+        """Delete one object; objects that are already gone count as deleted."""
+        self._slots.acquire()
+        future = self._pool.submit(self._delete, class_name, uuid)
+        future.add_done_callback(lambda _: self._slots.release())
+        self._futures.append(future)
+
+    def close(self) -> ImportStats:
+        """Flush, wait for all batches and return the import statistics."""
+        self.flush()
+        for future in self._futures:
+            future.result()
+        self._pool.shutdown()
+        self.stats.elapsed = time.perf_counter() - self._start
+        return self.stats
+
+    def _post(self, objects: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        body = json.dumps({"objects": objects}).encode("utf-8")
+        request = urllib.request.Request(self.endpoint, data=body, headers=self.headers)
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return json.loads(response.read() or b"[]")
+
+    def _delete(self, class_name: str, uuid: str) -> None:
+        url = self.endpoint[: -len("/batch/objects")] + f"/objects/{class_name}/{uuid}"
+        request = urllib.request.Request(url, headers=self.headers, method="DELETE")
+        error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                time.sleep(self.backoff * 2 ** (attempt - 1))
+            try:
+                urllib.request.urlopen(request, timeout=self.timeout).close()
+            except urllib.error.HTTPError as exc:
+                if exc.code == 404:
+                    break
+                error = f"HTTP {exc.code}: {exc.reason}"
+                continue
+            except (urllib.error.URLError, OSError) as exc:
+                error = str(exc)
+                continue
+            break
+        else:
+            with self._lock:
+                self.stats.failed += 1
+                self.failed_ids.add(uuid)
+                if error and len(self.stats.errors) < self.max_errors:
+                    self.stats.errors.append(error)
+            return
+        with self._lock:
+            self.stats.deleted += 1
+
+    @staticmethod
+    def _object_error(result: Dict[str, Any]) -> Optional[str]:
+        errors = (result.get("result") or {}).get("errors")
+        if not errors:
+            return None
+        return "; ".join(e.get("message", "") for e in errors.get("error", [])) or str(errors)
+
+    def _send(self, batch: List[Dict[str, Any]]) -> None:
+        pending = batch
+        error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                with self._lock:
+                    self.stats.retries += 1
+                time.sleep(self.backoff * 2 ** (attempt - 1))
+            try:
+                results = self._post(pending)
+            except urllib.error.HTTPError as exc:
+                error = f"HTTP {exc.code}: {exc.reason}"
+                if exc.code != 429 and exc.code < 500:
+                    break
+                continue
+            except (urllib.error.URLError, OSError) as exc:
+                error = str(exc)
+                continue
+            failed = []
+            for obj, result in zip(pending, results):
+                message = self._object_error(result)
+                if message is not None:
+                    failed.append(obj)
+                    error = message
+            with self._lock:
+                self.stats.objects += len(pending) - len(failed)
+                if pending is batch:
+                    self.stats.batches += 1
+            pending = failed
+            if not pending:
+                return
+        with self._lock:
+            self.stats.failed += len(pending)
+            self.failed_ids.update(obj["id"] for obj in pending if "id" in obj)
+            if error and len(self.stats.errors) < self.max_errors:
+                self.stats.errors.append(error)
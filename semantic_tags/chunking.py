@@ -1,18 +1,68 @@
+from __future__ import annotations
+
 import re
-from typing import Iterable, List
+from typing import TYPE_CHECKING, Callable, Iterable, List, Optional, Sequence
+
+if TYPE_CHECKING:  # numpy is only needed for semantic chunking
+    import numpy as np
 
 
 SENTENCE_RE = re.compile(r"(?<=[.!?]) +")
 
+CHUNKING = ("length", "semantic", "tokens")
+# Soft-break settings from the README's chunking rules.
+TOPIC_SHIFT_THRESHOLD = 0.75
+MIN_NUGGET_TOKENS = 20
+
+
+def split_sentences(text: str) -> List[str]:
+    """Split ``text`` at sentence-ending punctuation, dropping empty pieces."""
+    return [s for s in SENTENCE_RE.split(text) if s.strip()]
+
 
-def split_into_nuggets(text: str, max_tokens: int = 128) -> List[str]:
-    """Split raw text into semantically coherent nuggets."""
+def _split_long(
+    sentence: str, n_tokens: int, max_tokens: int, count_tokens: Callable[[List[str]], List[int]]
+) -> List[str]:
+    """Cut an over-long sentence into word windows of at most ``max_tokens``."""
+    words = sentence.split()
+    parts = min(len(words), -(-n_tokens // max_tokens))
+    if parts <= 1:
+        return [sentence]
+    step = -(-len(words) // parts)
+    pieces = [" ".join(words[i : i + step]) for i in range(0, len(words), step)]
+    out: List[str] = []
+    for piece, n in zip(pieces, count_tokens(pieces)):
+        out.extend(_split_long(piece, n, max_tokens, count_tokens) if n > max_tokens else [piece])
+    return out
+
+
+def split_into_nuggets(
+    text: str,
+    max_tokens: int = 128,
+    count_tokens: Optional[Callable[[List[str]], List[int]]] = None,
+) -> List[str]:
+    """Split raw text into semantically coherent nuggets.
+
+    Lengths are whitespace tokens unless ``count_tokens`` is given, which maps
+    a list of sentences to their model token counts in one call. Sentences
+    that alone exceed ``max_tokens`` are then cut into word windows, so no
+    nugget is truncated by the model.
+    """
     sentences = SENTENCE_RE.split(text)
+    if count_tokens is None:
+        counts = [len(sent.split()) for sent in sentences]
+    else:
+        units: List[str] = []
+        counts = []
+        for sent, n in zip(sentences, count_tokens(sentences)):
+            pieces = _split_long(sent, n, max_tokens, count_tokens) if n > max_tokens else [sent]
+            units.extend(pieces)
+            counts.extend(count_tokens(pieces) if len(pieces) > 1 else [n])
+        sentences = units
     nuggets = []
     current = []
     tokens = 0
-    for sent in sentences:
-        sent_tokens = len(sent.split())
+    for sent, sent_tokens in zip(sentences, counts):
         if tokens + sent_tokens > max_tokens and current:
             nuggets.append(" ".join(current))
             current = []
@@ -22,3 +72,73 @@ def split_into_nuggets(text: str, max_tokens: int = 128) -> List[str]:
     if current:
         nuggets.append(" ".join(current))
     return nuggets
+
+
+def _cosine(a: np.ndarray, b: np.ndarray) -> float:
+    import numpy as np
+
+    denom = float(np.linalg.norm(a) * np.linalg.norm(b))
+    return float(a @ b) / denom if denom else 0.0
+
+
+def semantic_segments(
+    vectors: np.ndarray,
+    lengths: Sequence[int],
+    max_tokens: int = 128,
+    threshold: float = TOPIC_SHIFT_THRESHOLD,
+    min_tokens: int = MIN_NUGGET_TOKENS,
+) -> List[List[int]]:
+    """Group consecutive sentences into nuggets by topic shift.
+
+    A sentence starts a new segment when adding it would exceed
+    ``max_tokens`` or when its cosine similarity to the running mean of the
+    current segment is ``threshold`` or less. Segments under ``min_tokens``
+    are then merged into the more similar neighbour if the result still fits
+    in ``max_tokens``. Returns lists of sentence indices.
+    """
+    segments: List[List[int]] = []
+    sums: List[np.ndarray] = []
+    tokens: List[int] = []
+    for i, vec in enumerate(vectors):
+        if (
+            not segments
+            or tokens[-1] + lengths[i] > max_tokens
+            or _cosine(vec, sums[-1]) <= threshold
+        ):
+            segments.append([i])
+            sums.append(vec.copy())
+            tokens.append(lengths[i])
+        else:
+            segments[-1].append(i)
+            sums[-1] = sums[-1] + vec
+            tokens[-1] += lengths[i]
+
+    s = 0
+    while s < len(segments):
+        if tokens[s] >= min_tokens or len(segments) == 1:
+            s += 1
+            continue
+        candidates = [
+            n for n in (s - 1, s + 1) if 0 <= n < len(segments) and tokens[n] + tokens[s] <= max_tokens
+        ]
+        if not candidates:
+            s += 1
+            continue
+        n = max(candidates, key=lambda c: _cosine(sums[c], sums[s]))
+        lo, hi = min(n, s), max(n, s)
+        segments[lo] = segments[lo] + segments[hi]
+        sums[lo] = sums[lo] + sums[hi]
+        tokens[lo] += tokens[hi]
+        del segments[hi], sums[hi], tokens[hi]
+        # Re-check the merged segment; it may still be too small.
+        s = lo
+    return segments
+
+
+def pool_vectors(vectors: np.ndarray, segments: Iterable[Sequence[int]]) -> np.ndarray:
+    """Mean-pool sentence ``vectors`` per segment and L2-normalize the result."""
+    import numpy as np
+
+    pooled = np.stack([vectors[list(seg)].mean(axis=0) for seg in segments]).astype(np.float32)
+    norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+    return pooled / np.where(norms == 0, 1, norms)
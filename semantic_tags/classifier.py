@@ -12,15 +12,10 @@ def train_tag_classifier(graph: TagGraph) -> Optional[Tuple[TfidfVectorizer, Log
     """
     texts: List[str] = []
     labels: List[str] = []
-    for node, data in graph.graph.nodes(data=True):
-        if data.get("type") == "nugget":
-            tag_neighbors = [
-                n for n in graph.graph.neighbors(node)
-                if graph.graph.nodes[n].get("type") == "tag"
-            ]
-            if tag_neighbors:
-                labels.append(tag_neighbors[0][4:])
-                texts.append(data["text"])
+    for nugget in graph.iter_nuggets():
+        if nugget.tags:
+            labels.append(nugget.tags[0])
+            texts.append(nugget.text)
     if not texts:
         return None
 
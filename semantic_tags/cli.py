@@ -1,9 +1,8 @@
 import argparse
 import os
+import sys
 from pathlib import Path
 
-from .pipeline import Pipeline
-from .weaviate_store import WeaviateStore
 from .config import (
     AVAILABLE_MODELS,
     load_config,
@@ -36,10 +35,162 @@ def main():
         help="Suggest additional tags using a heuristic or OpenAI",
     )
     parser.add_argument("--batch-size", type=int)
+    parser.add_argument(
+        "--k-strategy",
+        choices=["silhouette", "elbow"],
+        default="silhouette",
+        help="Criterion used to choose the number of clusters",
+    )
+    parser.add_argument(
+        "--clusterer",
+        choices=["kmeans", "hdbscan", "leiden", "louvain"],
+        default="kmeans",
+        help="Clustering backend; hdbscan, leiden and louvain do not need k",
+    )
+    parser.add_argument(
+        "--min-cooccurrence",
+        type=int,
+        default=1,
+        help="Minimum shared nuggets for a tag co-occurrence edge",
+    )
+    parser.add_argument(
+        "--cooccurrence-top-k",
+        type=int,
+        help="Keep only each tag's heaviest co-occurrence edges",
+    )
+    parser.add_argument(
+        "--graph-backend",
+        choices=["networkx", "compact"],
+        default="networkx",
+        help="Tag graph storage; compact uses columnar arrays for large corpora",
+    )
+    parser.add_argument("--k-budget", type=float, help="Seconds allowed for choosing k")
+    parser.add_argument("--k-jobs", type=int, default=1, help="Parallel fits while choosing k")
     parser.add_argument("--device", type=str)
-    parser.add_argument("--weaviate-url", type=str)
+    parser.add_argument(
+        "--backend",
+        choices=["torch", "onnx"],
+        default="torch",
+        help="Text embedding runtime; onnx runs an exported model through ONNX Runtime",
+    )
+    parser.add_argument(
+        "--quantize",
+        action="store_true",
+        help="With --backend onnx, use a dynamically int8-quantized export",
+    )
+    parser.add_argument(
+        "--embed-workers",
+        type=int,
+        default=1,
+        help="Encode text in this many processes, each with its own model copy",
+    )
+    parser.add_argument(
+        "--batching",
+        choices=["fixed", "length"],
+        default="fixed",
+        help="length: batch texts of similar token length under --token-budget",
+    )
+    parser.add_argument(
+        "--token-budget", type=int, default=4096, help="Padded tokens per batch with --batching length"
+    )
+    parser.add_argument(
+        "--dedupe",
+        choices=["off", "exact", "near"],
+        default="exact",
+        help="Embed duplicate chunks once: exact text matches, or also MinHash near duplicates",
+    )
+    parser.add_argument(
+        "--dedupe-threshold",
+        type=float,
+        default=0.8,
+        help="Estimated Jaccard similarity for --dedupe near",
+    )
+    parser.add_argument(
+        "--chunking",
+        choices=["length", "semantic", "tokens"],
+        default="length",
+        help="semantic: also break nuggets where the topic shifts, using sentence embeddings; "
+        "tokens: size nuggets to the model's sequence limit with its tokenizer",
+    )
+    parser.add_argument(
+        "--topic-shift-threshold",
+        type=float,
+        default=0.75,
+        help="Cosine similarity to the running mean at or below which --chunking semantic breaks",
+    )
+    parser.add_argument(
+        "--decode-workers", type=int, default=4, help="Threads decoding and downscaling images"
+    )
+    parser.add_argument(
+        "--no-image-dedupe",
+        action="store_true",
+        help="Encode every image even when perceptual hashes match",
+    )
+    parser.add_argument(
+        "--weaviate-url",
+        type=str,
+        help="Upload nuggets and tags to Weaviate; unchanged objects are only skipped "
+        "(and removed ones deleted) with --state-dir, which keeps the upload ledger",
+    )
+    parser.add_argument(
+        "--weaviate-batch-size", type=int, default=100, help="Objects per Weaviate batch request"
+    )
+    parser.add_argument(
+        "--weaviate-concurrency", type=int, default=4, help="Concurrent Weaviate batch requests"
+    )
+    parser.add_argument(
+        "--weaviate-retries", type=int, default=3, help="Retries for failed Weaviate objects"
+    )
+    parser.add_argument("--cache-dir", type=Path, help="Directory for the persistent embedding cache")
+    parser.add_argument("--cache-size", type=int, help="Maximum number of cached embeddings per model")
     parser.add_argument("--summary-out", type=Path)
-    parser.add_argument("--topic-model", choices=["fastopic", "bertopic"], help="Use a topic modelling backend")
+    parser.add_argument(
+        "--no-ann-index",
+        action="store_true",
+        help="Do not write the nearest-neighbour index next to the summary",
+    )
+    parser.add_argument(
+        "--include",
+        action="append",
+        metavar="GLOB",
+        help="Only ingest files matching this glob (repeatable)",
+    )
+    parser.add_argument(
+        "--exclude",
+        action="append",
+        metavar="GLOB",
+        help="Skip files matching this glob (repeatable)",
+    )
+    parser.add_argument("--max-file-size", type=int, help="Skip files larger than this many bytes")
+    parser.add_argument(
+        "--piece-chars",
+        type=int,
+        help="Read text files in pieces of about this many characters",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Processes used for chunking, diarization and emotion tagging",
+    )
+    parser.add_argument(
+        "--encoding-errors",
+        choices=["replace", "ignore", "strict"],
+        default="replace",
+        help="How to handle undecodable bytes in text files",
+    )
+    parser.add_argument(
+        "--state-dir",
+        type=Path,
+        help="Keep a file manifest and graph here and only reprocess changed files on later runs; "
+        "also required for Weaviate uploads to skip unchanged objects",
+    )
+    parser.add_argument(
+        "--topic-model",
+        choices=["ctfidf", "bertopic", "frequency", "fastopic"],
+        help="Cluster labelling with --infer-topics: class-based TF-IDF (default; bertopic "
+        "is an alias that warns, fastopic a deprecated one) or raw word frequency",
+    )
     parser.add_argument("--openai-key", type=str, help="API key for OpenAI features")
     parser.add_argument(
         "--train-classifier",
@@ -75,6 +226,10 @@ def main():
         return
     if args.weaviate_url is not None:
         config["weaviate_url"] = args.weaviate_url
+    if args.cache_dir is not None:
+        config["cache_dir"] = str(args.cache_dir)
+    if args.cache_size is not None:
+        config["cache_size"] = args.cache_size
 
     if args.show_config:
         print(f"Configuration path: {config_path}")
@@ -122,9 +277,21 @@ def main():
         if key:
             args.openai_key = key
 
+    if args.topic_model:
+        from .topic_inference import resolve_topic_method
+
+        # Resolved up front so alias warnings show before the long run starts.
+        args.topic_model = resolve_topic_method(args.topic_model)
+
     tag_list = args.tags.split(",") if args.tags else None
+    if args.quantize and args.backend != "onnx":
+        parser.error("--quantize requires --backend onnx")
     model_name = select_model(args.model) if args.model else config["default_model"]
     vision_model = select_model(args.vision_model) if args.vision_model else config.get("vision_model", config.get("default_vision_model", ""))
+    # Imported here so metadata-only commands do not load torch, sklearn, etc.
+    from .pipeline import Pipeline
+    from .weaviate_store import WeaviateStore
+
     pipeline = Pipeline(
         model_name=model_name,
         vision_model_name=vision_model,
@@ -133,24 +300,67 @@ def main():
         tags=tag_list,
         tag_file=args.tag_file,
         model_dir=Path(config["model_dir"]),
+        cache_dir=Path(config["cache_dir"]) if config.get("cache_dir") else None,
+        cache_size=config.get("cache_size", 100_000),
+        k_strategy=args.k_strategy,
+        k_budget=args.k_budget,
+        k_jobs=args.k_jobs,
+        clusterer=args.clusterer,
+        min_co_occurrence=args.min_cooccurrence,
+        co_occurrence_top_k=args.cooccurrence_top_k,
+        graph_backend=args.graph_backend,
+        piece_chars=args.piece_chars,
+        max_file_size=args.max_file_size,
+        include=args.include,
+        exclude=args.exclude,
+        encoding_errors=args.encoding_errors,
+        workers=args.workers,
+        ann_index=not args.no_ann_index,
+        embed_backend=args.backend,
+        quantize=args.quantize,
+        embed_workers=args.embed_workers,
+        batching=args.batching,
+        token_budget=args.token_budget,
+        dedupe=args.dedupe,
+        dedupe_threshold=args.dedupe_threshold,
+        chunking=args.chunking,
+        topic_shift_threshold=args.topic_shift_threshold,
+        decode_workers=args.decode_workers,
+        image_dedupe=not args.no_image_dedupe,
     )
 
     print(f"Using model {pipeline.model_name} on device {pipeline.device}")
     if config.get("weaviate_url"):
         print(f"Weaviate URL: {config['weaviate_url']}")
+        if not args.state_dir:
+            print("No --state-dir: every object is re-sent to Weaviate and stale ones are kept")
 
-    store = WeaviateStore(config["weaviate_url"]) if config.get("weaviate_url") else None
-
-    graph = pipeline.run(
-        args.path,
-        summary_path=args.summary_out,
-        store=store,
-        infer_topics=args.infer_topics,
-        topic_api_key=args.openai_key if args.infer_topics else None,
-        topic_model=args.topic_model,
+    store = (
+        WeaviateStore(
+            config["weaviate_url"],
+            batch_size=args.weaviate_batch_size,
+            concurrency=args.weaviate_concurrency,
+            max_retries=args.weaviate_retries,
+            ledger_path=args.state_dir / "weaviate_ledger.json" if args.state_dir else None,
+        )
+        if config.get("weaviate_url")
+        else None
     )
+
+    try:
+        graph = pipeline.run(
+            args.path,
+            summary_path=args.summary_out,
+            store=store,
+            infer_topics=args.infer_topics,
+            topic_api_key=args.openai_key if args.infer_topics else None,
+            topic_model=args.topic_model,
+            state_dir=args.state_dir,
+        )
+    finally:
+        pipeline.embedder.close()
     print(
-        f"Graph has {graph.graph.number_of_nodes()} nodes and {graph.graph.number_of_edges()} edges"
+        f"Graph has {graph.number_of_nodes()} nodes and {graph.number_of_edges()} edges"
     )
 
     if args.suggest_missing:
@@ -209,6 +419,10 @@ def main():
         print_tree(build_tree(summary))
 
     save_config(config, args.config)
+    error = pipeline.last_metadata.get("weaviate_error")
+    if error:
+        # Local outputs are written by now, but the run still failed.
+        sys.exit(f"Weaviate upload failed: {error}")
 
 
 if __name__ == "__main__":
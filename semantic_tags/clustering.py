@@ -1,27 +1,428 @@
-from typing import List, Tuple
+from __future__ import annotations
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional, Tuple
 
 import numpy as np
-from sklearn.cluster import KMeans
+from sklearn.cluster import KMeans, MiniBatchKMeans
 from sklearn.metrics import silhouette_score
 
+from .ann_index import IVFFlatIndex
+
+K_STRATEGIES = ("silhouette", "elbow")
+
+
+@dataclass
+class KSelection:
+    """Outcome of :func:`select_k`."""
+
+    k: int
+    strategy: str
+    silhouette: Dict[int, float] = field(default_factory=dict)
+    wcss: Dict[int, float] = field(default_factory=dict)
+    sample_size: int = 0
+    elapsed: float = 0.0
+    stopped_early: bool = False
+
+    def as_metadata(self) -> Dict[str, Any]:
+        return {
+            "k": self.k,
+            "strategy": self.strategy,
+            "silhouette": {str(k): v for k, v in self.silhouette.items()},
+            "wcss": {str(k): v for k, v in self.wcss.items()},
+            "sample_size": self.sample_size,
+            "elapsed": round(self.elapsed, 3),
+            "stopped_early": self.stopped_early,
+        }
+
+
+def stratified_sample(labels: np.ndarray, size: int, rng: np.random.Generator) -> np.ndarray:
+    """Return indices of about ``size`` rows drawn proportionally per label.
 
-def choose_k(embeddings: np.ndarray, k_min: int = 2, k_max: int = None) -> int:
+    Every label keeps at least one row so small clusters still count towards
+    the silhouette.
+    """
+    labels = np.asarray(labels)
+    if size >= labels.shape[0]:
+        return np.arange(labels.shape[0])
+    frac = size / labels.shape[0]
+    picks = []
+    for cid in np.unique(labels):
+        members = np.flatnonzero(labels == cid)
+        take = max(1, int(round(members.shape[0] * frac)))
+        picks.append(rng.choice(members, size=min(take, members.shape[0]), replace=False))
+    return np.sort(np.concatenate(picks))
+
+
+def _grow_centers(embeddings: np.ndarray, centers: np.ndarray, k: int) -> np.ndarray:
+    """Extend ``centers`` to ``k`` rows by adding the farthest points."""
+    centers = np.array(centers, dtype=embeddings.dtype)
+    while centers.shape[0] < k:
+        dists = (
+            (embeddings ** 2).sum(axis=1)[:, None]
+            - 2 * embeddings @ centers.T
+            + (centers ** 2).sum(axis=1)[None, :]
+        ).min(axis=1)
+        centers = np.vstack([centers, embeddings[int(np.argmax(dists))]])
+    return centers
+
+
+def select_k(
+    embeddings: np.ndarray,
+    k_min: int = 2,
+    k_max: Optional[int] = None,
+    *,
+    strategy: str = "silhouette",
+    sample_size: int = 2000,
+    budget: Optional[float] = None,
+    n_jobs: int = 1,
+    batch_size: int = 1024,
+    tau: float = 0.05,
+    random_state: int = 0,
+) -> KSelection:
+    """Pick the number of clusters for ``embeddings``.
+
+    Candidate k values from ``k_min`` to ``k_max`` (default ``sqrt(N) + 1``)
+    are fitted with ``MiniBatchKMeans`` in waves of ``n_jobs`` parallel fits;
+    each fit is warm-started from the centers of the previous wave plus the
+    points farthest from them.
+
+    ``strategy="silhouette"`` keeps the k with the best silhouette score,
+    computed on a stratified sample of ``sample_size`` rows. ``"elbow"``
+    stops at the last k whose WCSS improvement is at least ``tau`` times the
+    previous improvement. ``budget`` caps the wall-clock seconds spent; the
+    search stops after the wave in which it runs out.
+    """
+    if strategy not in K_STRATEGIES:
+        raise ValueError(f"Unknown k strategy: {strategy}")
+    start = time.perf_counter()
+    embeddings = np.asarray(embeddings, dtype=np.float32)
     n_samples = embeddings.shape[0]
     if k_max is None:
         k_max = int(np.sqrt(n_samples)) + 1
-    best_k = k_min
-    best_score = -1
-    for k in range(k_min, min(k_max, n_samples) + 1):
-        km = KMeans(n_clusters=k, n_init="auto")
+    candidates = list(range(k_min, min(k_max, n_samples - 1) + 1))
+    result = KSelection(k=min(k_min, max(n_samples, 1)), strategy=strategy)
+    if not candidates:
+        return result
+    rng = np.random.default_rng(random_state)
+    result.sample_size = min(sample_size, n_samples)
+
+    def fit(k: int, init: Optional[np.ndarray]):
+        km = MiniBatchKMeans(
+            n_clusters=k,
+            init=_grow_centers(embeddings, init, k) if init is not None else "k-means++",
+            n_init=1 if init is not None else "auto",
+            batch_size=batch_size,
+            random_state=random_state,
+        )
         labels = km.fit_predict(embeddings)
-        score = silhouette_score(embeddings, labels)
-        if score > best_score:
-            best_score = score
-            best_k = k
-    return best_k
+        score = None
+        if strategy == "silhouette":
+            idx = stratified_sample(labels, sample_size, np.random.default_rng(random_state + k))
+            if np.unique(labels[idx]).shape[0] > 1:
+                score = float(silhouette_score(embeddings[idx], labels[idx]))
+        return k, km, score
+
+    best_score = -np.inf
+    centers: Optional[np.ndarray] = None
+    n_jobs = max(1, n_jobs)
+    with ThreadPoolExecutor(max_workers=n_jobs) as pool:
+        for w in range(0, len(candidates), n_jobs):
+            wave = candidates[w : w + n_jobs]
+            for k, km, score in pool.map(fit, wave, [centers] * len(wave)):
+                result.wcss[k] = float(km.inertia_)
+                if score is not None:
+                    result.silhouette[k] = score
+                    if score > best_score:
+                        best_score = score
+                        result.k = k
+                centers = km.cluster_centers_
+            if strategy == "elbow":
+                elbow = _elbow(result.wcss, tau)
+                if elbow is not None:
+                    result.k = elbow
+                    break
+                result.k = max(result.wcss)
+            if budget is not None and time.perf_counter() - start > budget:
+                result.stopped_early = w + n_jobs < len(candidates)
+                break
+    result.elapsed = time.perf_counter() - start
+    return result
+
+
+def _elbow(wcss: Dict[int, float], tau: float) -> Optional[int]:
+    ks = sorted(wcss)
+    prev_gain = None
+    for a, b in zip(ks, ks[1:]):
+        gain = wcss[a] - wcss[b]
+        if prev_gain is not None and gain < tau * prev_gain:
+            return a
+        prev_gain = gain
+    return None
+
+
+def choose_k(embeddings: np.ndarray, k_min: int = 2, k_max: int = None, **kwargs) -> int:
+    """Return the chosen number of clusters; see :func:`select_k`."""
+    return select_k(embeddings, k_min, k_max, **kwargs).k
 
 
 def cluster_embeddings(embeddings: np.ndarray, k: int) -> Tuple[np.ndarray, KMeans]:
     km = KMeans(n_clusters=k, n_init="auto")
     labels = km.fit_predict(embeddings)
     return labels, km
+
+
+def cluster_centroids(embeddings: np.ndarray, labels) -> Tuple[np.ndarray, np.ndarray]:
+    """Return ``(cluster_ids, centroids)`` computed as the mean of each cluster.
+
+    Noise points (label -1) belong to no cluster and are left out.
+    """
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    labels = np.asarray(labels)
+    ids = np.unique(labels[labels >= 0])
+    if not len(ids):
+        return ids, np.zeros((0, embeddings.shape[1]), dtype=np.float32)
+    centroids = np.stack([embeddings[labels == cid].mean(axis=0) for cid in ids])
+    return ids, centroids
+
+
+def assign_clusters(embeddings: np.ndarray, ids: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Label each embedding with the id of its nearest centroid (-1 if there are none)."""
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    if embeddings.shape[0] == 0 or not len(ids):
+        return np.full(embeddings.shape[0], -1, dtype=ids.dtype)
+    dists = (
+        (embeddings ** 2).sum(axis=1)[:, None]
+        - 2 * embeddings @ centroids.T
+        + (centroids ** 2).sum(axis=1)[None, :]
+    )
+    return ids[np.argmin(dists, axis=1)]
+
+
+def _normalize(embeddings: np.ndarray) -> np.ndarray:
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings / np.maximum(norms, 1e-12)
+
+
+def _top_k(sims: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Return column indices and values of the ``k`` largest entries per row."""
+    idx = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+    vals = np.take_along_axis(sims, idx, axis=1)
+    order = np.argsort(-vals, axis=1)
+    return np.take_along_axis(idx, order, axis=1), np.take_along_axis(vals, order, axis=1)
+
+
+def knn_search(
+    embeddings: np.ndarray,
+    n_neighbors: int = 15,
+    *,
+    n_lists: Optional[int] = None,
+    n_probe: int = 8,
+    exact_below: int = 5000,
+    block_size: int = 1024,
+    random_state: int = 0,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Return ``(indices, distances)`` of each row's cosine nearest neighbours.
+
+    Up to ``exact_below`` rows are searched exhaustively in blocks. Larger
+    inputs go through an :class:`~semantic_tags.ann_index.IVFFlatIndex` with
+    ``n_lists`` cells (default ``sqrt(N)``) of which each row probes its
+    ``n_probe`` closest, so no dense ``N x N`` matrix is ever built.
+    """
+    X = _normalize(embeddings)
+    n = X.shape[0]
+    k = min(n_neighbors, n - 1)
+    if k < 1:
+        return np.zeros((n, 0), dtype=np.int64), np.zeros((n, 0), dtype=np.float32)
+    indices = np.empty((n, k), dtype=np.int64)
+    sims_out = np.empty((n, k), dtype=np.float32)
+    if n <= exact_below:
+        for start in range(0, n, block_size):
+            stop = min(start + block_size, n)
+            sims = X[start:stop] @ X.T
+            sims[np.arange(stop - start), np.arange(start, stop)] = -np.inf
+            indices[start:stop], sims_out[start:stop] = _top_k(sims, k)
+        return indices, 1.0 - sims_out
+
+    index = IVFFlatIndex.build(
+        X, n_lists=n_lists or max(1, int(np.sqrt(n))), random_state=random_state
+    )
+    ids, sims = index.search(X, k + 1, n_probe=n_probe, block_size=block_size)
+    sims[(ids == np.arange(n)[:, None]) | (ids < 0)] = -np.inf
+    indices, sims_out = _top_k(sims, k)
+    indices = np.take_along_axis(ids, indices, axis=1)
+    # Rows whose probed cells held too few candidates are searched exactly.
+    for row in np.flatnonzero(~np.isfinite(sims_out).all(axis=1)):
+        row_sims = X[row] @ X.T
+        row_sims[row] = -np.inf
+        idx, vals = _top_k(row_sims[None, :], k)
+        indices[row], sims_out[row] = idx[0], vals[0]
+    return indices, 1.0 - sims_out
+
+
+def knn_graph(
+    embeddings: np.ndarray, n_neighbors: int = 15, **knn_options
+):
+    """Return a symmetric sparse k-NN graph of cosine distances.
+
+    The graph is made connected by chaining one representative of each
+    connected component to the next, which graph-based clusterers such as
+    HDBSCAN require.
+    """
+    from scipy import sparse
+    from scipy.sparse.csgraph import connected_components
+
+    indices, dists = knn_search(embeddings, n_neighbors, **knn_options)
+    n = indices.shape[0]
+    rows = np.repeat(np.arange(n), indices.shape[1])
+    # Zero distances would disappear from the sparse matrix; keep them tiny.
+    data = np.maximum(dists.ravel(), 1e-6)
+    graph = sparse.csr_matrix((data, (rows, indices.ravel())), shape=(n, n))
+    graph = graph.maximum(graph.T).tocsr()
+    n_comp, comp = connected_components(graph, directed=False)
+    if n_comp > 1:
+        X = _normalize(embeddings)
+        reps = np.array([np.flatnonzero(comp == c)[0] for c in range(n_comp)])
+        links = np.maximum(1.0 - np.einsum("ij,ij->i", X[reps[:-1]], X[reps[1:]]), 1e-6)
+        bridge = sparse.csr_matrix((links, (reps[:-1], reps[1:])), shape=(n, n))
+        graph = graph.maximum(bridge).maximum(bridge.T).tocsr()
+    return graph
+
+
+ClusterFn = Callable[..., Tuple[np.ndarray, Dict[str, Any]]]
+CLUSTERERS: Dict[str, ClusterFn] = {}
+
+
+def register_clusterer(name: str) -> Callable[[ClusterFn], ClusterFn]:
+    """Register a clustering backend under ``name``.
+
+    Backends take an embedding matrix plus keyword options and return
+    ``(labels, info)`` where ``info`` is recorded in the summary metadata.
+    """
+
+    def decorator(fn: ClusterFn) -> ClusterFn:
+        CLUSTERERS[name] = fn
+        return fn
+
+    return decorator
+
+
+def get_clusterer(name: str) -> ClusterFn:
+    try:
+        return CLUSTERERS[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown clusterer: {name}. Available: {', '.join(sorted(CLUSTERERS))}"
+        ) from None
+
+
+@register_clusterer("kmeans")
+def kmeans_clusterer(embeddings: np.ndarray, **k_options) -> Tuple[np.ndarray, Dict[str, Any]]:
+    """KMeans with k picked by :func:`select_k`."""
+    selection = select_k(embeddings, **k_options)
+    labels, _ = cluster_embeddings(embeddings, selection.k)
+    return np.asarray(labels), {"k_selection": selection.as_metadata()}
+
+
+@register_clusterer("hdbscan")
+def hdbscan_clusterer(
+    embeddings: np.ndarray,
+    min_cluster_size: Optional[int] = None,
+    min_samples: int = 5,
+    n_neighbors: int = 15,
+    **knn_options,
+) -> Tuple[np.ndarray, Dict[str, Any]]:
+    """HDBSCAN over a sparse k-NN distance graph.
+
+    ``min_cluster_size`` defaults to ``sqrt(N)``. Noise points get label -1.
+    Uses the ``hdbscan`` package when installed and scikit-learn's
+    implementation otherwise.
+    """
+    n = np.asarray(embeddings).shape[0]
+    min_cluster_size = min_cluster_size or max(2, int(np.sqrt(n)))
+    min_samples = min(min_samples, n_neighbors)
+    graph = knn_graph(embeddings, n_neighbors, **knn_options)
+    try:
+        from hdbscan import HDBSCAN
+    except ImportError:
+        from sklearn.cluster import HDBSCAN
+    model = HDBSCAN(
+        min_cluster_size=min_cluster_size, min_samples=min_samples, metric="precomputed"
+    )
+    labels = np.asarray(model.fit_predict(graph))
+    return labels, {
+        "min_cluster_size": min_cluster_size,
+        "n_neighbors": n_neighbors,
+        "noise": int((labels < 0).sum()),
+    }
+
+
+def _similarity_edges(embeddings: np.ndarray, n_neighbors: int, **knn_options):
+    graph = knn_graph(embeddings, n_neighbors, **knn_options).tocoo()
+    upper = graph.row < graph.col
+    weights = np.clip(1.0 - graph.data[upper], 1e-6, None)
+    return graph.shape[0], graph.row[upper], graph.col[upper], weights
+
+
+@register_clusterer("leiden")
+def leiden_clusterer(
+    embeddings: np.ndarray,
+    n_neighbors: int = 15,
+    resolution: float = 1.0,
+    random_state: int = 0,
+    **knn_options,
+) -> Tuple[np.ndarray, Dict[str, Any]]:
+    """Leiden community detection on the cosine k-NN graph (needs ``leidenalg``)."""
+    try:
+        import igraph as ig
+        import leidenalg
+    except ImportError as exc:  # pragma: no cover - optional dependency
+        raise ImportError(
+            "The leiden clusterer requires the python-igraph and leidenalg packages"
+        ) from exc
+    n, rows, cols, weights = _similarity_edges(embeddings, n_neighbors, **knn_options)
+    g = ig.Graph(n=n, edges=list(zip(rows.tolist(), cols.tolist())))
+    g.es["weight"] = weights.tolist()
+    part = leidenalg.find_partition(
+        g,
+        leidenalg.RBConfigurationVertexPartition,
+        weights="weight",
+        resolution_parameter=resolution,
+        seed=random_state,
+    )
+    return np.asarray(part.membership), {
+        "n_neighbors": n_neighbors,
+        "resolution": resolution,
+        "modularity": float(part.modularity),
+    }
+
+
+@register_clusterer("louvain")
+def louvain_clusterer(
+    embeddings: np.ndarray,
+    n_neighbors: int = 15,
+    resolution: float = 1.0,
+    random_state: int = 0,
+    **knn_options,
+) -> Tuple[np.ndarray, Dict[str, Any]]:
+    """Louvain community detection on the cosine k-NN graph via networkx."""
+    import networkx as nx
+
+    n, rows, cols, weights = _similarity_edges(embeddings, n_neighbors, **knn_options)
+    g = nx.Graph()
+    g.add_nodes_from(range(n))
+    g.add_weighted_edges_from(zip(rows.tolist(), cols.tolist(), weights.tolist()))
+    communities = nx.community.louvain_communities(
+        g, weight="weight", resolution=resolution, seed=random_state
+    )
+    labels = np.empty(n, dtype=np.int64)
+    for cid, members in enumerate(sorted(communities, key=len, reverse=True)):
+        labels[list(members)] = cid
+    return labels, {
+        "n_neighbors": n_neighbors,
+        "resolution": resolution,
+        "modularity": float(nx.community.modularity(g, communities, weight="weight")),
+    }
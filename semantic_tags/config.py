@@ -14,6 +14,8 @@ DEFAULT_CONFIG = {
     "batch_size": 32,
     "device": None,
     "weaviate_url": None,
+    "cache_dir": None,
+    "cache_size": 100_000,
 }
 
 AVAILABLE_MODELS = {
@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import hashlib
+import re
+import zlib
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+DEDUPE_MODES = ("off", "exact", "near")
+
+_WORD_RE = re.compile(r"\w+")
+# Mersenne prime for the MinHash permutations; hashes are masked to 31 bits
+# so ``a * x + b`` stays within uint64.
+_PRIME = (1 << 31) - 1
+
+
+def normalize_text(text: str) -> str:
+    """Casefold ``text`` and collapse whitespace for exact matching."""
+    return " ".join(text.casefold().split())
+
+
+def shingles(text: str, size: int = 3) -> List[int]:
+    """31-bit hashes of the word ``size``-grams of ``text``."""
+    words = _WORD_RE.findall(text.casefold())
+    if len(words) <= size:
+        grams = [" ".join(words)]
+    else:
+        grams = [" ".join(words[i : i + size]) for i in range(len(words) - size + 1)]
+    return sorted({zlib.crc32(g.encode("utf-8")) & _PRIME for g in grams})
+
+
+def minhash_signatures(texts: Sequence[str], num_perm: int = 64, seed: int = 0, block: int = 1 << 16):
+    """Return a ``(len(texts), num_perm)`` MinHash signature matrix.
+
+    Shingle hashes of many texts are permuted together and reduced per text
+    with ``np.minimum.reduceat``, about ``block`` shingles at a time.
+    """
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, _PRIME, num_perm, dtype=np.uint64)
+    b = rng.integers(0, _PRIME, num_perm, dtype=np.uint64)
+    sigs = np.empty((len(texts), num_perm), dtype=np.uint64)
+    start = 0
+    while start < len(texts):
+        hashes: List[int] = []
+        offsets: List[int] = []
+        stop = start
+        while stop < len(texts) and (stop == start or len(hashes) < block):
+            offsets.append(len(hashes))
+            hashes.extend(shingles(texts[stop]))
+            stop += 1
+        x = np.asarray(hashes, dtype=np.uint64)[:, None]
+        permuted = (x * a + b) % _PRIME
+        sigs[start:stop] = np.minimum.reduceat(permuted, offsets, axis=0)
+        start = stop
+    return sigs
+
+
+class _UnionFind:
+    def __init__(self, n: int):
+        self.parent = list(range(n))
+
+    def find(self, i: int) -> int:
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, i: int, j: int) -> None:
+        ri, rj = self.find(i), self.find(j)
+        if ri != rj:
+            # The lower index stays the representative.
+            self.parent[max(ri, rj)] = min(ri, rj)
+
+
+def near_duplicate_groups(
+    texts: Sequence[str],
+    threshold: float = 0.8,
+    num_perm: int = 64,
+    bands: int = 16,
+) -> List[int]:
+    """Return, for each text, the index of its near-duplicate representative.
+
+    Signatures are split into ``bands`` LSH bands; texts sharing a band are
+    candidates and are merged when their estimated Jaccard similarity with
+    the first text in that band bucket is at least ``threshold``.
+    """
+    import numpy as np
+
+    if len(texts) < 2:
+        return list(range(len(texts)))
+    sigs = minhash_signatures(texts, num_perm)
+    rows = num_perm // bands
+    uf = _UnionFind(len(texts))
+    for band in range(bands):
+        part = np.ascontiguousarray(sigs[:, band * rows : (band + 1) * rows])
+        _, first, inverse = np.unique(part, axis=0, return_index=True, return_inverse=True)
+        anchors = first[inverse.reshape(-1)]
+        for i in np.flatnonzero(anchors != np.arange(len(texts))).tolist():
+            j = int(anchors[i])
+            if uf.find(i) != uf.find(j) and np.mean(sigs[i] == sigs[j]) >= threshold:
+                uf.union(i, j)
+    return [uf.find(i) for i in range(len(texts))]
+
+
+@dataclass
+class Dedupe:
+    """Which nuggets to embed and where every nugget's vector comes from."""
+
+    mode: str
+    keep: List[int]
+    positions: List[int]
+    exact: int = 0
+    near: int = 0
+
+    @property
+    def saved(self) -> int:
+        return len(self.positions) - len(self.keep)
+
+    def as_metadata(self) -> Dict[str, object]:
+        return {
+            "mode": self.mode,
+            "nuggets": len(self.positions),
+            "embedded": len(self.keep),
+            "exact_duplicates": self.exact,
+            "near_duplicates": self.near,
+            "saved_encodes": self.saved,
+        }
+
+
+def dedupe(
+    texts: Sequence[object],
+    types: Optional[Sequence[str]] = None,
+    *,
+    mode: str = "exact",
+    threshold: float = 0.8,
+    num_perm: int = 64,
+    bands: int = 16,
+) -> Dedupe:
+    """Group duplicate text nuggets so each group is embedded once.
+
+    ``exact`` matches nuggets whose normalized text hashes equal; ``near``
+    additionally merges MinHash/LSH near duplicates of those. The first
+    nugget of a group is its representative. Image nuggets are never merged.
+    ``keep`` lists the representatives in input order and ``positions[i]``
+    is the row of nugget ``i``'s representative within ``keep``.
+    """
+    if mode not in DEDUPE_MODES:
+        raise ValueError(f"Unknown dedupe mode: {mode}. Available: {', '.join(DEDUPE_MODES)}")
+    rep = list(range(len(texts)))
+    exact = near = 0
+    if mode != "off":
+        seen: Dict[bytes, int] = {}
+        for i, text in enumerate(texts):
+            if (types is not None and types[i] == "image") or not isinstance(text, str):
+                continue
+            digest = hashlib.blake2b(normalize_text(text).encode("utf-8"), digest_size=16).digest()
+            rep[i] = seen.setdefault(digest, i)
+            exact += rep[i] != i
+    if mode == "near":
+        unique = [i for i in range(len(texts)) if rep[i] == i and isinstance(texts[i], str)]
+        if types is not None:
+            unique = [i for i in unique if types[i] != "image"]
+        groups = near_duplicate_groups([texts[i] for i in unique], threshold, num_perm, bands)
+        merged = {}
+        for i, g in zip(unique, groups):
+            merged[i] = unique[g]
+            near += unique[g] != i
+        rep = [merged.get(r, r) for r in rep]
+    keep = [i for i in range(len(texts)) if rep[i] == i]
+    row = {i: pos for pos, i in enumerate(keep)}
+    return Dedupe(mode, keep, [row[r] for r in rep], exact, near)
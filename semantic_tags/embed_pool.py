@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import multiprocessing
+import os
+import signal
+import time
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+def _init_worker(threads: int) -> None:
+    # Ctrl-C is handled by the parent, which terminates the pool.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ[var] = str(threads)
+    try:
+        import torch
+
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+
+
+def _encode_shard(args: Tuple[Tuple, List[str], int]) -> np.ndarray:
+    # The model is loaded on the first task rather than in the initializer:
+    # Pool respawns workers whose initializer raises, so a load error there
+    # would never reach the caller.
+    from .vectorization import load_model
+
+    key, texts, batch_size = args
+    vecs = load_model(*key).encode(texts, batch_size=batch_size, show_progress_bar=False)
+    return np.asarray(vecs, dtype=np.float32)
+
+
+class EmbedPool:
+    """Encode texts in worker processes that each hold their own model copy.
+
+    Texts are cut into shards of ``shard_batches`` batches and handed to
+    ``workers`` processes, each limited to ``threads`` intra-op threads
+    (by default the CPU count split evenly). Results stream back in input
+    order. Any error or ``KeyboardInterrupt`` while encoding terminates the
+    workers before it propagates, and the pool is then started afresh on the
+    next call.
+    """
+
+    def __init__(
+        self,
+        key: Tuple,
+        workers: int,
+        *,
+        batch_size: int = 32,
+        threads: Optional[int] = None,
+        shard_batches: int = 4,
+        start_method: str = "spawn",
+    ):
+        self.key = key
+        self.workers = workers
+        self.batch_size = batch_size
+        self.threads = threads or max(1, (os.cpu_count() or 1) // workers)
+        self.shard_size = max(1, batch_size * shard_batches)
+        self.start_method = start_method
+        self.encoded = 0
+        self.seconds = 0.0
+        self._pool = None
+
+    def _start(self):
+        if self._pool is None:
+            ctx = multiprocessing.get_context(self.start_method)
+            self._pool = ctx.Pool(
+                self.workers, initializer=_init_worker, initargs=(self.threads,)
+            )
+        return self._pool
+
+    def iter_encode(self, texts: Sequence[str]) -> Iterator[np.ndarray]:
+        """Yield one embedding matrix per shard of ``texts``, in order."""
+        pool = self._start()
+        shards = (
+            (self.key, list(texts[i : i + self.shard_size]), self.batch_size)
+            for i in range(0, len(texts), self.shard_size)
+        )
+        start = time.perf_counter()
+        try:
+            for vecs in pool.imap(_encode_shard, shards):
+                self.encoded += len(vecs)
+                yield vecs
+        except BaseException:
+            self.terminate()
+            raise
+        finally:
+            self.seconds += time.perf_counter() - start
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        parts = list(self.iter_encode(texts))
+        if not parts:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.concatenate(parts)
+
+    @property
+    def nuggets_per_sec(self) -> Optional[float]:
+        return round(self.encoded / self.seconds, 1) if self.seconds else None
+
+    def terminate(self) -> None:
+        """Stop the workers immediately."""
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+
+    def close(self) -> None:
+        """Let the workers exit once idle and wait for them."""
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
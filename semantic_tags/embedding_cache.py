@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+import unicodedata
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+
+def normalize_text(text: str) -> str:
+    """Return ``text`` in the canonical form used for cache keys."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def text_key(model_name: str, revision: Optional[str], text: str) -> str:
+    """Cache key for a text embedding."""
+    digest = hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+    return f"{model_name}|{revision or ''}|text:{digest}"
+
+
+def file_hash(path: Path, chunk_size: int = 1 << 20) -> str:
+    """Return the SHA-256 hex digest of the file at ``path``."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def image_key(model_name: str, revision: Optional[str], path: Path) -> str:
+    """Cache key for an image embedding, based on the file contents."""
+    return f"{model_name}|{revision or ''}|image:{file_hash(Path(path))}"
+
+
+class EmbeddingCache:
+    """Content-addressed on-disk store of embedding vectors.
+
+    Vectors live in a memory-mapped ``vectors.npy`` file and a SQLite index
+    maps each key to its row. At most ``max_entries`` vectors are kept; when
+    the cache is full the least recently used entry is evicted and its row is
+    reused. Reopening a cache with a smaller ``max_entries`` evicts down to it.
+    """
+
+    def __init__(self, path: Path, max_entries: int = 100_000):
+        if max_entries < 1:
+            raise ValueError("max_entries must be positive")
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Usable from whichever thread runs the pipeline, one thread at a time.
+        self._db = sqlite3.connect(str(self.path / "index.sqlite"), check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, slot INTEGER NOT NULL, last_used INTEGER NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_lru ON entries(last_used)")
+        self._db.commit()
+        row = self._db.execute(
+            "SELECT COALESCE(MAX(last_used), 0), COALESCE(MAX(slot) + 1, 0) FROM entries"
+        ).fetchone()
+        self._tick = int(row[0])
+        self._next_slot = int(row[1])
+        self._vectors_path = self.path / "vectors.npy"
+        self._vectors: Optional[np.memmap] = None
+        if self._vectors_path.exists():
+            self._vectors = np.lib.format.open_memmap(str(self._vectors_path), mode="r+")
+        if self._next_slot > self.max_entries:
+            self._shrink()
+
+    def __len__(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def get_many(self, keys: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """Return the cached vector for each key, or ``None`` on a miss."""
+        results: List[Optional[np.ndarray]] = [None] * len(keys)
+        if self._vectors is None:
+            self.misses += len(keys)
+            return results
+        slots: Dict[str, int] = {}
+        unique = list(dict.fromkeys(keys))
+        for start in range(0, len(unique), 500):
+            part = unique[start : start + 500]
+            marks = ",".join("?" * len(part))
+            for key, slot in self._db.execute(
+                f"SELECT key, slot FROM entries WHERE key IN ({marks})", part
+            ):
+                slots[key] = slot
+        for i, key in enumerate(keys):
+            slot = slots.get(key)
+            if slot is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                results[i] = np.array(self._vectors[slot])
+        if slots:
+            self._tick += 1
+            self._db.executemany(
+                "UPDATE entries SET last_used = ? WHERE key = ?",
+                [(self._tick, k) for k in slots],
+            )
+            self._db.commit()
+        return results
+
+    def put_many(self, keys: Sequence[str], vectors: Sequence[np.ndarray]) -> None:
+        """Store ``vectors`` under ``keys``, evicting old entries if needed."""
+        if not len(keys):
+            return
+        vectors = np.asarray(vectors, dtype=np.float32)
+        self._ensure_capacity(vectors.shape[1], min(self.max_entries, self._next_slot + len(keys)))
+        self._tick += 1
+        for key, vec in zip(keys, vectors):
+            row = self._db.execute("SELECT slot FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                slot = row[0]
+            elif self._next_slot < self.max_entries:
+                slot = self._next_slot
+                self._next_slot += 1
+            else:
+                old_key, slot = self._db.execute(
+                    "SELECT key, slot FROM entries ORDER BY last_used LIMIT 1"
+                ).fetchone()
+                self._db.execute("DELETE FROM entries WHERE key = ?", (old_key,))
+                self.evictions += 1
+            self._vectors[slot] = vec
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries (key, slot, last_used) VALUES (?, ?, ?)",
+                (key, slot, self._tick),
+            )
+        self._vectors.flush()
+        self._db.commit()
+
+    def _shrink(self) -> None:
+        """Evict least recently used entries and move the rest below ``max_entries``."""
+        excess = len(self) - self.max_entries
+        if excess > 0:
+            self._db.execute(
+                "DELETE FROM entries WHERE key IN "
+                "(SELECT key FROM entries ORDER BY last_used LIMIT ?)",
+                (excess,),
+            )
+            self.evictions += excess
+        used = {
+            slot
+            for (slot,) in self._db.execute(
+                "SELECT slot FROM entries WHERE slot < ?", (self.max_entries,)
+            )
+        }
+        free = (slot for slot in range(self.max_entries) if slot not in used)
+        moves = self._db.execute(
+            "SELECT key, slot FROM entries WHERE slot >= ? ORDER BY slot", (self.max_entries,)
+        ).fetchall()
+        for (key, slot), target in zip(moves, free):
+            if self._vectors is not None:
+                self._vectors[target] = self._vectors[slot]
+            self._db.execute("UPDATE entries SET slot = ? WHERE key = ?", (target, key))
+        self._db.commit()
+        self._next_slot = len(self)
+        if self._vectors is not None and self._vectors.shape[0] > self.max_entries:
+            self._resize(self.max_entries, self._vectors.shape[1])
+
+    def _ensure_capacity(self, dim: int, needed: int) -> None:
+        if self._vectors is not None:
+            if self._vectors.shape[1] != dim:
+                raise ValueError(
+                    f"Cache at {self.path} holds {self._vectors.shape[1]}-d vectors, got {dim}-d"
+                )
+            if self._vectors.shape[0] >= needed:
+                return
+        capacity = self._vectors.shape[0] if self._vectors is not None else 1024
+        while capacity < needed:
+            capacity *= 2
+        self._resize(min(max(capacity, needed), self.max_entries), dim)
+
+    def _resize(self, capacity: int, dim: int) -> None:
+        """Rewrite the vector file with ``capacity`` rows, keeping the leading ones."""
+        tmp_path = self.path / "vectors.tmp.npy"
+        grown = np.lib.format.open_memmap(
+            str(tmp_path), mode="w+", dtype=np.float32, shape=(capacity, dim)
+        )
+        if self._vectors is not None:
+            kept = min(capacity, self._vectors.shape[0])
+            grown[:kept] = self._vectors[:kept]
+        grown.flush()
+        del grown
+        self._vectors = None
+        tmp_path.replace(self._vectors_path)
+        self._vectors = np.lib.format.open_memmap(str(self._vectors_path), mode="r+")
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and the current number of entries."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self),
+            "max_entries": self.max_entries,
+        }
+
+    def close(self) -> None:
+        if self._vectors is not None:
+            self._vectors.flush()
+            self._vectors = None
+        self._db.close()
@@ -2,11 +2,19 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, Iterable, List, Any
+from array import array
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Set, Tuple
 from collections import Counter, defaultdict
 
 import networkx as nx
 
+try:
+    import numpy as np
+    from scipy import sparse
+except Exception:  # pragma: no cover - optional dependency
+    np = None
+    sparse = None
+
 
 @dataclass
 class Nugget:
@@ -25,14 +33,328 @@ class Tag:
     count: int = 0
 
 
+def _co_occurrence_counts(
+    rows: List[int], cols: List[int], n_rows: int, n_tags: int
+) -> Dict[Tuple[int, int], int]:
+    """Return ``{(tag_a, tag_b): weight}`` from nugget/tag incidences, ``a < b``.
+
+    ``rows`` and ``cols`` give the nugget and tag index of each membership.
+    Weights come from one sparse product ``A.T @ A``.
+    """
+    if sparse is not None:
+        incidence = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.int64), (rows, cols)),
+            shape=(n_rows, n_tags),
+        )
+        co = sparse.triu(incidence.T @ incidence, k=1).tocoo()
+        return {
+            (a, b): int(w) for a, b, w in zip(co.row.tolist(), co.col.tolist(), co.data.tolist())
+        }
+    by_nugget: Dict[int, List[int]] = defaultdict(list)  # pragma: no cover - scipy missing
+    for r, c in zip(rows, cols):
+        by_nugget[r].append(c)
+    counts: Counter[tuple] = Counter()
+    for cs in by_nugget.values():
+        cs = sorted(set(cs))
+        for i, a in enumerate(cs):
+            for b in cs[i + 1 :]:
+                counts[(a, b)] += 1
+    return dict(counts)
+
+
+def _prune_pairs(
+    counts: Dict[Tuple[Any, Any], int],
+    min_weight: int = 1,
+    top_k: int | None = None,
+    name: Callable[[Any], str] = str,
+) -> Dict[Tuple[Any, Any], int]:
+    """Apply ``min_weight`` and ``top_k`` to raw pair weights.
+
+    See :meth:`TagGraph.co_occurrence_edges`. ``top_k`` ties are broken by
+    tag name (``name`` maps a pair member to it), so the result depends only
+    on the weights and not on the order tags were first seen.
+    """
+    kept = {pair: w for pair, w in counts.items() if w >= min_weight}
+    if top_k is None:
+        return kept
+    ranked: Dict[Any, List[tuple]] = defaultdict(list)
+    for pair, w in kept.items():
+        key = (-w, sorted((name(pair[0]), name(pair[1]))))
+        ranked[pair[0]].append((key, pair))
+        ranked[pair[1]].append((key, pair))
+    keep = set()
+    for tag_pairs in ranked.values():
+        tag_pairs.sort(key=lambda item: item[0])
+        keep.update(pair for _, pair in tag_pairs[:top_k])
+    return {pair: w for pair, w in kept.items() if pair in keep}
+
+
+class _SummaryIndex:
+    """Running per-cluster and per-source tallies behind graph summaries.
+
+    ``add``/``remove`` are called for every nugget as it enters or leaves a
+    graph, so :meth:`summary` and :meth:`conversation_summary` cost
+    O(clusters + sources) instead of a scan over all nuggets. Noise nuggets
+    (cluster -1, from HDBSCAN) belong to no cluster and are only counted.
+    """
+
+    def __init__(self):
+        self.cluster_tags: Dict[Any, Counter[str]] = {}
+        self.cluster_sizes: Counter[Any] = Counter()
+        self.source_clusters: Dict[str, Counter[Any]] = {}
+        self.source_noise: Counter[str] = Counter()
+
+    def add(self, cluster: Any, source: str, tags: List[str]) -> None:
+        if int(cluster) < 0:
+            self.source_noise[source] += 1
+            return
+        self.cluster_sizes[cluster] += 1
+        self.cluster_tags.setdefault(cluster, Counter()).update(tags)
+        self.source_clusters.setdefault(source, Counter())[cluster] += 1
+
+    def remove(self, cluster: Any, source: str, tags: List[str]) -> None:
+        if int(cluster) < 0:
+            self.source_noise[source] -= 1
+            if self.source_noise[source] <= 0:
+                del self.source_noise[source]
+            return
+        counter = self.cluster_tags.get(cluster)
+        if counter is None:
+            return
+        for tag in tags:
+            counter[tag] -= 1
+            if counter[tag] <= 0:
+                del counter[tag]
+        self.cluster_sizes[cluster] -= 1
+        if self.cluster_sizes[cluster] <= 0:
+            del self.cluster_sizes[cluster]
+            del self.cluster_tags[cluster]
+        per_source = self.source_clusters[source]
+        per_source[cluster] -= 1
+        if per_source[cluster] <= 0:
+            del per_source[cluster]
+            if not per_source:
+                del self.source_clusters[source]
+
+    def labels(self) -> Dict[str, str | None]:
+        # Ties go to the first name, so insertion order never decides a label.
+        return {
+            str(cid): min(counter.items(), key=lambda item: (-item[1], item[0]))[0]
+            if counter
+            else None
+            for cid, counter in self.cluster_tags.items()
+        }
+
+    def summary(
+        self, tag_counts: Dict[str, int], metadata: Dict[str, Any] | None = None
+    ) -> Dict[str, Any]:
+        result = {
+            "tag_counts": tag_counts,
+            "cluster_count": len(self.cluster_tags),
+            "clusters": self.labels(),
+        }
+        noise = sum(self.source_noise.values())
+        if noise:
+            result["noise_count"] = noise
+        if metadata:
+            result["metadata"] = metadata
+        return result
+
+    def conversation_summary(self) -> Dict[str, Dict[str, Any]]:
+        labels = self.labels()
+        result: Dict[str, Dict[str, Any]] = {}
+        for src in dict.fromkeys([*self.source_clusters, *self.source_noise]):
+            clusters = self.source_clusters.get(src, {})
+            topics: Dict[str | None, int] = {}
+            for cluster, count in clusters.items():
+                label = labels.get(str(cluster), f"cluster_{cluster}")
+                topics[label] = topics.get(label, 0) + count
+            result[src] = {
+                "nugget_count": sum(clusters.values()) + self.source_noise[src],
+                "topics": topics,
+            }
+            if self.source_noise[src]:
+                result[src]["noise_count"] = self.source_noise[src]
+        return result
+
+
+class _AttrDict(dict):
+    """Node or edge attribute dict that counts in-place edits on its graph."""
+
+    __slots__ = ("_graph",)
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        try:
+            self._graph.version += 1
+        except AttributeError:  # unpickling restores items before the slot
+            pass
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._graph.version += 1
+
+    def update(self, *args, **kwargs):
+        super().update(*args, **kwargs)
+        self._graph.version += 1
+
+    def setdefault(self, key, default=None):
+        self._graph.version += 1
+        return super().setdefault(key, default)
+
+    def pop(self, *args):
+        self._graph.version += 1
+        return super().pop(*args)
+
+    def popitem(self):
+        self._graph.version += 1
+        return super().popitem()
+
+    def clear(self):
+        super().clear()
+        self._graph.version += 1
+
+
+class _TrackedGraph(nx.Graph):
+    """networkx graph whose ``version`` grows with every modification.
+
+    Structural edits go through the wrapped mutators below and attribute
+    edits through :class:`_AttrDict`, so :class:`TagGraph` can tell cheaply
+    whether its graph was changed behind its back.
+    """
+
+    version = 0
+
+    def node_attr_dict_factory(self) -> _AttrDict:
+        attrs = _AttrDict()
+        attrs._graph = self
+        return attrs
+
+    edge_attr_dict_factory = node_attr_dict_factory
+
+
+def _counting(method: Callable) -> Callable:
+    def mutator(self, *args, **kwargs):
+        self.version += 1
+        return method(self, *args, **kwargs)
+
+    mutator.__name__ = method.__name__
+    mutator.__doc__ = method.__doc__
+    return mutator
+
+
+for _name in (
+    "add_node",
+    "add_nodes_from",
+    "remove_node",
+    "remove_nodes_from",
+    "add_edge",
+    "add_edges_from",
+    "add_weighted_edges_from",
+    "remove_edge",
+    "remove_edges_from",
+    "clear",
+    "clear_edges",
+):
+    if hasattr(nx.Graph, _name):  # minimal stand-ins may lack some
+        setattr(_TrackedGraph, _name, _counting(getattr(nx.Graph, _name)))
+
+
 class TagGraph:
+    """Nuggets and tags in a networkx graph, with indexes kept beside it.
+
+    ``graph`` may be edited directly: every change is counted, and the
+    indexes are rebuilt from the graph on next use. A plain networkx graph
+    assigned to ``graph`` is copied into a tracked one at that point.
+    """
+
+    # Class-level defaults keep graphs pickled before these existed loadable.
+    _pair_counts: Dict[Tuple[str, str], int] | None = None
+    _edge_options: Tuple[int, int | None] | None = None
+
     def __init__(self):
-        self.graph = nx.Graph()
+        self.graph = _TrackedGraph()
+        self._reset_index()
 
-    def add_nuggets(self, nuggets: Iterable[Nugget]):
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        # Older pickles hold an untracked graph and may lack some indexes.
+        index = state.get("_index")
+        if not isinstance(self.graph, _TrackedGraph) or not hasattr(index, "source_noise"):
+            self._synced = None
+
+    def _reset_index(self) -> None:
+        # Node names by type plus cluster/source membership, kept in step
+        # with the graph by add_nuggets and remove_nuggets.
+        self._types: Dict[str, Dict[str, None]] = {"nugget": {}, "tag": {}}
+        self._cluster_members: Dict[Any, Dict[str, None]] = {}
+        self._source_members: Dict[str, Dict[str, None]] = {}
+        self._index = _SummaryIndex()
+        self._synced = None
+        # Unpruned tag pair weights; recounted from the graph when ``None``.
+        self._pair_counts = None
+
+    def _mark_synced(self) -> None:
+        self._synced = (self.graph, self.graph.version)
+
+    def _ensure_index(self) -> None:
+        """Rebuild the indexes if ``self.graph`` was edited directly."""
+        if not isinstance(self.graph, _TrackedGraph):
+            self.graph = _TrackedGraph(self.graph)
+        synced = self._synced
+        if synced is None or synced[0] is not self.graph or synced[1] != self.graph.version:
+            self._reset_index()
+            for node, data in self.graph.nodes(data=True):
+                if data.get("type") in self._types:
+                    self._types[data["type"]][node] = None
+            for node in self._types["nugget"]:
+                self._index_nugget(node, self.graph.nodes[node], self._node_tags(node))
+            self._mark_synced()
+
+    def _node_tags(self, node: str) -> List[str]:
+        return [
+            n[4:] for n in self.graph.neighbors(node)
+            if self.graph.nodes[n].get("type") == "tag"
+        ]
+
+    def _index_nugget(self, node: str, data: Dict[str, Any], tags: List[str]) -> None:
+        self._types["nugget"][node] = None
+        self._cluster_members.setdefault(data["cluster"], {})[node] = None
+        self._source_members.setdefault(data["source"], {})[node] = None
+        self._index.add(data["cluster"], data["source"], tags)
+
+    def _unindex_nugget(self, node: str, data: Dict[str, Any], tags: List[str]) -> None:
+        del self._types["nugget"][node]
+        for index, key in ((self._cluster_members, data["cluster"]), (self._source_members, data["source"])):
+            members = index[key]
+            del members[node]
+            if not members:
+                del index[key]
+        self._index.remove(data["cluster"], data["source"], tags)
+
+    def add_nuggets(self, nuggets: Iterable[Nugget], update_edges: bool = False):
+        """Add nuggets and link them to their tags.
+
+        With ``update_edges`` the co-occurrence weights between each nugget's
+        tags are incremented in place and the ``min_weight``/``top_k`` of the
+        last :meth:`co_occurrence_edges` call are re-applied, so the edges
+        match a full recompute. A nugget whose id is already present replaces
+        the old one.
+        """
+        self._ensure_index()
+        # Recounted pairs may differ from the edges anywhere, so render them all.
+        recount = self._pair_counts is None
+        if update_edges:
+            self._pairs()
+        touched: Set[Tuple[str, str]] = set()
         for nugget in nuggets:
+            node = f"nugget_{nugget.id}"
+            if node in self._types["nugget"]:
+                # The indexes match the graph so far; don't let removal rebuild them.
+                self._mark_synced()
+                self.remove_nuggets([nugget.id])
             self.graph.add_node(
-                f"nugget_{nugget.id}",
+                node,
                 type="nugget",
                 text=nugget.text,
                 cluster=nugget.cluster_id,
@@ -43,75 +365,505 @@ class TagGraph:
             for tag in nugget.tags:
                 tag_node = f"tag_{tag}"
                 self.graph.add_node(tag_node, type="tag")
-                self.graph.add_edge(f"nugget_{nugget.id}", tag_node)
+                self._types["tag"][tag_node] = None
+                self.graph.add_edge(node, tag_node)
                 self.graph.nodes[tag_node]["count"] = self.graph.nodes[tag_node].get("count", 0) + 1
+            self._index_nugget(node, self.graph.nodes[node], list(dict.fromkeys(nugget.tags)))
+            if update_edges:
+                touched.update(self._bump_co_occurrence(nugget.tags, 1))
+        if update_edges:
+            self._render_edges(None if recount else touched)
+        else:
+            # Edges are left as they are; the counts are redone on next use.
+            self._pair_counts = None
+        self._mark_synced()
+
+    def remove_nuggets(self, ids: Iterable[int]) -> None:
+        """Remove nuggets, decrementing tag counts and co-occurrence weights.
+
+        Tags left with no nuggets are removed as well.
+        """
+        self._ensure_index()
+        tracking = self._edge_options is not None
+        recount = self._pair_counts is None
+        if tracking:
+            self._pairs()
+        touched: Set[Tuple[str, str]] = set()
+        for nid in ids:
+            node = f"nugget_{nid}"
+            if node not in self._types["nugget"]:
+                continue
+            tags = self._node_tags(node)
+            self._unindex_nugget(node, self.graph.nodes[node], tags)
+            if tracking:
+                touched.update(self._bump_co_occurrence(tags, -1))
+            self.graph.remove_node(node)
+            for tag in tags:
+                tag_node = f"tag_{tag}"
+                count = self.graph.nodes[tag_node].get("count", 0) - 1
+                if count > 0:
+                    self.graph.nodes[tag_node]["count"] = count
+                else:
+                    self.graph.remove_node(tag_node)
+                    del self._types["tag"][tag_node]
+        if tracking:
+            self._render_edges(None if recount else touched)
+        self._mark_synced()
+
+    def _incidences(self) -> Tuple[List[str], List[int], List[int]]:
+        tags = list(self._types["tag"])
+        tag_index = {t: i for i, t in enumerate(tags)}
+        rows: List[int] = []
+        cols: List[int] = []
+        for row, node in enumerate(self._types["nugget"]):
+            for neigh in self.graph.neighbors(node):
+                if neigh in tag_index:
+                    rows.append(row)
+                    cols.append(tag_index[neigh])
+        return tags, rows, cols
+
+    def _pairs(self) -> Dict[Tuple[str, str], int]:
+        """Unpruned pair weights, recounted from the nugget-tag links if unknown."""
+        if self._edge_options is None:
+            self._edge_options = (1, None)
+        if self._pair_counts is None:
+            tags, rows, cols = self._incidences()
+            counts = _co_occurrence_counts(rows, cols, len(self._types["nugget"]), len(tags))
+            self._pair_counts = {
+                tuple(sorted((tags[a], tags[b]))): w for (a, b), w in counts.items()
+            }
+        return self._pair_counts
+
+    def _bump_co_occurrence(self, tags: List[str], delta: int) -> List[Tuple[str, str]]:
+        counts = self._pair_counts
+        tag_nodes = sorted({f"tag_{t}" for t in tags})
+        touched = []
+        for i, t1 in enumerate(tag_nodes):
+            for t2 in tag_nodes[i + 1 :]:
+                weight = counts.get((t1, t2), 0) + delta
+                if weight > 0:
+                    counts[(t1, t2)] = weight
+                else:
+                    counts.pop((t1, t2), None)
+                touched.append((t1, t2))
+        return touched
 
-    def co_occurrence_edges(self):
-        tags = [n for n, d in self.graph.nodes(data=True) if d.get("type") == "tag"]
-        for i, t1 in enumerate(tags):
-            for t2 in tags[i + 1 :]:
-                shared = len(set(self.graph.neighbors(t1)).intersection(self.graph.neighbors(t2)))
-                if shared:
-                    self.graph.add_edge(t1, t2, weight=shared)
+    def _render_edges(self, touched: Iterable[Tuple[str, str]] | None = None) -> None:
+        """Write the pruned pair weights to the graph's tag-tag edges.
+
+        Without ``top_k`` an edge depends only on its own weight, so just the
+        ``touched`` pairs are updated; otherwise every edge is re-derived.
+        """
+        min_weight, top_k = self._edge_options
+        counts = self._pair_counts
+        if top_k is None and touched is not None:
+            for t1, t2 in touched:
+                weight = counts.get((t1, t2), 0)
+                if weight >= min_weight:
+                    self.graph.add_edge(t1, t2, weight=weight)
+                elif self.graph.has_edge(t1, t2):
+                    self.graph.remove_edge(t1, t2)
+            return
+        tags = self._types["tag"]
+        self.graph.remove_edges_from(
+            [(u, v) for u in tags for v in self.graph.neighbors(u) if v in tags and u < v]
+        )
+        self.graph.add_weighted_edges_from(
+            (a, b, w) for (a, b), w in _prune_pairs(counts, min_weight, top_k).items()
+        )
+
+    def co_occurrence_edges(self, min_weight: int = 1, top_k: int | None = None):
+        """Link tags that share nuggets, weighted by the number shared.
+
+        Weights come from one sparse product ``A.T @ A`` of the nugget x tag
+        incidence matrix. Edges lighter than ``min_weight`` are dropped and,
+        with ``top_k``, an edge is kept only if it is among the ``top_k``
+        heaviest of at least one of its tags. Existing tag-tag edges are
+        replaced. The unpruned weights and both settings are kept, so
+        incremental updates prune the same way.
+        """
+        self._ensure_index()
+        self._pair_counts = None
+        self._edge_options = (min_weight, top_k)
+        self._pairs()
+        self._render_edges()
+        self._mark_synced()
 
     def to_networkx(self) -> nx.Graph:
         return self.graph
 
+    def number_of_nodes(self) -> int:
+        return self.graph.number_of_nodes()
+
+    def number_of_edges(self) -> int:
+        return self.graph.number_of_edges()
+
+    def _nugget(self, node: str) -> Nugget:
+        data = self.graph.nodes[node]
+        return Nugget(
+            int(node[7:]),
+            data.get("text", ""),
+            self._node_tags(node),
+            data["cluster"],
+            Path(data["source"]),
+            data.get("speaker"),
+            data.get("emotion"),
+        )
+
+    def iter_nuggets(self) -> Iterator[Nugget]:
+        """Yield the graph's nuggets in insertion order."""
+        self._ensure_index()
+        for node in self._types["nugget"]:
+            yield self._nugget(node)
+
+    def get_nugget(self, nugget_id: int) -> Nugget | None:
+        """Return the nugget with ``nugget_id``, or ``None``."""
+        node = f"nugget_{nugget_id}"
+        if self.graph.nodes.get(node, {}).get("type") != "nugget":
+            return None
+        return self._nugget(node)
+
+    def tag_counts(self) -> Dict[str, int]:
+        self._ensure_index()
+        return {n[4:]: self.graph.nodes[n].get("count", 0) for n in self._types["tag"]}
+
+    def cluster_members(self, cluster: Any) -> List[int]:
+        """Return ids of the nuggets in ``cluster``."""
+        self._ensure_index()
+        return [int(n[7:]) for n in self._cluster_members.get(cluster, {})]
+
+    def source_members(self, source: str) -> List[int]:
+        """Return ids of the nuggets that came from ``source``."""
+        self._ensure_index()
+        return [int(n[7:]) for n in self._source_members.get(str(source), {})]
+
     def summary(self, metadata: Dict[str, Any] | None = None) -> Dict[str, Any]:
         """Return a summary of tags, cluster counts and labels.
 
         Optional metadata is merged under a ``metadata`` key for logging
         processing parameters and embedding details.
         """
-        tags = {
-            n[4:]: self.graph.nodes[n].get("count", 0)
-            for n, d in self.graph.nodes(data=True)
-            if d.get("type") == "tag"
-        }
+        tags = self.tag_counts()
+        return self._index.summary(tags, metadata)
 
-        cluster_members = defaultdict(list)
-        for node, data in self.graph.nodes(data=True):
-            if data.get("type") == "nugget":
-                cluster_members[data["cluster"]].append(node)
+    def conversation_summary(self) -> Dict[str, Dict[str, Any]]:
+        """Return topic counts per source file."""
+        self._ensure_index()
+        return self._index.conversation_summary()
 
-        cluster_labels: Dict[str, str | None] = {}
-        for cid, nug_nodes in cluster_members.items():
-            counter: Counter[str] = Counter()
-            for n in nug_nodes:
-                for neigh in self.graph.neighbors(n):
-                    if self.graph.nodes[neigh].get("type") == "tag":
-                        counter[neigh[4:]] += 1
-            cluster_labels[str(cid)] = counter.most_common(1)[0][0] if counter else None
 
-        result = {
-            "tag_counts": tags,
-            "cluster_count": len(cluster_members),
-            "clusters": cluster_labels,
+class _Interner:
+    """Map strings to small integer codes; ``None`` is stored as -1."""
+
+    def __init__(self):
+        self.values: List[str] = []
+        self.codes: Dict[str, int] = {}
+
+    def code(self, value: str | None) -> int:
+        if value is None:
+            return -1
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def value(self, code: int) -> str | None:
+        return None if code < 0 else self.values[code]
+
+
+class CompactTagGraph:
+    """Array-backed alternative to :class:`TagGraph` for very large corpora.
+
+    Nuggets are stored column-wise: ids and clusters in typed arrays, sources,
+    speakers, emotions and tag names as interned codes, texts as UTF-8 in one
+    buffer indexed by offsets (image paths in ``paths``, keyed by row), and
+    nugget-to-tag membership in CSR form
+    (``tag_ptr``/``tag_codes``). Tag co-occurrence weights are kept in dicts
+    keyed by tag-code pairs: ``pair_counts`` unpruned and ``co_occurrence``
+    as rendered edges. :meth:`to_networkx` (and the ``graph`` property)
+    builds the same networkx graph a :class:`TagGraph` would hold.
+    """
+
+    pair_counts: Dict[Tuple[int, int], int] | None = None
+    edge_options: Tuple[int, int | None] | None = None
+
+    def __init__(self):
+        self.ids = array("q")
+        self.clusters = array("q")
+        self.source_codes = array("l")
+        self.speaker_codes = array("l")
+        self.emotion_codes = array("l")
+        self.alive = bytearray()
+        self._text = bytearray()
+        self._text_offsets = array("Q", [0])
+        self.tag_ptr = array("Q", [0])
+        self.tag_codes = array("l")
+        self.sources = _Interner()
+        self.speakers = _Interner()
+        self.emotions = _Interner()
+        self.tags = _Interner()
+        self.tag_counts_by_code = array("q")
+        # Image nuggets keep their path here instead of text.
+        self.paths: Dict[int, Path] = {}
+        self.co_occurrence: Dict[Tuple[int, int], int] = {}
+        self.pair_counts = None
+        self.edge_options = None
+        self.cluster_rows: Dict[int, array] = {}
+        self.source_rows: Dict[int, array] = {}
+        self._index = _SummaryIndex()
+        self._rows: Dict[int, int] | None = None
+        self._nx: nx.Graph | None = None
+
+    def __len__(self) -> int:
+        return sum(self.alive)
+
+    def add_nuggets(self, nuggets: Iterable[Nugget], update_edges: bool = False):
+        """Append nuggets; see :meth:`TagGraph.add_nuggets`.
+
+        A nugget whose id is already present tombstones the old row first.
+        """
+        self._nx = None
+        if self._rows is None:
+            self._rows = {nid: row for row, nid in enumerate(self.ids) if self.alive[row]}
+        recount = self.pair_counts is None
+        if update_edges:
+            self._pairs()
+        touched: Set[Tuple[int, int]] = set()
+        for nugget in nuggets:
+            if nugget.id in self._rows:
+                self.remove_nuggets([nugget.id])
+            row = len(self.ids)
+            self.ids.append(nugget.id)
+            self.clusters.append(int(nugget.cluster_id))
+            self.source_codes.append(self.sources.code(str(nugget.source)))
+            self.speaker_codes.append(self.speakers.code(nugget.speaker))
+            self.emotion_codes.append(self.emotions.code(nugget.emotion))
+            self.alive.append(1)
+            if isinstance(nugget.text, str):
+                self._text += nugget.text.encode("utf-8")
+            else:
+                self.paths[row] = nugget.text
+            self._text_offsets.append(len(self._text))
+            codes: List[int] = []
+            for tag in nugget.tags:
+                code = self.tags.code(tag)
+                if code == len(self.tag_counts_by_code):
+                    self.tag_counts_by_code.append(0)
+                self.tag_counts_by_code[code] += 1
+                if code not in codes:
+                    codes.append(code)
+            self.tag_codes.extend(codes)
+            self.tag_ptr.append(len(self.tag_codes))
+            self.cluster_rows.setdefault(self.clusters[row], array("q")).append(row)
+            self.source_rows.setdefault(self.source_codes[row], array("q")).append(row)
+            self._index.add(self.clusters[row], str(nugget.source), self.row_tags(row))
+            self._rows[nugget.id] = row
+            if update_edges:
+                touched.update(self._bump_co_occurrence(codes, 1))
+        if update_edges:
+            self._render_edges(None if recount else touched)
+        else:
+            self.pair_counts = None
+
+    def remove_nuggets(self, ids: Iterable[int]) -> None:
+        """Drop nuggets; see :meth:`TagGraph.remove_nuggets`.
+
+        Rows are tombstoned rather than compacted, so their storage is only
+        reclaimed when the graph is rebuilt.
+        """
+        self._nx = None
+        if self._rows is None:
+            self._rows = {nid: row for row, nid in enumerate(self.ids) if self.alive[row]}
+        tracking = self.edge_options is not None
+        recount = self.pair_counts is None
+        if tracking:
+            self._pairs()
+        touched: Set[Tuple[int, int]] = set()
+        for nid in ids:
+            row = self._rows.pop(nid, None)
+            if row is None:
+                continue
+            self.alive[row] = 0
+            codes = list(self.tag_codes[self.tag_ptr[row] : self.tag_ptr[row + 1]])
+            self._index.remove(
+                self.clusters[row], self.sources.values[self.source_codes[row]], self.row_tags(row)
+            )
+            if tracking:
+                touched.update(self._bump_co_occurrence(codes, -1))
+            for code in codes:
+                self.tag_counts_by_code[code] = max(0, self.tag_counts_by_code[code] - 1)
+        if tracking:
+            self._render_edges(None if recount else touched)
+
+    def _pairs(self) -> Dict[Tuple[int, int], int]:
+        if self.edge_options is None:
+            self.edge_options = (1, None)
+        if self.pair_counts is None:
+            rows: List[int] = []
+            cols: List[int] = []
+            for row in self._live_rows():
+                start, stop = self.tag_ptr[row], self.tag_ptr[row + 1]
+                rows.extend([row] * (stop - start))
+                cols.extend(self.tag_codes[start:stop])
+            self.pair_counts = _co_occurrence_counts(
+                rows, cols, len(self.ids), len(self.tags.values)
+            )
+        return self.pair_counts
+
+    def _bump_co_occurrence(self, codes: List[int], delta: int) -> List[Tuple[int, int]]:
+        codes = sorted(set(codes))
+        touched = []
+        for i, a in enumerate(codes):
+            for b in codes[i + 1 :]:
+                weight = self.pair_counts.get((a, b), 0) + delta
+                if weight > 0:
+                    self.pair_counts[(a, b)] = weight
+                else:
+                    self.pair_counts.pop((a, b), None)
+                touched.append((a, b))
+        return touched
+
+    def _render_edges(self, touched: Iterable[Tuple[int, int]] | None = None) -> None:
+        """Prune ``pair_counts`` into ``co_occurrence``; see :meth:`TagGraph._render_edges`."""
+        min_weight, top_k = self.edge_options
+        if top_k is None and touched is not None:
+            for pair in touched:
+                weight = self.pair_counts.get(pair, 0)
+                if weight >= min_weight:
+                    self.co_occurrence[pair] = weight
+                else:
+                    self.co_occurrence.pop(pair, None)
+            return
+        self.co_occurrence = _prune_pairs(
+            self.pair_counts, min_weight, top_k, name=self.tags.values.__getitem__
+        )
+
+    def co_occurrence_edges(self, min_weight: int = 1, top_k: int | None = None):
+        """Recompute tag co-occurrence; see :meth:`TagGraph.co_occurrence_edges`."""
+        self._nx = None
+        self.pair_counts = None
+        self.edge_options = (min_weight, top_k)
+        self._pairs()
+        self._render_edges()
+
+    def _live_rows(self) -> Iterator[int]:
+        return (row for row, flag in enumerate(self.alive) if flag)
+
+    def text(self, row: int) -> str | Path:
+        if row in self.paths:
+            return self.paths[row]
+        return self._text[self._text_offsets[row] : self._text_offsets[row + 1]].decode("utf-8")
+
+    def row_tags(self, row: int) -> List[str]:
+        values = self.tags.values
+        return [values[c] for c in self.tag_codes[self.tag_ptr[row] : self.tag_ptr[row + 1]]]
+
+    def nugget(self, row: int) -> Nugget:
+        return Nugget(
+            self.ids[row],
+            self.text(row),
+            self.row_tags(row),
+            self.clusters[row],
+            Path(self.sources.values[self.source_codes[row]]),
+            self.speakers.value(self.speaker_codes[row]),
+            self.emotions.value(self.emotion_codes[row]),
+        )
+
+    def iter_nuggets(self) -> Iterator[Nugget]:
+        """Yield the stored nuggets in insertion order."""
+        return (self.nugget(row) for row in self._live_rows())
+
+    def get_nugget(self, nugget_id: int) -> Nugget | None:
+        """Return the nugget with ``nugget_id``, or ``None``."""
+        if self._rows is None:
+            self._rows = {nid: row for row, nid in enumerate(self.ids) if self.alive[row]}
+        row = self._rows.get(nugget_id)
+        return None if row is None else self.nugget(row)
+
+    def tag_counts(self) -> Dict[str, int]:
+        return {
+            name: self.tag_counts_by_code[code]
+            for code, name in enumerate(self.tags.values)
+            if self.tag_counts_by_code[code] > 0
         }
-        if metadata:
-            result["metadata"] = metadata
-        return result
+
+    def cluster_members(self, cluster: Any) -> List[int]:
+        """Return ids of the nuggets in ``cluster``."""
+        rows = self.cluster_rows.get(int(cluster), ())
+        return [self.ids[r] for r in rows if self.alive[r]]
+
+    def source_members(self, source: str) -> List[int]:
+        """Return ids of the nuggets that came from ``source``."""
+        code = self.sources.codes.get(str(source))
+        rows = self.source_rows.get(code, ()) if code is not None else ()
+        return [self.ids[r] for r in rows if self.alive[r]]
+
+    def to_networkx(self) -> nx.Graph:
+        g = nx.Graph()
+        for row in self._live_rows():
+            node = f"nugget_{self.ids[row]}"
+            g.add_node(
+                node,
+                type="nugget",
+                text=self.text(row),
+                cluster=self.clusters[row],
+                source=self.sources.values[self.source_codes[row]],
+                speaker=self.speakers.value(self.speaker_codes[row]),
+                emotion=self.emotions.value(self.emotion_codes[row]),
+            )
+            for tag in self.row_tags(row):
+                tag_node = f"tag_{tag}"
+                if tag_node not in g.nodes:
+                    g.add_node(tag_node, type="tag", count=self.tag_counts_by_code[self.tags.codes[tag]])
+                g.add_edge(node, tag_node)
+        values = self.tags.values
+        g.add_weighted_edges_from(
+            (f"tag_{values[a]}", f"tag_{values[b]}", w) for (a, b), w in self.co_occurrence.items()
+        )
+        return g
+
+    @property
+    def graph(self) -> nx.Graph:
+        """A networkx view built on first access and reused until modified."""
+        if self._nx is None:
+            self._nx = self.to_networkx()
+        return self._nx
+
+    def number_of_nodes(self) -> int:
+        return len(self) + sum(1 for c in self.tag_counts_by_code if c > 0)
+
+    def number_of_edges(self) -> int:
+        memberships = sum(
+            self.tag_ptr[row + 1] - self.tag_ptr[row] for row in self._live_rows()
+        )
+        return memberships + len(self.co_occurrence)
+
+    def summary(self, metadata: Dict[str, Any] | None = None) -> Dict[str, Any]:
+        """Return a summary of tags, cluster counts and labels; see :meth:`TagGraph.summary`."""
+        return self._index.summary(self.tag_counts(), metadata)
 
     def conversation_summary(self) -> Dict[str, Dict[str, Any]]:
         """Return topic counts per source file."""
-        base_summary = self.summary()
-        labels = base_summary.get("clusters", {})
+        return self._index.conversation_summary()
 
-        topic_counts: defaultdict[str, defaultdict[str, int]] = defaultdict(lambda: defaultdict(int))
-        nugget_totals: Counter[str] = Counter()
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_nx"] = None
+        state["_rows"] = None
+        return state
 
-        for node, data in self.graph.nodes(data=True):
-            if data.get("type") == "nugget":
-                src = data["source"]
-                cluster = str(data["cluster"])
-                label = labels.get(cluster, f"cluster_{cluster}")
-                topic_counts[src][label] += 1
-                nugget_totals[src] += 1
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        if not hasattr(self._index, "source_noise"):
+            # Pickled before noise was tallied apart from the clusters.
+            self._index = _SummaryIndex()
+            for row in self._live_rows():
+                self._index.add(
+                    self.clusters[row],
+                    self.sources.values[self.source_codes[row]],
+                    self.row_tags(row),
+                )
 
-        result: Dict[str, Dict[str, Any]] = {}
-        for src, topics in topic_counts.items():
-            result[src] = {
-                "nugget_count": nugget_totals[src],
-                "topics": dict(topics),
-            }
-        return result
+
+GRAPH_BACKENDS = {"networkx": TagGraph, "compact": CompactTagGraph}
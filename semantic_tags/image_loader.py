@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, Optional, Tuple, Union
+
+import numpy as np
+
+if TYPE_CHECKING:  # Pillow is imported lazily
+    from PIL import Image
+
+# Shortest side CLIP models resize to before their centre crop.
+CLIP_INPUT_SIZE = 224
+
+_DCT: Dict[int, np.ndarray] = {}
+
+
+def _dct_matrix(n: int) -> np.ndarray:
+    if n not in _DCT:
+        k = np.arange(n)[:, None]
+        _DCT[n] = np.cos(np.pi * (2 * np.arange(n)[None, :] + 1) * k / (2 * n))
+    return _DCT[n]
+
+
+def phash(image: Image.Image, hash_size: int = 8, highfreq: int = 4) -> int:
+    """64-bit DCT perceptual hash of ``image``; identical pictures hash equal."""
+    from PIL import Image
+
+    n = hash_size * highfreq
+    pixels = np.asarray(image.convert("L").resize((n, n), Image.BILINEAR), dtype=np.float64)
+    dct = _dct_matrix(n)
+    low = (dct @ pixels @ dct.T)[:hash_size, :hash_size].ravel()
+    bits = low > np.median(low[1:])
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def prepare_image(image: Image.Image, size: int = CLIP_INPUT_SIZE) -> Image.Image:
+    """Downscale ``image`` so its shortest side is ``size`` and convert to RGB.
+
+    JPEGs are decoded in draft mode at the smallest DCT scale that is still
+    large enough, so big photos are never fully decoded.
+    """
+    from PIL import Image
+
+    w, h = image.size
+    scale = size / min(w, h) if min(w, h) else 1.0
+    if scale < 1:
+        target = (max(1, round(w * scale)), max(1, round(h * scale)))
+        if image.format == "JPEG":
+            image.draft("RGB", target)
+        image = image.resize(target, Image.BICUBIC, reducing_gap=2.0)
+    return image if image.mode == "RGB" else image.convert("RGB")
+
+
+def load_image(path: Path, size: int = CLIP_INPUT_SIZE) -> Image.Image:
+    from PIL import Image
+
+    with Image.open(path) as image:
+        image = prepare_image(image, size)
+        # Small RGB images come back unconverted and still lazily backed by the file.
+        image.load()
+        return image
+
+
+class ImageLoader:
+    """Decode and downscale images on a thread pool, streaming them in order.
+
+    At most ``prefetch`` images are decoded ahead of the consumer, so memory
+    stays bounded however many paths are given. Unreadable images are
+    yielded as ``None`` and recorded in ``errors``.
+    """
+
+    def __init__(self, size: int = CLIP_INPUT_SIZE, workers: int = 4, prefetch: int = 32):
+        self.size = size
+        self.workers = workers
+        self.prefetch = max(prefetch, workers)
+        self.errors: Dict[str, str] = {}
+
+    def _load(self, item: Union[Path, Image.Image]) -> Image.Image:
+        if isinstance(item, Path):
+            return load_image(item, self.size)
+        return prepare_image(item, self.size)
+
+    def iter_images(
+        self, items: Iterable[Union[Path, Image.Image]]
+    ) -> Iterator[Tuple[int, Optional[Image.Image]]]:
+        """Yield ``(index, image)`` for each item, in input order."""
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="decode") as pool:
+            pending: deque = deque()
+
+            def drain():
+                i, item, future = pending.popleft()
+                try:
+                    return i, future.result()
+                except Exception as exc:
+                    self.errors[str(item)] = f"{type(exc).__name__}: {exc}"
+                    return i, None
+
+            for i, item in enumerate(items):
+                pending.append((i, item, pool.submit(self._load, item)))
+                if len(pending) >= self.prefetch:
+                    yield drain()
+            while pending:
+                yield drain()
@@ -1,5 +1,61 @@
+from fnmatch import fnmatch
 from pathlib import Path
-from typing import List, Tuple, Union
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+
+from .diarization import SPEAKER_RE
+
+
+def read_text(path: Path, encoding: str = "utf-8", errors: str = "replace") -> str:
+    """Read ``path`` as text, replacing undecodable bytes by default."""
+    with open(path, "r", encoding=encoding, errors=errors) as f:
+        return f.read()
+
+
+def iter_text_pieces(
+    path: Path,
+    piece_chars: int,
+    encoding: str = "utf-8",
+    errors: str = "replace",
+) -> Iterator[str]:
+    """Yield the text of ``path`` in pieces of roughly ``piece_chars``.
+
+    Pieces end on line boundaries so speaker turns are not cut mid-line; a
+    single line longer than ``piece_chars`` becomes its own piece. When a
+    piece would start in the middle of a speaker turn, its first line is
+    prefixed with ``"<speaker>: "`` so diarization attributes it to the
+    speaker of the previous piece rather than ``Unknown``.
+    """
+    buffer: List[str] = []
+    size = 0
+    speaker: Optional[str] = None
+    with open(path, "r", encoding=encoding, errors=errors) as f:
+        for line in f:
+            if size + len(line) > piece_chars and buffer:
+                yield "".join(buffer)
+                buffer = []
+                size = 0
+            match = SPEAKER_RE.match(line)
+            if match:
+                speaker = match.group(1)
+            elif not buffer and speaker is not None:
+                line = f"{speaker}: {line}"
+            buffer.append(line)
+            size += len(line)
+    if buffer:
+        yield "".join(buffer)
+
+
+def iter_transcripts(
+    path: Path, encoding: str = "utf-8", errors: str = "replace"
+) -> Iterator[Tuple[str, Path]]:
+    """Lazily yield ``(text, relative_path)`` pairs; see :func:`load_transcripts`."""
+    if path.is_dir():
+        for p in sorted(path.rglob("*.md")):
+            yield read_text(p, encoding, errors), p.relative_to(path)
+        for p in sorted(path.rglob("*.json")):
+            yield read_text(p, encoding, errors), p.relative_to(path)
+    else:
+        yield read_text(path, encoding, errors), Path(path.name)
 
 
 def load_transcripts(path: Path) -> List[Tuple[str, Path]]:
@@ -10,15 +66,92 @@ def load_transcripts(path: Path) -> List[Tuple[str, Path]]:
     relative to ``path`` when ``path`` is a directory, or just the file name
     when ``path`` is a file.
     """
-    texts: List[Tuple[str, Path]] = []
+    return list(iter_transcripts(path))
+
+
+TEXT_EXTS = {".md", ".json", ".txt"}
+IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".webp", ".gif"}
+
+
+def _matches(rel_path: Path, patterns: Iterable[str]) -> bool:
+    posix = rel_path.as_posix()
+    return any(fnmatch(posix, pat) or fnmatch(rel_path.name, pat) for pat in patterns)
+
+
+def iter_files(
+    path: Path,
+    *,
+    max_size: Optional[int] = None,
+    include: Optional[List[str]] = None,
+    exclude: Optional[List[str]] = None,
+) -> Iterator[Tuple[Path, Path, bool]]:
+    """Yield ``(file_path, relative_path, is_image)`` for supported files.
+
+    Files are not read; this is the listing used by :func:`load_files` and by
+    incremental runs that only need to load changed files. Files larger than
+    ``max_size`` bytes, files matching none of the ``include`` globs (when
+    given) and files matching any ``exclude`` glob are skipped. Globs are
+    matched against the relative path and the file name.
+    """
     if path.is_dir():
-        for p in sorted(path.rglob("*.md")):
-            texts.append((p.read_text(), p.relative_to(path)))
-        for p in sorted(path.rglob("*.json")):
-            texts.append((p.read_text(), p.relative_to(path)))
+        candidates = ((p, p.relative_to(path)) for p in sorted(path.rglob("*")))
     else:
-        texts.append((path.read_text(), Path(path.name)))
-    return texts
+        candidates = iter([(path, Path(path.name))])
+    for p, rel in candidates:
+        suf = p.suffix.lower()
+        if suf not in TEXT_EXTS and suf not in IMAGE_EXTS:
+            continue
+        if include and not _matches(rel, include):
+            continue
+        if exclude and _matches(rel, exclude):
+            continue
+        if max_size is not None and p.stat().st_size > max_size:
+            continue
+        yield p, rel, suf in IMAGE_EXTS
+
+
+def read_entries(
+    entries: Iterable[Tuple[Path, Path, bool]],
+    *,
+    piece_chars: Optional[int] = None,
+    encoding: str = "utf-8",
+    errors: str = "replace",
+) -> Iterator[Tuple[Union[str, Path], Path, bool]]:
+    """Read the files listed by ``entries`` one at a time.
+
+    Images are passed through as paths. With ``piece_chars`` a text file is
+    yielded as several consecutive pieces sharing its relative path, so one
+    large file never has to be held in memory whole.
+    """
+    for p, rel, is_image in entries:
+        if is_image:
+            yield p, rel, True
+        elif piece_chars:
+            for piece in iter_text_pieces(p, piece_chars, encoding, errors):
+                yield piece, rel, False
+        else:
+            yield read_text(p, encoding, errors), rel, False
+
+
+def stream_files(
+    path: Path,
+    *,
+    piece_chars: Optional[int] = None,
+    max_size: Optional[int] = None,
+    include: Optional[List[str]] = None,
+    exclude: Optional[List[str]] = None,
+    encoding: str = "utf-8",
+    errors: str = "replace",
+) -> Iterator[Tuple[Union[str, Path], Path, bool]]:
+    """Lazily yield ``(content_or_path, relative_path, is_image)`` tuples.
+
+    Each file is read only when the consumer asks for it, so memory is bounded
+    by the work in flight rather than by the size of the corpus. See
+    :func:`iter_files` for the filters and :func:`read_entries` for
+    ``piece_chars``.
+    """
+    entries = iter_files(path, max_size=max_size, include=include, exclude=exclude)
+    return read_entries(entries, piece_chars=piece_chars, encoding=encoding, errors=errors)
 
 
 def load_files(path: Path) -> List[Tuple[Union[str, Path], Path, bool]]:
@@ -29,20 +162,4 @@ def load_files(path: Path) -> List[Tuple[Union[str, Path], Path, bool]]:
     Supported text files: ``.md``, ``.json``, ``.txt``.
     Image files: ``.jpg``, ``.jpeg``, ``.png``, ``.webp``, ``.gif``.
     """
-    items: List[Tuple[Union[str, Path], Path, bool]] = []
-    text_exts = {".md", ".json", ".txt"}
-    img_exts = {".jpg", ".jpeg", ".png", ".webp", ".gif"}
-    if path.is_dir():
-        for p in sorted(path.rglob("*")):
-            suf = p.suffix.lower()
-            if suf in text_exts:
-                items.append((p.read_text(), p.relative_to(path), False))
-            elif suf in img_exts:
-                items.append((p, p.relative_to(path), True))
-    else:
-        suf = path.suffix.lower()
-        if suf in text_exts:
-            items.append((path.read_text(), Path(path.name), False))
-        elif suf in img_exts:
-            items.append((path, Path(path.name), True))
-    return items
+    return list(stream_files(path))
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import json
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Tuple
+
+from .embedding_cache import file_hash
+
+
+@dataclass
+class FileRecord:
+    size: int
+    mtime: float
+    sha256: str
+    nugget_ids: List[int] = field(default_factory=list)
+
+
+@dataclass
+class ManifestDiff:
+    """Files that changed since the manifest was written.
+
+    ``added`` and ``changed`` hold ``(file_path, relative_path, is_image,
+    record)`` tuples where ``record`` describes the file as it is now (with no
+    nugget ids yet). ``deleted`` and ``unchanged`` hold relative paths.
+    """
+
+    added: List[Tuple[Path, Path, bool, FileRecord]] = field(default_factory=list)
+    changed: List[Tuple[Path, Path, bool, FileRecord]] = field(default_factory=list)
+    deleted: List[str] = field(default_factory=list)
+    unchanged: List[str] = field(default_factory=list)
+
+    def counts(self) -> Dict[str, int]:
+        return {
+            "added": len(self.added),
+            "changed": len(self.changed),
+            "deleted": len(self.deleted),
+            "unchanged": len(self.unchanged),
+        }
+
+
+class Manifest:
+    """Record of the source files behind a ``TagGraph``.
+
+    Each file is tracked by size, mtime and content hash together with the ids
+    of the nuggets it produced, so an incremental run can replace exactly the
+    nuggets of files that changed. ``extra`` holds run-level state such as
+    cluster labels.
+    """
+
+    def __init__(
+        self,
+        files: Dict[str, FileRecord] | None = None,
+        next_id: int = 0,
+        extra: Dict[str, Any] | None = None,
+    ):
+        self.files = files or {}
+        self.next_id = next_id
+        self.extra = extra or {}
+
+    @classmethod
+    def load(cls, path: Path) -> "Manifest":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        files = {k: FileRecord(**v) for k, v in data.get("files", {}).items()}
+        return cls(files, data.get("next_id", 0), data.get("extra", {}))
+
+    def save(self, path: Path) -> None:
+        data = {
+            "next_id": self.next_id,
+            "files": {k: asdict(v) for k, v in sorted(self.files.items())},
+            "extra": self.extra,
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+
+    def diff(self, entries: Iterable[Tuple[Path, Path, bool]]) -> ManifestDiff:
+        """Compare the files listed in ``entries`` with the manifest.
+
+        Files whose size and mtime match are assumed unchanged without being
+        read. Otherwise the content hash decides; a file that was only touched
+        keeps its nuggets and has its mtime refreshed in place.
+        """
+        result = ManifestDiff()
+        seen = set()
+        for file_path, rel_path, is_image in entries:
+            key = str(rel_path)
+            seen.add(key)
+            st = file_path.stat()
+            old = self.files.get(key)
+            if old is not None and old.size == st.st_size and old.mtime == st.st_mtime:
+                result.unchanged.append(key)
+                continue
+            record = FileRecord(st.st_size, st.st_mtime, file_hash(file_path))
+            if old is None:
+                result.added.append((file_path, rel_path, is_image, record))
+            elif old.sha256 == record.sha256:
+                old.size, old.mtime = record.size, record.mtime
+                result.unchanged.append(key)
+            else:
+                result.changed.append((file_path, rel_path, is_image, record))
+        result.deleted = [k for k in self.files if k not in seen]
+        return result
+
+    def stale_ids(self, diff: ManifestDiff) -> List[int]:
+        """Return ids of nuggets produced by changed or deleted files."""
+        ids: List[int] = []
+        for _, rel_path, _, _ in diff.changed:
+            ids.extend(self.files[str(rel_path)].nugget_ids)
+        for key in diff.deleted:
+            ids.extend(self.files[key].nugget_ids)
+        return ids
+
+    def apply(self, diff: ManifestDiff, nugget_ids: Dict[str, List[int]]) -> None:
+        """Record the outcome of processing ``diff``."""
+        for key in diff.deleted:
+            del self.files[key]
+        for _, rel_path, _, record in diff.added + diff.changed:
+            key = str(rel_path)
+            record.nugget_ids = list(nugget_ids.get(key, []))
+            self.files[key] = record
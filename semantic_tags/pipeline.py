@@ -1,23 +1,43 @@
 from __future__ import annotations
 
+import pickle
+import time
+from collections import defaultdict
 from pathlib import Path
-from typing import List, Optional
+from typing import TYPE_CHECKING, Dict, List, Optional
 
-from .ingestion import load_transcripts, load_files
-from .chunking import split_into_nuggets
-from .diarization import diarize_and_chunk, detect_emotion
+from .ingestion import iter_files, read_entries, stream_files
+from .preprocessing import iter_chunked
+from .chunking import (
+    CHUNKING,
+    MIN_NUGGET_TOKENS,
+    SENTENCE_RE,
+    TOPIC_SHIFT_THRESHOLD,
+    pool_vectors,
+    semantic_segments,
+    split_into_nuggets,
+    split_sentences,
+)
+from .diarization import detect_emotion
+from .dedupe import DEDUPE_MODES, dedupe
 
 try:
     from tqdm.auto import tqdm
 except Exception:  # pragma: no cover - optional dependency
     def tqdm(iterable, **kwargs):
         return iterable
-from .vectorization import Embedder, VisionEmbedder
-from .config import DEFAULT_CONFIG, list_devices
+from .vectorization import Embedder, VisionEmbedder, embed_nuggets
+from .config import DEFAULT_CONFIG, list_devices, select_model
+from .embedding_cache import EmbeddingCache
 from .tagging import HeuristicTagger
-from .clustering import choose_k, cluster_embeddings
-from .graph import Nugget, TagGraph
-from .weaviate_store import WeaviateStore
+from .clustering import assign_clusters, cluster_centroids, get_clusterer
+from .ann_index import IVFFlatIndex, ann_index_path
+from .graph import GRAPH_BACKENDS, Nugget, TagGraph
+from .manifest import Manifest
+from .bulk_import import ImportStats
+
+if TYPE_CHECKING:
+    from .weaviate_store import WeaviateStore
 
 
 class Pipeline:
@@ -30,21 +50,100 @@ class Pipeline:
         tags: Optional[List[str]] = None,
         tag_file: Optional[Path] = None,
         model_dir: Optional[Path] = None,
+        cache_dir: Optional[Path] = None,
+        cache_size: int = 100_000,
+        k_strategy: str = "silhouette",
+        k_budget: Optional[float] = None,
+        k_jobs: int = 1,
+        clusterer: str = "kmeans",
+        min_co_occurrence: int = 1,
+        co_occurrence_top_k: Optional[int] = None,
+        graph_backend: str = "networkx",
+        piece_chars: Optional[int] = None,
+        max_file_size: Optional[int] = None,
+        include: Optional[List[str]] = None,
+        exclude: Optional[List[str]] = None,
+        encoding_errors: str = "replace",
+        workers: int = 1,
+        ann_index: bool = True,
+        embed_backend: str = "torch",
+        quantize: bool = False,
+        embed_workers: int = 1,
+        batching: str = "fixed",
+        token_budget: int = 4096,
+        dedupe: str = "exact",
+        dedupe_threshold: float = 0.8,
+        chunking: str = "length",
+        max_tokens: int = 128,
+        topic_shift_threshold: float = TOPIC_SHIFT_THRESHOLD,
+        min_tokens: int = MIN_NUGGET_TOKENS,
+        decode_workers: int = 4,
+        image_dedupe: bool = True,
     ):
+        if graph_backend not in GRAPH_BACKENDS:
+            raise ValueError(f"Unknown graph backend: {graph_backend}")
         self.model_name = model_name
+        self.workers = workers
+        self.ann_index = ann_index
+        self._resident: Dict[str, tuple] = {}
+        self.last_metadata: Dict = {}
+        self._ann_indexes: Dict[str, IVFFlatIndex] = {}
+        self.graph_backend = graph_backend
+        self.clusterer = clusterer
+        self.co_occurrence_options = {
+            "min_weight": min_co_occurrence,
+            "top_k": co_occurrence_top_k,
+        }
+        self.ingest_options = {
+            "max_size": max_file_size,
+            "include": include,
+            "exclude": exclude,
+        }
+        self.read_options = {"piece_chars": piece_chars, "errors": encoding_errors}
+        if dedupe not in DEDUPE_MODES:
+            raise ValueError(f"Unknown dedupe mode: {dedupe}")
+        self.dedupe_options = {"mode": dedupe, "threshold": dedupe_threshold}
+        if chunking not in CHUNKING:
+            raise ValueError(f"Unknown chunking: {chunking}")
+        self.chunking = chunking
+        self.chunk_options = {
+            "max_tokens": max_tokens,
+            "threshold": topic_shift_threshold,
+            "min_tokens": min_tokens,
+        }
+        self.k_options = {"strategy": k_strategy, "budget": k_budget, "n_jobs": k_jobs}
+        text_cache = image_cache = None
+        if cache_dir is not None:
+            text_dir = Path(cache_dir) / select_model(model_name).replace("/", "_")
+            image_dir = Path(cache_dir) / select_model(vision_model_name).replace("/", "_")
+            text_cache = EmbeddingCache(text_dir, max_entries=cache_size)
+            image_cache = (
+                text_cache
+                if image_dir == text_dir
+                else EmbeddingCache(image_dir, max_entries=cache_size)
+            )
         self.embedder = Embedder(
             model_name=model_name,
             batch_size=batch_size,
             device=device,
             model_dir=model_dir,
+            cache=text_cache,
+            backend=embed_backend,
+            quantize=quantize,
+            workers=embed_workers,
+            batching=batching,
+            token_budget=token_budget,
         )
         self.vision_embedder = VisionEmbedder(
             model_name=vision_model_name,
             batch_size=batch_size,
             device=device,
             model_dir=model_dir,
+            cache=image_cache,
+            decode_workers=decode_workers,
+            dedupe=image_dedupe,
         )
-        self.device = device or getattr(self.embedder.model, "device", "cpu")
+        self._device = device
         self.available_devices = list_devices()
 
 
@@ -54,23 +153,37 @@ class Pipeline:
 
         self.tagger = HeuristicTagger(labels=tags)
 
-    def run(
-        self,
-        path: Path,
-        *,
-        summary_path: Optional[Path] = None,
-        store: Optional[WeaviateStore] = None,
-        infer_topics: bool = False,
-        topic_api_key: Optional[str] = None,
-        topic_model: Optional[str] = None,
-    ) -> TagGraph:
-        items = load_files(path)
+    @property
+    def device(self):
+        """The requested device, or the text model's once it has been loaded."""
+        if self._device is not None:
+            return self._device
+        if getattr(self.embedder, "loaded", False):
+            return getattr(self.embedder.model, "device", "cpu")
+        return "auto"
+
+    def model_load_times(self) -> Dict[str, float]:
+        """Seconds spent loading each model this pipeline has used."""
+        return {
+            emb.model_name: round(emb.load_seconds, 3)
+            for emb in (self.embedder, self.vision_embedder)
+            if getattr(emb, "load_seconds", None) is not None
+        }
+
+    def _chunk_items(self, items):
+        """Chunk streamed ``items`` into nugget columns.
+
+        Raw file text is dropped once chunked, but the nuggets of the whole
+        corpus are collected here: dedupe and clustering need all of them.
+        """
         nuggets: List[str | Path] = []
         types: List[str] = []
         sources: List[Path] = []
         speakers: List[str | None] = []
         emotions: List[str | None] = []
-        for content, rel_path, is_image in tqdm(items, desc="Chunking"):
+        # Chunkers that need the model run here; workers only diarize for them.
+        chunked = iter_chunked(items, workers=self.workers, split=self.chunking == "length")
+        for content, rel_path, is_image, records in tqdm(chunked, desc="Chunking", unit="file"):
             if is_image:
                 nuggets.append(content)
                 types.append("image")
@@ -78,82 +191,556 @@ class Pipeline:
                 speakers.append(None)
                 emotions.append(None)
             else:
-                for chunk, speaker in diarize_and_chunk(content):
-                    ns = split_into_nuggets(chunk)
-                    for n in ns:
-                        nuggets.append(n)
-                        types.append("text")
-                        sources.append(rel_path)
-                        speakers.append(speaker)
-                        emotions.append(detect_emotion(n))
-
-        print(f"Embedding {len(nuggets)} chunks...")
-
-        embeddings = []
-        for nug, typ in tqdm(list(zip(nuggets, types)), desc="Embedding"):
+                for n, speaker, emotion in records:
+                    nuggets.append(n)
+                    types.append("text")
+                    sources.append(rel_path)
+                    speakers.append(speaker)
+                    emotions.append(emotion)
+        return nuggets, types, sources, speakers, emotions
+
+    def _embed(self, nuggets, types):
+        """Embed ``nuggets`` once per duplicate group; returns ``(vectors, dedupe)``."""
+        duplicates = dedupe(nuggets, types, **self.dedupe_options)
+        if duplicates.saved:
+            print(f"Skipping {duplicates.saved} duplicate chunks")
+        print(f"Embedding {len(duplicates.keep)} chunks...")
+        if not duplicates.saved:
+            return embed_nuggets(nuggets, types, self.embedder, self.vision_embedder), duplicates
+        # Duplicates share their representative's vector.
+        vectors = embed_nuggets(
+            [nuggets[i] for i in duplicates.keep],
+            [types[i] for i in duplicates.keep],
+            self.embedder,
+            self.vision_embedder,
+        )
+        return vectors[duplicates.positions], duplicates
+
+    def _split_tokens(self, turns, types, sources, speakers, emotions):
+        """Split speaker turns into nuggets sized by the model's tokenizer."""
+        limit = self.embedder.max_tokens
+        # Tokenize every sentence in one batch and hand the splitter these
+        # counts directly; the embedder's bounded cache may not hold them all.
+        sentences = list(
+            dict.fromkeys(
+                s for t, typ in zip(turns, types) if typ != "image" for s in SENTENCE_RE.split(t)
+            )
+        )
+        known = dict(zip(sentences, self.embedder.count_tokens(sentences)))
+
+        def count(texts):
+            # Only pieces of over-long sentences are new here.
+            missing = [t for t in texts if t not in known]
+            extra = dict(zip(missing, self.embedder.count_tokens(missing))) if missing else {}
+            return [known[t] if t in known else extra[t] for t in texts]
+
+        out = ([], [], [], [], [])
+        for turn, typ, source, speaker, emotion in zip(turns, types, sources, speakers, emotions):
+            if typ == "image":
+                records = [(turn, emotion)]
+            else:
+                records = [(n, detect_emotion(n)) for n in split_into_nuggets(turn, limit, count)]
+            for text, emo in records:
+                for column, value in zip(out, (text, typ, source, speaker, emo)):
+                    column.append(value)
+        return out
+
+    def _split_semantic(self, turns, types, sources, speakers):
+        """Split speaker turns into nuggets at topic shifts.
+
+        Every sentence is embedded once; a nugget's vector is the pooled
+        vectors of its sentences, so no second encoder pass is needed.
+        """
+        import numpy as np
+
+        units: List[str | Path] = []
+        unit_types: List[str] = []
+        spans = []
+        for content, typ in zip(turns, types):
+            parts = [content] if typ == "image" else split_sentences(content) or [content]
+            spans.append((len(units), len(units) + len(parts)))
+            units.extend(parts)
+            unit_types.extend([typ] * len(parts))
+        vectors, duplicates = self._embed(units, unit_types)
+        out = ([], [], [], [], [])
+        rows = []
+        for (start, stop), typ, source, speaker in zip(spans, types, sources, speakers):
             if typ == "image":
-                embeddings.append(self.vision_embedder.embed([nug])[0])
+                records = [(units[start], None)]
+                pooled = vectors[start:stop]
             else:
-                embeddings.append(self.embedder.embed([nug])[0])
-        embeddings_array = embeddings
-        k = choose_k(embeddings_array)
-        labels, _ = cluster_embeddings(embeddings_array, k)
-        tag_lists = self.tagger.tag(nuggets)
+                sentences = units[start:stop]
+                segments = semantic_segments(
+                    vectors[start:stop], [len(s.split()) for s in sentences], **self.chunk_options
+                )
+                records = [
+                    (text, detect_emotion(text))
+                    for text in (" ".join(sentences[i] for i in seg) for seg in segments)
+                ]
+                pooled = pool_vectors(vectors[start:stop], segments)
+            for (text, emotion), vec in zip(records, pooled):
+                for column, value in zip(out, (text, typ, source, speaker, emotion)):
+                    column.append(value)
+                rows.append(vec)
+        return (*out, np.asarray(rows, dtype=np.float32), duplicates)
+
+    @staticmethod
+    def _load_state(state_dir: Path):
+        """Return ``(graph, manifest, (cluster_ids, centroids))`` or ``None``."""
+        state_dir = Path(state_dir)
+        paths = [state_dir / n for n in ("manifest.json", "graph.pkl", "clusters.npz")]
+        if not all(p.exists() for p in paths):
+            return None
+        import numpy as np
+
+        manifest = Manifest.load(paths[0])
+        with open(paths[1], "rb") as f:
+            tg = pickle.load(f)
+        data = np.load(paths[2])
+        return tg, manifest, (data["ids"], data["centroids"])
+
+    def resume(self, state_dir: Path) -> Optional[TagGraph]:
+        """Load the state in ``state_dir`` into memory and return its graph."""
+        key = str(Path(state_dir).resolve())
+        if key not in self._resident:
+            state = self._load_state(state_dir)
+            if state is None:
+                return None
+            self._resident[key] = state
+        return self._resident[key][0]
+
+    @staticmethod
+    def _save_state(state_dir: Path, tg: TagGraph, manifest: Manifest, clusters) -> None:
+        import numpy as np
+
+        state_dir = Path(state_dir)
+        state_dir.mkdir(parents=True, exist_ok=True)
+        with open(state_dir / "graph.pkl", "wb") as f:
+            pickle.dump(tg, f)
+        np.savez(state_dir / "clusters.npz", ids=clusters[0], centroids=clusters[1])
+        manifest.save(state_dir / "manifest.json")
+
+    def _save_ann_index(
+        self, path: Path, ids, embeddings, stale_ids=None, persist=True, tg=None
+    ) -> Dict:
+        """Build (or, on incremental runs, update) the ANN index at ``path``.
 
+        An incremental run without an index at ``path`` (say, the first with
+        this summary path) indexes every nugget of ``tg``, not just its own.
+        """
+        start = time.perf_counter()
+        previous = self.get_ann_index(path) if stale_ids is not None else None
+        if previous is not None:
+            index = previous.updated(ids, embeddings, stale_ids)
+        elif stale_ids is not None and tg is not None:
+            print(f"No ANN index at {path}; indexing every nugget")
+            all_ids, vectors = self._stored_vectors(tg, known=(ids, embeddings))
+            index = IVFFlatIndex.build(vectors, all_ids)
+        else:
+            index = IVFFlatIndex.build(embeddings, ids)
+        if persist:
+            index.save(path)
+        self._ann_indexes[str(Path(path).resolve())] = index
+        return {
+            "path": str(path),
+            "count": len(index),
+            "n_lists": index.n_lists,
+            "build_seconds": round(time.perf_counter() - start, 3),
+        }
+
+    def save_state(self, state_dir: Path, summary_path: Optional[Path] = None) -> None:
+        """Write the resident state of ``state_dir`` and, with ``summary_path``,
+        its ANN index to disk; see ``persist`` in :meth:`run`."""
+        state = self._resident.get(str(Path(state_dir).resolve()))
+        if state is not None:
+            self._save_state(state_dir, *state)
+        if summary_path is not None:
+            index = self._ann_indexes.get(str(ann_index_path(summary_path).resolve()))
+            if index is not None:
+                index.save(ann_index_path(summary_path))
+
+    def get_ann_index(self, path: Path) -> Optional[IVFFlatIndex]:
+        """Return the ANN index at ``path``, from memory if this pipeline wrote it."""
+        key = str(Path(path).resolve())
+        if key not in self._ann_indexes:
+            if not (Path(path) / "index.json").exists():
+                return None
+            self._ann_indexes[key] = IVFFlatIndex.load(path)
+        return self._ann_indexes[key]
+
+    def _stored_vectors(self, tg: TagGraph, summary_path: Optional[Path] = None, known=None):
+        """Return ``(ids, vectors)`` of every nugget in ``tg``, L2-normalised.
+
+        Rows come from ``known`` (``(ids, vectors)`` of this run) or the ANN
+        index next to ``summary_path`` where they hold them; any other nugget
+        is embedded again from its text or image.
+        """
+        import numpy as np
+
+        nuggets = list(tg.iter_nuggets())
+        ids = np.asarray([n.id for n in nuggets], dtype=np.int64)
+        index = self.get_ann_index(ann_index_path(summary_path)) if summary_path else None
+        vectors = None
+        missing = list(range(len(nuggets)))
+        for source in (known, (index.ids, index.vectors) if index is not None else None):
+            if source is None or not len(source[0]):
+                continue
+            source_vectors = np.asarray(source[1], dtype=np.float32)
+            positions = {int(nid): i for i, nid in enumerate(source[0])}
+            found = [i for i in missing if nuggets[i].id in positions]
+            missing = [i for i in missing if nuggets[i].id not in positions]
+            if vectors is None:
+                vectors = np.zeros((len(nuggets), source_vectors.shape[1]), dtype=np.float32)
+            rows = source_vectors[[positions[nuggets[i].id] for i in found]]
+            vectors[found] = rows / np.maximum(np.linalg.norm(rows, axis=1, keepdims=True), 1e-12)
+        if missing:
+            texts = [nuggets[i].text for i in missing]
+            fresh = embed_nuggets(
+                texts,
+                ["image" if isinstance(t, Path) else "text" for t in texts],
+                self.embedder,
+                self.vision_embedder,
+            )
+            if vectors is None:
+                vectors = np.zeros((len(nuggets), fresh.shape[1]), dtype=np.float32)
+            vectors[missing] = fresh / np.maximum(
+                np.linalg.norm(fresh, axis=1, keepdims=True), 1e-12
+            )
+        if vectors is None:
+            vectors = np.zeros((0, 0), dtype=np.float32)
+        return ids, vectors
+
+    def recluster(
+        self,
+        state_dir: Path,
+        *,
+        summary_path: Optional[Path] = None,
+        infer_topics: bool = False,
+        topic_api_key: Optional[str] = None,
+        topic_model: Optional[str] = None,
+        persist: bool = True,
+    ) -> TagGraph:
+        """Fit the clusters of the state in ``state_dir`` again over all its nuggets.
+
+        Incremental runs only assign new nuggets to the existing centroids, so
+        the clusters of a growing corpus drift from what a fresh run would
+        find. This re-fits them from the stored vectors (see
+        :meth:`_stored_vectors`), relabels every nugget and rebuilds the graph.
+        The new centroids live in normalised space, which later runs honour.
+        """
+        state_key = str(Path(state_dir).resolve())
+        state = self._resident.pop(state_key, None) or self._load_state(state_dir)
+        if state is None:
+            raise ValueError(f"No pipeline state in {state_dir}")
+        tg, manifest, clusters = state
+        nuggets = list(tg.iter_nuggets())
+        if not nuggets:
+            self._resident[state_key] = state
+            return tg
+        _, vectors = self._stored_vectors(tg, summary_path)
+        options = self.k_options if self.clusterer == "kmeans" else {}
+        labels, cluster_info = get_clusterer(self.clusterer)(vectors, **options)
+        k = len({int(label) for label in labels if int(label) >= 0})
+        clusters = cluster_centroids(vectors, labels)
+        inferred = manifest.extra.pop("cluster_tags", None)
+        old_tags = {int(cid): tag for cid, tag in (inferred or {}).items()}
+        cluster_tags = {}
         if infer_topics:
             from .topic_inference import infer_cluster_tags
 
             cluster_tags = infer_cluster_tags(
-                nuggets,
-                labels,
-                api_key=topic_api_key,
-                method=topic_model,
+                [n.text for n in nuggets], labels, api_key=topic_api_key, method=topic_model
             )
+            manifest.extra["cluster_tags"] = {str(c): t for c, t in cluster_tags.items()}
+        relabelled = []
+        for nugget, label in zip(nuggets, labels):
+            tags = list(nugget.tags)
+            # Drop the cluster tag of the previous fit, which runs append last.
+            old = old_tags.get(nugget.cluster_id, f"cluster_{nugget.cluster_id}")
+            if inferred is not None and nugget.cluster_id >= 0 and tags and tags[-1] == old:
+                tags.pop()
+            if infer_topics and int(label) >= 0:
+                tags.append(cluster_tags.get(int(label), f"cluster_{label}"))
+            relabelled.append(
+                Nugget(
+                    nugget.id,
+                    nugget.text,
+                    tags,
+                    int(label),
+                    nugget.source,
+                    nugget.speaker,
+                    nugget.emotion,
+                )
+            )
+        tg = type(tg)()
+        tg.add_nuggets(relabelled)
+        tg.co_occurrence_edges(**self.co_occurrence_options)
+        manifest.extra["k"] = k
+        manifest.extra["unit_centroids"] = True
+        if persist:
+            self._save_state(state_dir, tg, manifest, clusters)
+        self._resident[state_key] = (tg, manifest, clusters)
+        metadata = dict(self.last_metadata, k=k, clusterer=self.clusterer, reclustered=True)
+        if cluster_info:
+            metadata.update(cluster_info)
+        self.last_metadata = metadata
+        if summary_path is not None:
+            import json
+
+            with open(summary_path, "w", encoding="utf-8") as f:
+                json.dump(tg.summary(metadata), f, indent=2)
+        return tg
+
+    def run(
+        self,
+        path: Path,
+        *,
+        summary_path: Optional[Path] = None,
+        store: Optional[WeaviateStore] = None,
+        infer_topics: bool = False,
+        topic_api_key: Optional[str] = None,
+        topic_model: Optional[str] = None,
+        state_dir: Optional[Path] = None,
+        persist: bool = True,
+    ) -> TagGraph:
+        """Tag the transcripts and images under ``path``.
+
+        When ``state_dir`` is given the graph, a file manifest and the cluster
+        centroids are kept there. A later run with the same ``state_dir`` only
+        chunks and embeds added or changed files, assigns their nuggets to the
+        nearest existing cluster and patches them into the saved graph. The
+        state also stays resident on this pipeline, so repeated runs skip
+        reloading it from disk. With ``persist=False`` the state and ANN index
+        are only updated in memory until :meth:`save_state` writes them; the
+        manifest on disk then still lists the files as unprocessed, so a crash
+        before that only costs re-running them.
+        """
+        state = None
+        diff = None
+        if state_dir is not None:
+            state_key = str(Path(state_dir).resolve())
+            # Taken out while the run mutates it; a failed run reloads from disk.
+            state = self._resident.pop(state_key, None)
+            if state is None:
+                state = self._load_state(state_dir)
+                if summary_path is not None:
+                    # An index held in memory may be ahead of the state on disk.
+                    self._ann_indexes.pop(str(ann_index_path(summary_path).resolve()), None)
+            manifest = state[1] if state is not None else Manifest()
+            diff = manifest.diff(iter_files(path, **self.ingest_options))
+            items = read_entries(
+                ((p, rel, is_image) for p, rel, is_image, _ in diff.added + diff.changed),
+                **self.read_options,
+            )
+        else:
+            items = stream_files(path, **self.ingest_options, **self.read_options)
+        nuggets, types, sources, speakers, emotions = self._chunk_items(items)
+
+        if self.chunking == "tokens":
+            nuggets, types, sources, speakers, emotions = self._split_tokens(
+                nuggets, types, sources, speakers, emotions
+            )
+
+        embed_start = time.perf_counter()
+        if self.chunking == "semantic":
+            (
+                nuggets,
+                types,
+                sources,
+                speakers,
+                emotions,
+                embeddings_array,
+                duplicates,
+            ) = self._split_semantic(nuggets, types, sources, speakers)
+        else:
+            embeddings_array, duplicates = self._embed(nuggets, types)
+        embed_seconds = time.perf_counter() - embed_start
+        image_stats = None
+        if "image" in types:
+            import numpy as np
+
+            image_stats = dict(getattr(self.vision_embedder, "stats", None) or {}) or None
+            # Images that failed to decode come back as NaN rows; drop their nuggets.
+            decoded = np.isfinite(embeddings_array).all(axis=1)
+            if not decoded.all():
+                print(f"Dropping {int((~decoded).sum())} images that could not be decoded")
+                keep = np.flatnonzero(decoded).tolist()
+                nuggets, types, sources, speakers, emotions = (
+                    [column[i] for i in keep]
+                    for column in (nuggets, types, sources, speakers, emotions)
+                )
+                embeddings_array = embeddings_array[decoded]
+        embedding_info = {
+            "nuggets": len(nuggets),
+            "seconds": round(embed_seconds, 3),
+            "nuggets_per_sec": round(len(nuggets) / embed_seconds, 1) if embed_seconds else None,
+            "workers": getattr(self.embedder, "workers", 1),
+            "batching": getattr(self.embedder, "batching", "fixed"),
+            "dedupe": duplicates.as_metadata(),
+            "chunking": self.chunking,
+        }
+        if self.chunking == "tokens":
+            embedding_info["max_tokens"] = self.embedder.max_tokens
+        if image_stats:
+            embedding_info["images"] = image_stats
+        print(f"Embedded {len(nuggets)} chunks at {embedding_info['nuggets_per_sec']} nuggets/sec")
+        if state is None:
+            options = self.k_options if self.clusterer == "kmeans" else {}
+            labels, cluster_info = get_clusterer(self.clusterer)(embeddings_array, **options)
+            # Noise (label -1, from HDBSCAN) is not a cluster.
+            k = len({int(label) for label in labels if int(label) >= 0})
+            clusters = cluster_centroids(embeddings_array, labels) if diff is not None else None
+        else:
+            tg, manifest, clusters = state
+            k = manifest.extra.get("k")
+            cluster_info = None
+            vectors = embeddings_array
+            if manifest.extra.get("unit_centroids"):
+                # Centroids re-fitted by recluster() are means of normalised rows.
+                import numpy as np
+
+                norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+                vectors = vectors / np.maximum(norms, 1e-12)
+            labels = assign_clusters(vectors, *clusters)
+        tag_lists = self.tagger.tag(nuggets)
+
+        if infer_topics:
+            if state is None:
+                from .topic_inference import infer_cluster_tags
+
+                cluster_tags = infer_cluster_tags(
+                    nuggets,
+                    labels,
+                    api_key=topic_api_key,
+                    method=topic_model,
+                )
+            else:
+                cluster_tags = {
+                    int(cid): tag for cid, tag in manifest.extra.get("cluster_tags", {}).items()
+                }
+            # Noise points get no cluster tag.
             tag_lists = [
                 tags + [cluster_tags.get(int(label), f"cluster_{label}")]
+                if int(label) >= 0
+                else tags
                 for tags, label in zip(tag_lists, labels)
             ]
-        tg = TagGraph()
+        first_id = manifest.next_id if diff is not None else 0
         nugget_objs = [
-            Nugget(i, t, tags, int(label), sources[i], spk, emo)
+            Nugget(first_id + i, t, tags, int(label), sources[i], spk, emo)
             for i, (t, tags, label, spk, emo) in enumerate(
                 zip(nuggets, tag_lists, labels, speakers, emotions)
             )
         ]
-        tg.add_nuggets(nugget_objs)
-        tg.co_occurrence_edges()
-        model_obj = getattr(self.embedder, "model", None)
+        if state is not None:
+            stale_ids = manifest.stale_ids(diff)
+        # Vectors and tags are final: upload in the background while the graph,
+        # ANN index, state and summary are written, and wait only at the end.
+        upload = None
+        if store is not None:
+            if state is None:
+                stored = nugget_objs
+            else:
+                stale = set(stale_ids)
+                stored = [n for n in tg.iter_nuggets() if n.id not in stale] + nugget_objs
+            vectors = {nug.id: row for nug, row in zip(nugget_objs, embeddings_array)}
+            upload = store.add_nuggets(stored, vectors, wait=False)
+        if state is None:
+            tg = GRAPH_BACKENDS[self.graph_backend]()
+            tg.add_nuggets(nugget_objs)
+            tg.co_occurrence_edges(**self.co_occurrence_options)
+        else:
+            tg.remove_nuggets(stale_ids)
+            tg.add_nuggets(nugget_objs, update_edges=True)
+        ann_info = None
+        if self.ann_index and summary_path is not None:
+            ann_info = self._save_ann_index(
+                ann_index_path(summary_path),
+                [nug.id for nug in nugget_objs],
+                embeddings_array,
+                stale_ids if state is not None else None,
+                persist=persist or diff is None,
+                tg=tg,
+            )
+        if diff is not None:
+            nugget_ids: Dict[str, List[int]] = defaultdict(list)
+            for nug in nugget_objs:
+                nugget_ids[str(nug.source)].append(nug.id)
+            manifest.apply(diff, nugget_ids)
+            manifest.next_id = first_id + len(nugget_objs)
+            if state is None:
+                manifest.extra["k"] = k
+                if infer_topics:
+                    manifest.extra["cluster_tags"] = {str(c): t for c, t in cluster_tags.items()}
+            if persist:
+                self._save_state(state_dir, tg, manifest, clusters)
+            self._resident[state_key] = (tg, manifest, clusters)
+        # Only inspect models that were actually loaded.
+        model_obj = (
+            getattr(self.embedder, "model", None)
+            if getattr(self.embedder, "loaded", True)
+            else None
+        )
         metadata = {
             "embedding_model": self.model_name,
-            "vision_model": self.vision_embedder.model.model_name,
+            "vision_model": self.vision_embedder.model_name,
             "embedding_dim": getattr(
                 model_obj, "get_sentence_embedding_dimension", lambda: None
             )()
             if model_obj
             else None,
-            "quantized": bool(getattr(model_obj, "quantization_config", None)) if model_obj else False,
+            "embedding_backend": getattr(self.embedder, "backend", "torch"),
+            "quantized": bool(getattr(self.embedder, "quantize", False))
+            or (bool(getattr(model_obj, "quantization_config", None)) if model_obj else False),
             "device": str(self.device),
             "batch_size": getattr(self.embedder, "batch_size", None),
             "k": k,
             "available_devices": self.available_devices,
+            "model_load_seconds": self.model_load_times(),
+            "embedding": embedding_info,
+        }
+        caches = {
+            name: emb.cache.stats()
+            for name, emb in (("text", self.embedder), ("image", self.vision_embedder))
+            if getattr(emb, "cache", None) is not None
         }
+        if caches:
+            metadata["embedding_cache"] = caches
+        metadata["clusterer"] = self.clusterer
+        if cluster_info:
+            metadata.update(cluster_info)
+        if diff is not None:
+            metadata["incremental"] = dict(diff.counts(), resumed=state is not None)
+        if ann_info is not None:
+            metadata["ann_index"] = ann_info
+        if summary_path is not None:
+            import subprocess
+
+            try:
+                commit = subprocess.check_output(
+                    ["git", "rev-parse", "--short", "HEAD"],
+                    cwd=str(Path(__file__).resolve().parents[1]),
+                    text=True,
+                ).strip()
+            except Exception:
+                commit = None
+            metadata["pipeline_version"] = commit
         if store is not None:
             metadata["weaviate_url"] = getattr(store, "url", None)
+            # The graph, index and state are already saved, so a failed upload
+            # is recorded rather than raised.
+            try:
+                stats = upload.result()
+            except Exception as exc:
+                metadata["weaviate_error"] = f"{type(exc).__name__}: {exc}"
+                print(f"Weaviate upload failed: {exc}")
+            else:
+                if isinstance(stats, ImportStats):
+                    metadata["weaviate_import"] = stats.as_metadata()
+        self.last_metadata = metadata
         if summary_path is not None:
-            with open(summary_path, "w", encoding="utf-8") as f:
-                import json
-                import subprocess
-                try:
-                    commit = subprocess.check_output(
-                        ["git", "rev-parse", "--short", "HEAD"],
-                        cwd=str(Path(__file__).resolve().parents[1]),
-                        text=True,
-                    ).strip()
-                except Exception:
-                    commit = None
-                metadata["pipeline_version"] = commit
+            import json
 
+            with open(summary_path, "w", encoding="utf-8") as f:
                 json.dump(tg.summary(metadata), f, indent=2)
-        if store is not None:
-            store.add_tag_graph(tg)
         return tg
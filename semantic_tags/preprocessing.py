@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+
+from .chunking import split_into_nuggets
+from .diarization import detect_emotion, diarize_and_chunk
+
+# One ``(nugget, speaker, emotion)`` record per nugget of a file.
+Record = Tuple[str, Optional[str], Optional[str]]
+Item = Tuple[Union[str, Path], Path, bool]
+
+
+def chunk_text(text: str, split: bool = True) -> List[Record]:
+    """Diarize ``text``, split it into nuggets and tag each nugget's emotion.
+
+    With ``split`` false each speaker turn is returned whole, without an
+    emotion, for chunkers that need embeddings to place their breaks.
+    """
+    if not split:
+        return [(chunk, speaker, None) for chunk, speaker in diarize_and_chunk(text)]
+    return [
+        (nugget, speaker, detect_emotion(nugget))
+        for chunk, speaker in diarize_and_chunk(text)
+        for nugget in split_into_nuggets(chunk)
+    ]
+
+
+def chunk_group(texts: List[str], split: bool = True) -> List[List[Record]]:
+    """Worker entry point: chunk a group of files in one task."""
+    return [chunk_text(text, split) for text in texts]
+
+
+def _groups(
+    items: Iterable[Item], group_files: int, group_chars: int
+) -> Iterator[List[Item]]:
+    group: List[Item] = []
+    size = 0
+    for item in items:
+        group.append(item)
+        if not item[2]:
+            size += len(item[0])
+        if len(group) >= group_files or size >= group_chars:
+            yield group
+            group, size = [], 0
+    if group:
+        yield group
+
+
+def iter_chunked(
+    items: Iterable[Item],
+    *,
+    workers: int = 1,
+    group_files: int = 32,
+    group_chars: int = 1 << 20,
+    split: bool = True,
+) -> Iterator[Tuple[Union[str, Path], Path, bool, Optional[List[Record]]]]:
+    """Yield ``(content, rel_path, is_image, records)`` in input order.
+
+    Images pass through with ``records`` set to ``None``. With ``workers > 1``
+    text files are sent to a process pool in groups of up to ``group_files``
+    files or ``group_chars`` characters. At most ``2 * workers`` groups are in
+    flight, so ``items`` is consumed lazily and memory stays bounded. Each
+    item is yielded once its group is done, which keeps progress bars
+    wrapped around the result accurate. ``split`` is passed to
+    :func:`chunk_text`.
+    """
+    if workers <= 1:
+        for content, rel_path, is_image in items:
+            yield content, rel_path, is_image, None if is_image else chunk_text(content, split)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending: deque = deque()
+
+        def drain():
+            group, future = pending.popleft()
+            results = iter(future.result())
+            for content, rel_path, is_image in group:
+                yield content, rel_path, is_image, None if is_image else next(results)
+
+        for group in _groups(items, group_files, group_chars):
+            texts = [content for content, _, is_image in group if not is_image]
+            pending.append((group, pool.submit(chunk_group, texts, split)))
+            if len(pending) >= 2 * workers:
+                yield from drain()
+        while pending:
+            yield from drain()
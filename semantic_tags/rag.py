@@ -21,8 +21,7 @@ def suggest_missing_tags(
     given or the API call fails, a simple heuristic returns the most common
     tokens that do not already appear as tags.
     """
-    summary = tg.summary()
-    tag_counts = summary.get("tag_counts", {})
+    tag_counts = tg.tag_counts()
 
     if api_key and openai is not None:
         try:
@@ -48,8 +47,7 @@ def suggest_missing_tags(
     # Fallback heuristic
     existing_tags = set(tag_counts)
     tokens: Counter[str] = Counter()
-    for node, data in tg.graph.nodes(data=True):
-        if data.get("type") == "nugget":
-            tokens.update(re.findall(r"\b\w{3,}\b", data.get("text", "").lower()))
+    for nugget in tg.iter_nuggets():
+        tokens.update(re.findall(r"\b\w{3,}\b", nugget.text.lower()))
     suggestions = [t for t, _ in tokens.most_common() if t not in existing_tags]
     return suggestions[:5]
@@ -0,0 +1,413 @@
+from __future__ import annotations
+
+import argparse
+import json
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path, PurePosixPath
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+from .ann_index import ann_index_path
+from .ingestion import TEXT_EXTS
+from .pipeline import Pipeline
+
+
+class TagService:
+    """Keeps a :class:`Pipeline` and its latest results resident.
+
+    Ingest jobs run one at a time on a worker thread. Each writes its
+    documents under ``state_dir/corpus`` and makes an incremental
+    ``Pipeline.run`` over that directory, so only new or changed documents are
+    chunked and embedded. Queries and summaries read an immutable snapshot
+    that is swapped in when a job finishes, so they never wait for ingestion.
+
+    The graph and ANN index are updated in memory by each job and written to
+    ``state_dir`` at most every ``persist_interval`` seconds (and on
+    :meth:`close`), so a burst of small ingests does not re-pickle the graph
+    and rewrite the index every time. ``0`` writes after every job.
+
+    Ingests only assign new nuggets to the existing clusters, so once the
+    corpus has grown ``recluster_growth`` times since the last fit the
+    clusters are re-fitted over all nuggets (``0`` disables this; a
+    :meth:`recluster` job can still be queued). Only the ``max_jobs`` most
+    recent finished jobs are kept.
+    """
+
+    def __init__(
+        self,
+        pipeline: Pipeline,
+        state_dir: Path,
+        persist_interval: float = 5.0,
+        recluster_growth: float = 2.0,
+        max_jobs: int = 1000,
+        **run_options: Any,
+    ):
+        self.pipeline = pipeline
+        self.pipeline.ann_index = True
+        self.state_dir = Path(state_dir)
+        self.corpus_dir = self.state_dir / "corpus"
+        self.corpus_dir.mkdir(parents=True, exist_ok=True)
+        self.summary_path = self.state_dir / "summary.json"
+        self.run_options = run_options
+        self.persist_interval = persist_interval
+        self.recluster_growth = recluster_growth
+        self.max_jobs = max_jobs
+        self._dirty = False
+        self._flush_timer: Optional[threading.Timer] = None
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self._jobs_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingest")
+        self._snapshot: Dict[str, Any] = {"index": None, "nuggets": {}, "summary": {}}
+        tg = self.pipeline.resume(self.state_dir)
+        if tg is not None:
+            self._refresh(tg)
+        self._fitted = len(self._snapshot["nuggets"])
+
+    def _refresh(self, tg, relabelled: bool = False) -> None:
+        index = self.pipeline.get_ann_index(ann_index_path(self.summary_path))
+        old = {} if relabelled else self._snapshot["nuggets"]
+        nuggets = {}
+        for nid in index.ids.tolist() if index is not None else ():
+            nugget = old.get(nid) or tg.get_nugget(nid)
+            if nugget is not None:
+                nuggets[nid] = nugget
+        summary = tg.summary()
+        summary["nugget_count"] = len(nuggets)
+        self._snapshot = {"index": index, "nuggets": nuggets, "summary": summary}
+
+    def _target(self, name: str) -> Path:
+        rel = PurePosixPath(name)
+        if not name or rel.is_absolute() or ".." in rel.parts:
+            raise ValueError(f"Invalid document name: {name!r}")
+        if rel.suffix.lower() not in TEXT_EXTS:
+            raise ValueError(f"Unsupported document type: {name!r}")
+        return self.corpus_dir.joinpath(*rel.parts)
+
+    def _new_job(self, **fields: Any) -> str:
+        job_id = uuid.uuid4().hex
+        with self._jobs_lock:
+            finished = [
+                jid for jid, job in self.jobs.items() if job["status"] in ("done", "failed")
+            ]
+            for jid in finished[: max(0, len(self.jobs) + 1 - self.max_jobs)]:
+                del self.jobs[jid]
+            self.jobs[job_id] = {"id": job_id, "status": "queued", **fields}
+        return job_id
+
+    def submit(self, documents: List[Dict[str, str]]) -> str:
+        """Queue an ingest job and return its id."""
+        if not isinstance(documents, list) or not all(isinstance(d, dict) for d in documents):
+            raise ValueError("documents must be a list of objects")
+        targets = [(self._target(doc.get("name", "")), doc.get("text", "")) for doc in documents]
+        job_id = self._new_job(documents=len(targets))
+        self._executor.submit(self._ingest, job_id, targets)
+        return job_id
+
+    def recluster(self) -> str:
+        """Queue a job that re-fits the clusters over all nuggets; returns its id."""
+        job_id = self._new_job(kind="recluster")
+        self._executor.submit(self._run_job, job_id, self._recluster)
+        return job_id
+
+    def _run_job(self, job_id: str, work) -> None:
+        job = self.jobs[job_id]
+        job["status"] = "running"
+        start = time.perf_counter()
+        try:
+            job.update(work(), status="done")
+            if self.persist_interval > 0:
+                self._dirty = True
+                self._schedule_flush()
+        except Exception as exc:
+            job.update(status="failed", error=f"{type(exc).__name__}: {exc}")
+        job["seconds"] = round(time.perf_counter() - start, 3)
+
+    def _ingest(self, job_id: str, targets) -> None:
+        self._run_job(job_id, lambda: self._write_and_run(targets))
+
+    def _write_and_run(self, targets) -> Dict[str, Any]:
+        for target, text in targets:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.write_text(text, encoding="utf-8")
+        tg = self.pipeline.run(
+            self.corpus_dir,
+            state_dir=self.state_dir,
+            summary_path=self.summary_path,
+            persist=self.persist_interval <= 0,
+            **self.run_options,
+        )
+        self._refresh(tg)
+        incremental = self.pipeline.last_metadata.get("incremental") or {}
+        result = {"incremental": incremental}
+        count = len(self._snapshot["nuggets"])
+        if not incremental.get("resumed"):
+            self._fitted = count
+        elif self.recluster_growth > 0 and count >= self.recluster_growth * max(self._fitted, 1):
+            result.update(self._recluster())
+        return result
+
+    def _recluster(self) -> Dict[str, Any]:
+        options = ("infer_topics", "topic_api_key", "topic_model")
+        tg = self.pipeline.recluster(
+            self.state_dir,
+            summary_path=self.summary_path,
+            persist=self.persist_interval <= 0,
+            **{name: self.run_options[name] for name in options if name in self.run_options},
+        )
+        self._refresh(tg, relabelled=True)
+        self._fitted = len(self._snapshot["nuggets"])
+        return {"reclustered": True, "k": self.pipeline.last_metadata.get("k")}
+
+    def _schedule_flush(self) -> None:
+        if self._flush_timer is None:
+            self._flush_timer = threading.Timer(self.persist_interval, self._queue_flush)
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+
+    def _queue_flush(self) -> None:
+        # Runs on the ingest thread so it never overlaps a pipeline run.
+        try:
+            self._executor.submit(self._flush)
+        except RuntimeError:  # shutting down; close() flushes
+            pass
+
+    def _flush(self) -> None:
+        self._flush_timer = None
+        if self._dirty:
+            self._dirty = False
+            self.pipeline.save_state(self.state_dir, self.summary_path)
+
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.jobs[job_id]["status"] in ("queued", "running"):
+            if deadline is not None and time.monotonic() > deadline:
+                break
+            time.sleep(0.01)
+        return dict(self.jobs[job_id])
+
+    def query(self, text: str, k: int = 5, n_probe: int = 8) -> List[Dict[str, Any]]:
+        """Return the ``k`` nuggets most similar to ``text``."""
+        snapshot = self._snapshot
+        index = snapshot["index"]
+        if index is None or not len(index):
+            return []
+        vector = self.pipeline.embedder.embed([text], use_cache=False)
+        ids, sims = index.search(vector, k, n_probe=n_probe)
+        results = []
+        for nid, sim in zip(ids[0].tolist(), sims[0].tolist()):
+            nugget = snapshot["nuggets"].get(nid)
+            if nugget is None:
+                continue
+            results.append(
+                {
+                    "id": nid,
+                    "score": round(sim, 6),
+                    "text": nugget.text,
+                    "tags": nugget.tags,
+                    "cluster": nugget.cluster_id,
+                    "source": str(nugget.source),
+                    "speaker": nugget.speaker,
+                }
+            )
+        return results
+
+    def summary(self) -> Dict[str, Any]:
+        return self._snapshot["summary"]
+
+    def close(self) -> None:
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+        self._executor.submit(self._flush)
+        self._executor.shutdown(wait=True)
+        self.pipeline.embedder.close()
+
+
+def _positive(value: Any, name: str, kind: type) -> Any:
+    """Parse a request parameter as a positive ``kind``; raises ``ValueError``."""
+    try:
+        if isinstance(value, bool) or (kind is int and isinstance(value, float)):
+            raise TypeError
+        parsed = kind(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be a positive {kind.__name__}") from None
+    if not parsed > 0:
+        raise ValueError(f"{name} must be a positive {kind.__name__}")
+    return parsed
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "TagServer"
+
+    def _send(self, status: int, payload: Any) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _body(self) -> Dict[str, Any]:
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+        if not isinstance(body, dict):
+            raise ValueError("body must be a JSON object")
+        return body
+
+    def do_GET(self) -> None:
+        service = self.server.service
+        url = urlparse(self.path)
+        if url.path == "/summary":
+            self._send(200, service.summary())
+        elif url.path == "/health":
+            self._send(200, {"status": "ok"})
+        elif url.path.startswith("/jobs/"):
+            job = service.jobs.get(url.path[len("/jobs/") :])
+            if job is None:
+                self._send(404, {"error": "unknown job"})
+            else:
+                self._send(200, dict(job))
+        elif url.path == "/query":
+            params = parse_qs(url.query)
+            text = params.get("q", [""])[0]
+            if not text:
+                self._send(400, {"error": "missing q"})
+                return
+            try:
+                k = _positive(params.get("k", ["5"])[0], "k", int)
+                n_probe = _positive(params.get("n_probe", ["8"])[0], "n_probe", int)
+            except ValueError as exc:
+                self._send(400, {"error": str(exc)})
+                return
+            self._send(200, {"results": service.query(text, k, n_probe)})
+        else:
+            self._send(404, {"error": "not found"})
+
+    def do_POST(self) -> None:
+        service = self.server.service
+        try:
+            body = self._body()
+        except ValueError:
+            self._send(400, {"error": "invalid JSON"})
+            return
+        if self.path == "/ingest":
+            try:
+                timeout = body.get("timeout")
+                if timeout is not None:
+                    timeout = _positive(timeout, "timeout", float)
+                job_id = service.submit(body.get("documents", []))
+            except ValueError as exc:
+                self._send(400, {"error": str(exc)})
+                return
+            if body.get("wait"):
+                self._send(200, service.wait(job_id, timeout))
+            else:
+                self._send(202, {"id": job_id, "status": "queued"})
+        elif self.path == "/recluster":
+            job_id = service.recluster()
+            if body.get("wait"):
+                self._send(200, service.wait(job_id))
+            else:
+                self._send(202, {"id": job_id, "status": "queued"})
+        elif self.path == "/query":
+            if not body.get("text") or not isinstance(body["text"], str):
+                self._send(400, {"error": "missing text"})
+                return
+            try:
+                k = _positive(body.get("k", 5), "k", int)
+                n_probe = _positive(body.get("n_probe", 8), "n_probe", int)
+            except ValueError as exc:
+                self._send(400, {"error": str(exc)})
+                return
+            self._send(200, {"results": service.query(body["text"], k, n_probe)})
+        else:
+            self._send(404, {"error": "not found"})
+
+    def log_message(self, format: str, *args: Any) -> None:
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class TagServer(ThreadingHTTPServer):
+    """HTTP front end for a :class:`TagService`; each request gets a thread."""
+
+    daemon_threads = True
+
+    def __init__(self, address, service: TagService, verbose: bool = False):
+        super().__init__(address, _Handler)
+        self.service = service
+        self.verbose = verbose
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    from .config import load_config, select_model
+
+    parser = argparse.ArgumentParser(description="Serve semantic tagging over HTTP")
+    parser.add_argument("--state-dir", type=Path, required=True, help="Corpus, graph and index")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--config", type=Path, help="Path to configuration file")
+    parser.add_argument("--model", type=str, help="Model alias or path")
+    parser.add_argument("--vision-model", type=str, help="Vision model alias or path")
+    parser.add_argument("--device", type=str)
+    parser.add_argument("--batch-size", type=int)
+    parser.add_argument("--embed-workers", type=int, default=1, help="Text encoding processes")
+    parser.add_argument("--tags", type=str, help="Comma separated list of tags")
+    parser.add_argument("--tag-file", type=Path, help="Path to text file with default tags")
+    parser.add_argument("--graph-backend", choices=["networkx", "compact"], default="networkx")
+    parser.add_argument(
+        "--persist-interval",
+        type=float,
+        default=5.0,
+        help="Write the graph and index to --state-dir at most this often (seconds; 0 = every job)",
+    )
+    parser.add_argument(
+        "--recluster-growth",
+        type=float,
+        default=2.0,
+        help="Re-fit clusters once the corpus has grown this many times since the last fit (0 = never)",
+    )
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    args = parser.parse_args(argv)
+
+    config = load_config(args.config)
+    pipeline = Pipeline(
+        model_name=select_model(args.model) if args.model else config["default_model"],
+        vision_model_name=select_model(args.vision_model)
+        if args.vision_model
+        else config.get("vision_model", config.get("default_vision_model", "")),
+        batch_size=args.batch_size or config.get("batch_size", 32),
+        device=args.device or config.get("device"),
+        tags=args.tags.split(",") if args.tags else None,
+        tag_file=args.tag_file,
+        model_dir=Path(config["model_dir"]),
+        cache_dir=Path(config["cache_dir"]) if config.get("cache_dir") else None,
+        cache_size=config.get("cache_size", 100_000),
+        graph_backend=args.graph_backend,
+        embed_workers=args.embed_workers,
+    )
+    # Load the text model up front so the first request does not pay for it;
+    # the vision model still loads on the first image.
+    pipeline.embedder.embed(["warm-up"], use_cache=False)
+    service = TagService(
+        pipeline,
+        args.state_dir,
+        persist_interval=args.persist_interval,
+        recluster_growth=args.recluster_growth,
+    )
+    server = TagServer((args.host, args.port), service, verbose=args.verbose)
+    print(f"Serving on http://{args.host}:{server.server_address[1]} (state in {args.state_dir})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 import re
+from bisect import bisect_right
 from collections import defaultdict
-from typing import Dict, Iterable, List
+from typing import Dict, Iterable, List, Optional, Tuple
 
 
 DEFAULT_LABELS = {
@@ -8,19 +9,136 @@ DEFAULT_LABELS = {
     "anime": [r"\banime\b", r"\bmanga\b"],
 }
 
+# ``\bLITERAL\b`` where LITERAL only escapes non-alphanumeric characters.
+_LITERAL_RE = re.compile(r"\\b((?:\\[^A-Za-z0-9]|[^\\.^$*+?{}\[\]|()])+)\\b")
+_UNESCAPE_RE = re.compile(r"\\(.)")
+_SEPARATOR = "\n\x00\n"
+
+
+def _literal(pattern: str) -> Optional[str]:
+    """Return the literal text of a ``\\bword\\b`` pattern, else ``None``."""
+    m = _LITERAL_RE.fullmatch(pattern)
+    if not m:
+        return None
+    return _UNESCAPE_RE.sub(r"\1", m.group(1))
+
+
+def _is_word(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+
+def _trie_pattern(node: dict) -> str:
+    """Render a character trie as a regex; longer continuations are tried first."""
+    branches = [re.escape(ch) + _trie_pattern(child) for ch, child in sorted(node.items()) if ch]
+    if not branches:
+        return ""
+    body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+    return f"(?:{body})?" if "" in node else body
+
+
+class LiteralMatcher:
+    """Find whole-word literals in many texts with one compiled regex.
+
+    All literals are merged into a character trie rendered as a single
+    case-insensitive pattern, so each text is scanned once no matter how many
+    literals there are. The scan reports the longest literal at every start
+    position; shorter literals that are prefixes of it are then checked for a
+    word boundary, which makes the result identical to searching each
+    ``\\bliteral\\b`` pattern separately.
+    """
+
+    def __init__(self, literals: Iterable[str], chunk_chars: int = 1 << 22):
+        self.literals = {lit.lower() for lit in literals if lit}
+        self.chunk_chars = chunk_chars
+        trie: dict = {}
+        for lit in self.literals:
+            node = trie
+            for ch in lit:
+                node = node.setdefault(ch, {})
+            node[""] = True
+        # For each literal, the shorter literals that are prefixes of it.
+        self.prefixes: Dict[str, List[str]] = {}
+        for lit in self.literals:
+            node = trie
+            found = []
+            for i, ch in enumerate(lit[:-1]):
+                node = node[ch]
+                if "" in node:
+                    found.append(lit[: i + 1])
+            self.prefixes[lit] = found
+        self.regex = (
+            re.compile(r"(?=(\b" + _trie_pattern(trie) + r"\b))", re.I) if trie else None
+        )
+
+    def find(self, texts: List[str]) -> List[set]:
+        """Return the set of lowercased literals found in each text."""
+        results: List[set] = [set() for _ in texts]
+        if self.regex is None:
+            return results
+        start = 0
+        while start < len(texts):
+            # Scan texts in joined chunks to avoid one regex call per text.
+            stop, size = start, 0
+            while stop < len(texts) and (stop == start or size < self.chunk_chars):
+                size += len(texts[stop]) + len(_SEPARATOR)
+                stop += 1
+            self._scan(texts, start, stop, results)
+            start = stop
+        return results
+
+    def _scan(self, texts: List[str], start: int, stop: int, results: List[set]) -> None:
+        offsets = []
+        pos = 0
+        for text in texts[start:stop]:
+            offsets.append(pos)
+            pos += len(text) + len(_SEPARATOR)
+        joined = _SEPARATOR.join(texts[start:stop])
+        n = len(joined)
+        for m in self.regex.finditer(joined):
+            found = m.group(1).lower()
+            if found not in self.prefixes:
+                continue
+            i = bisect_right(offsets, m.start()) - 1
+            results[start + i].add(found)
+            for prefix in self.prefixes[found]:
+                end = m.start() + len(prefix)
+                before = _is_word(joined[end - 1])
+                after = end < n and _is_word(joined[end])
+                if before != after:
+                    results[start + i].add(prefix)
+
 
 class HeuristicTagger:
     def __init__(self, patterns: Dict[str, List[str]] = None, labels: List[str] | None = None):
         if labels is not None:
             patterns = {l: [rf"\b{re.escape(l)}\b"] for l in labels}
-        self.patterns = {k: [re.compile(p, re.I) for p in v] for k, v in (patterns or DEFAULT_LABELS).items()}
+        patterns = patterns or DEFAULT_LABELS
+        self.patterns = {k: [re.compile(p, re.I) for p in v] for k, v in patterns.items()}
+        self._rank = {label: i for i, label in enumerate(self.patterns)}
+        # Literal word patterns go through one shared matcher; anything else
+        # is searched label by label.
+        self._literal_labels: Dict[str, List[str]] = defaultdict(list)
+        self._regex_labels: List[Tuple[str, List[re.Pattern]]] = []
+        for label, sources in patterns.items():
+            slow = []
+            for src in sources:
+                lit = _literal(src)
+                if lit is None:
+                    slow.append(re.compile(src, re.I))
+                elif label not in self._literal_labels[lit.lower()]:
+                    self._literal_labels[lit.lower()].append(label)
+            if slow:
+                self._regex_labels.append((label, slow))
+        self._matcher = LiteralMatcher(self._literal_labels)
 
     def tag(self, texts: Iterable[str]) -> List[List[str]]:
+        # Image nuggets are paths and carry no words.
+        texts = [text if isinstance(text, str) else "" for text in texts]
         results: List[List[str]] = []
-        for text in texts:
-            tags = []
-            for label, regexes in self.patterns.items():
-                if any(r.search(text) for r in regexes):
-                    tags.append(label)
-            results.append(tags)
+        for text, found in zip(texts, self._matcher.find(texts)):
+            tags = {label for lit in found for label in self._literal_labels[lit]}
+            for label, regexes in self._regex_labels:
+                if label not in tags and any(r.search(text) for r in regexes):
+                    tags.add(label)
+            results.append(sorted(tags, key=self._rank.__getitem__))
         return results
@@ -1,47 +1,177 @@
 from __future__ import annotations
 
-from typing import Dict, List
+from typing import Dict, List, Optional, Sequence
 
 import re
-from collections import Counter
+import warnings
+from collections import Counter, defaultdict
 
+TOPIC_METHODS = ("ctfidf", "bertopic", "frequency")
+# Methods kept for old command lines, mapped to their replacement.
+DEPRECATED_TOPIC_METHODS = {"fastopic": "ctfidf"}
 
-def infer_cluster_tags(
-    nuggets: List[str], labels: List[int], top_n: int = 2, api_key: str | None = None
+TOKEN_RE = re.compile(r"\b\w{3,}\b")
+
+STOPWORDS = frozenset(
+    """
+    about above after again against all also and any are because been before being
+    below between both but can could did does doing down during each few for from
+    further had has have having her here hers herself him himself his how into its
+    itself just more most myself nor not now off once only other our ours ourselves
+    out over own same she should some such than that the their theirs them
+    themselves then there these they this those through too under until very was
+    were what when where which while who whom why will with would you your yours
+    yourself yourselves get got like really yes yeah okay let one two well
+    """.split()
+)
+
+
+def ctfidf_labels(
+    nuggets: Sequence[str], labels: Sequence[int], top_n: int = 2
 ) -> Dict[int, str]:
-    """Return a short label for each cluster.
+    """Label clusters by their most distinctive terms with class-based TF-IDF.
 
-    If ``api_key`` is provided, the OpenAI API will be queried. Otherwise a simple
-    word-frequency heuristic is used.
+    All nuggets are tokenized once into a sparse document-term matrix and
+    the rows are summed per cluster with a single sparse product. A term's
+    score in a cluster is its frequency there, normalized by the cluster's
+    size, times ``log(1 + A / f)`` where ``A`` is the average number of
+    words per cluster and ``f`` the term's frequency in the whole corpus.
+    Stopwords and tokens shorter than three characters are ignored and
+    noise labels (``-1``) are skipped.
     """
-    n_clusters = max(labels) + 1 if labels else 0
+    import numpy as np
+    from scipy import sparse
+
+    labels = np.asarray(labels, dtype=np.int64).reshape(-1)
+    vocab: Dict[str, int] = {}
+    indices: List[int] = []
+    indptr = [0]
+    for text in nuggets:
+        for token in TOKEN_RE.findall(text.lower()):
+            if token not in STOPWORDS:
+                indices.append(vocab.setdefault(token, len(vocab)))
+        indptr.append(len(indices))
+    clusters = np.unique(labels[labels >= 0])
+    if not len(clusters) or not vocab:
+        return {int(c): f"cluster_{c}" for c in clusters}
+    docs = sparse.csr_matrix(
+        (np.ones(len(indices), dtype=np.float32), indices, indptr),
+        shape=(len(nuggets), len(vocab)),
+    )
+    rows = np.searchsorted(clusters, labels)
+    member = labels >= 0
+    groups = sparse.csr_matrix(
+        (np.ones(int(member.sum()), dtype=np.float32), (rows[member], np.flatnonzero(member))),
+        shape=(len(clusters), len(nuggets)),
+    )
+    counts = (groups @ docs).tocsr()
+    counts.sum_duplicates()
+    totals = np.asarray(counts.sum(axis=1)).ravel()
+    freq = np.asarray(counts.sum(axis=0)).ravel()
+    idf = np.log1p(totals.mean() / np.maximum(freq, 1))
+    scores = sparse.diags(1 / np.maximum(totals, 1)) @ counts @ sparse.diags(idf)
+    scores = scores.tocsr()
+    terms = np.array(list(vocab))
+    result: Dict[int, str] = {}
+    for row, cid in enumerate(clusters.tolist()):
+        start, stop = scores.indptr[row], scores.indptr[row + 1]
+        if start == stop:
+            result[cid] = f"cluster_{cid}"
+            continue
+        data = scores.data[start:stop]
+        top = np.argsort(-data, kind="stable")[:top_n]
+        result[cid] = " ".join(terms[scores.indices[start:stop][top]])
+    return result
+
+
+def _frequency_label(texts: List[str], top_n: int) -> Optional[str]:
+    counts = Counter(TOKEN_RE.findall(" ".join(texts).lower()))
+    return " ".join(t for t, _ in counts.most_common(top_n)) if counts else None
+
+
+def _openai_labels(grouped: Dict[int, List[str]], api_key: str) -> Dict[int, str]:
+    try:
+        import openai
+    except ImportError:
+        return {}
+    openai.api_key = api_key
     result: Dict[int, str] = {}
-    for cid in range(n_clusters):
-        texts = [t for t, l in zip(nuggets, labels) if l == cid]
-        if not texts:
+    for cid, texts in sorted(grouped.items()):
+        try:
+            prompt = "Provide a 1-2 word topic label for the following text:\n" + " ".join(texts)
+            resp = openai.ChatCompletion.create(
+                model="gpt-3.5-turbo",
+                messages=[{"role": "user", "content": prompt}],
+            )
+            result[cid] = resp["choices"][0]["message"]["content"].strip()
+        except Exception:
             continue
-        if api_key:
-            try:
-                import openai
-
-                openai.api_key = api_key
-                prompt = (
-                    "Provide a 1-2 word topic label for the following text:\n" + " ".join(texts)
-                )
-                resp = openai.ChatCompletion.create(
-                    model="gpt-3.5-turbo",
-                    messages=[{"role": "user", "content": prompt}],
-                )
-                label = resp["choices"][0]["message"]["content"].strip()
-                result[cid] = label
-                continue
-            except Exception:
-                pass
-        tokens = re.findall(r"\b\w{3,}\b", " ".join(texts).lower())
-        counts = Counter(tokens)
-        if counts:
-            label = " ".join(t for t, _ in counts.most_common(top_n))
-        else:
-            label = f"cluster_{cid}"
-        result[cid] = label
+    return result
+
+
+def resolve_topic_method(method: str | None) -> str:
+    """Return the labeller ``method`` runs, warning about aliases.
+
+    ``None`` means ``ctfidf``. Deprecated names emit a ``FutureWarning`` and
+    map to their replacement; ``bertopic`` warns that the BERTopic package is
+    not used, only the c-TF-IDF weighting it labels topics with.
+    """
+    method = method or "ctfidf"
+    if method in DEPRECATED_TOPIC_METHODS:
+        replacement = DEPRECATED_TOPIC_METHODS[method]
+        warnings.warn(
+            f"Topic model {method!r} is deprecated and runs {replacement!r}; "
+            f"use {replacement!r} instead",
+            FutureWarning,
+            stacklevel=2,
+        )
+        return replacement
+    if method not in TOPIC_METHODS:
+        raise ValueError(f"Unknown topic model: {method}. Available: {', '.join(TOPIC_METHODS)}")
+    if method == "bertopic":
+        warnings.warn(
+            "Topic model 'bertopic' does not run BERTopic; clusters are labelled with "
+            "the built-in class-based TF-IDF ('ctfidf')",
+            UserWarning,
+            stacklevel=2,
+        )
+        return "ctfidf"
+    return method
+
+
+def infer_cluster_tags(
+    nuggets: List[str],
+    labels: List[int],
+    top_n: int = 2,
+    api_key: str | None = None,
+    method: str | None = None,
+) -> Dict[int, str]:
+    """Return a short label for each cluster.
+
+    If ``api_key`` is provided, the OpenAI API will be queried. Otherwise
+    ``method`` picks the local labeller: ``ctfidf`` (the default; ``bertopic``
+    is an alias, as it is the weighting BERTopic labels topics with) or the
+    plain word-frequency heuristic ``frequency``. See
+    :func:`resolve_topic_method` for the aliases.
+    """
+    method = resolve_topic_method(method)
+    # Image nuggets are paths and carry no words.
+    nuggets = [text if isinstance(text, str) else "" for text in nuggets]
+    grouped: Dict[int, List[str]] = defaultdict(list)
+    for text, label in zip(nuggets, labels):
+        if int(label) >= 0:
+            grouped[int(label)].append(text)
+    result = _openai_labels(grouped, api_key) if api_key else {}
+    missing = [cid for cid in sorted(grouped) if cid not in result]
+    if not missing:
+        return result
+    if method == "ctfidf":
+        try:
+            local = ctfidf_labels(nuggets, labels, top_n)
+        except ImportError:  # pragma: no cover - numpy/scipy missing
+            local = {}
+    else:
+        local = {}
+    for cid in missing:
+        result[cid] = local.get(cid) or _frequency_label(grouped[cid], top_n) or f"cluster_{cid}"
     return result
@@ -1,58 +1,614 @@
-from typing import List, Optional, Union
+from __future__ import annotations
+
+import platform
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Sequence, Tuple, Union
 
 import numpy as np
 from pathlib import Path
-from sentence_transformers import SentenceTransformer
-from PIL import Image
 
 from .config import DEFAULT_CONFIG, download_model, select_model
+from .embedding_cache import EmbeddingCache, image_key, text_key
+
+if TYPE_CHECKING:  # imported lazily; both pull in heavy dependencies
+    from PIL import Image
+    from sentence_transformers import SentenceTransformer
+
+    from .embed_pool import EmbedPool
+
+
+def _cached_encode(
+    cache: Optional[EmbeddingCache],
+    keys: Sequence[Optional[str]],
+    items: Sequence,
+    encode: Callable[[list], np.ndarray],
+) -> np.ndarray:
+    """Encode ``items``, serving rows from ``cache`` where possible.
+
+    Items whose key is ``None`` are always encoded. Each distinct missing key
+    is encoded once and written back to the cache, unless its row is not
+    finite: encoders mark items they failed on with NaN rows.
+    """
+    if cache is None:
+        return encode(list(items))
+    lookup = [i for i, k in enumerate(keys) if k is not None]
+    rows: List[Optional[np.ndarray]] = [None] * len(items)
+    for i, vec in zip(lookup, cache.get_many([keys[i] for i in lookup])):
+        rows[i] = vec
+    pending: dict = {}
+    for i, row in enumerate(rows):
+        if row is None:
+            pending.setdefault(keys[i] if keys[i] is not None else ("item", i), []).append(i)
+    if pending:
+        firsts = [idx[0] for idx in pending.values()]
+        vecs = encode([items[i] for i in firsts])
+        fresh = [
+            (keys[i], vec)
+            for i, vec in zip(firsts, vecs)
+            if keys[i] is not None and np.isfinite(vec).all()
+        ]
+        if fresh:
+            cache.put_many([k for k, _ in fresh], [v for _, v in fresh])
+        for idx, vec in zip(pending.values(), vecs):
+            for i in idx:
+                rows[i] = vec
+    return np.asarray(rows, dtype=np.float32)
+
+
+_MODELS: Dict[Tuple, SentenceTransformer] = {}
+_LOAD_SECONDS: Dict[Tuple, float] = {}
+_MODELS_LOCK = threading.Lock()
+
+
+BACKENDS = ("torch", "onnx")
+# ONNX Runtime dynamic quantization target for this CPU.
+QUANTIZATION_CONFIG = "arm64" if platform.machine().lower() in ("arm64", "aarch64") else "avx2"
+
+
+def _model_key(model_name, device, model_dir, revision, backend="torch", quantize=False) -> Tuple:
+    return (model_name, device, str(model_dir) if model_dir else None, revision, backend, quantize)
+
+
+def export_onnx(
+    model_name: str,
+    model_dir: Path,
+    revision: Optional[str] = None,
+    quantize: bool = False,
+) -> Tuple[str, str]:
+    """Export ``model_name`` to ONNX under ``model_dir`` and return ``(path, file_name)``.
+
+    The export (and, with ``quantize``, its dynamically int8-quantized
+    variant) is written once to ``model_dir/<model>_onnx`` and reused by later
+    loads. ``file_name`` is the ONNX file to load relative to ``path``.
+    """
+    from sentence_transformers import SentenceTransformer
+
+    target = Path(model_dir) / (model_name.replace("/", "_") + "_onnx")
+    file_name = "onnx/model.onnx"
+    model = None
+    if not (target / file_name).exists():
+        model = SentenceTransformer(
+            model_name,
+            backend="onnx",
+            device="cpu",
+            cache_folder=str(model_dir),
+            revision=revision,
+        )
+        model.save(str(target))
+    if quantize:
+        file_name = f"onnx/model_qint8_{QUANTIZATION_CONFIG}.onnx"
+        if not (target / file_name).exists():
+            from sentence_transformers import export_dynamic_quantized_onnx_model
+
+            if model is None:
+                model = SentenceTransformer(str(target), backend="onnx", device="cpu")
+            export_dynamic_quantized_onnx_model(model, QUANTIZATION_CONFIG, str(target))
+    return str(target), file_name
+
+
+def load_model(
+    model_name: str,
+    device: Optional[str] = None,
+    model_dir: Optional[Path] = None,
+    revision: Optional[str] = None,
+    backend: str = "torch",
+    quantize: bool = False,
+) -> SentenceTransformer:
+    """Return a shared ``SentenceTransformer``, loading it on first request.
+
+    Models are kept in an in-process registry keyed by their settings, so
+    pipelines with the same settings share one instance. With the ``torch``
+    backend a copy saved under ``model_dir`` is preferred over the hub; the
+    ``onnx`` backend runs through ONNX Runtime from an export cached by
+    :func:`export_onnx`, int8-quantized when ``quantize`` is set.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend: {backend}. Available: {', '.join(BACKENDS)}")
+    if quantize and backend != "onnx":
+        raise ValueError("int8 quantization requires the onnx backend")
+    key = _model_key(model_name, device, model_dir, revision, backend, quantize)
+    with _MODELS_LOCK:
+        if key not in _MODELS:
+            from sentence_transformers import SentenceTransformer
+
+            start = time.perf_counter()
+            if backend == "onnx":
+                source, file_name = export_onnx(
+                    model_name, model_dir or DEFAULT_CONFIG["model_dir"], revision, quantize
+                )
+                _MODELS[key] = SentenceTransformer(
+                    source,
+                    backend="onnx",
+                    device=device or "cpu",
+                    model_kwargs={"file_name": file_name},
+                )
+            else:
+                source = model_name
+                if model_dir:
+                    local_path = Path(model_dir) / model_name.replace("/", "_")
+                    if local_path.exists():
+                        source = str(local_path)
+                _MODELS[key] = SentenceTransformer(
+                    source,
+                    device=device,
+                    cache_folder=str(model_dir) if model_dir else None,
+                    revision=revision,
+                )
+            _LOAD_SECONDS[key] = time.perf_counter() - start
+        return _MODELS[key]
+
+
+def clear_models() -> None:
+    """Drop every model from the registry."""
+    with _MODELS_LOCK:
+        _MODELS.clear()
+        _LOAD_SECONDS.clear()
+
+
+class _LazyModel:
+    """Holds model settings and loads the model from the registry on first use."""
+
+    def __init__(
+        self,
+        model_name: str,
+        batch_size: int,
+        device: Optional[str],
+        model_dir: Optional[Path],
+        revision: Optional[str],
+        cache: Optional[EmbeddingCache],
+        backend: str = "torch",
+        quantize: bool = False,
+    ):
+        self.model_name = select_model(model_name)
+        self.batch_size = batch_size
+        self.device = device
+        self.model_dir = model_dir
+        self.revision = revision
+        self.cache = cache
+        self.backend = backend
+        self.quantize = quantize
+        self._model: Optional[SentenceTransformer] = None
+
+    def _key(self) -> Tuple:
+        return _model_key(
+            self.model_name, self.device, self.model_dir, self.revision, self.backend, self.quantize
+        )
+
+    @property
+    def model(self) -> SentenceTransformer:
+        if self._model is None:
+            self._model = load_model(*self._key())
+        return self._model
+
+    @property
+    def loaded(self) -> bool:
+        return self._model is not None
+
+    @property
+    def load_seconds(self) -> Optional[float]:
+        """Time the registry spent loading this model, or ``None`` if unused."""
+        if self._model is None:
+            return None
+        return _LOAD_SECONDS.get(self._key())
+
+    @property
+    def cache_name(self) -> str:
+        """Model name used in embedding cache keys; backends differ numerically."""
+        if self.backend == "torch":
+            return self.model_name
+        return f"{self.model_name}@{self.backend}{'-int8' if self.quantize else ''}"
+
+
+BATCHING = ("fixed", "length")
+
 
+def token_budget_batches(
+    lengths: Sequence[int], token_budget: int, max_batch: int = 256
+) -> List[List[int]]:
+    """Group indices into batches of similar length under a padded-token budget.
 
-class Embedder:
+    Indices are sorted longest first, so a batch's cost is its first length
+    times its size; a batch grows while that stays within ``token_budget``
+    and it holds at most ``max_batch`` items. Every batch has at least one item.
+    """
+    order = sorted(range(len(lengths)), key=lambda i: -lengths[i])
+    batches: List[List[int]] = []
+    batch: List[int] = []
+    for i in order:
+        if batch and (
+            len(batch) >= max_batch or (len(batch) + 1) * max(lengths[batch[0]], 1) > token_budget
+        ):
+            batches.append(batch)
+            batch = []
+        batch.append(i)
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+class Embedder(_LazyModel):
     def __init__(
         self,
         model_name: str = DEFAULT_CONFIG["default_model"],
         batch_size: int = 32,
         device: Optional[str] = None,
         model_dir: Optional[Path] = None,
+        revision: Optional[str] = None,
+        cache: Optional[EmbeddingCache] = None,
+        backend: str = "torch",
+        quantize: bool = False,
+        workers: int = 1,
+        batching: str = "fixed",
+        token_budget: int = 4096,
     ):
-        model_name = select_model(model_name)
-        if model_dir:
-            local_path = Path(model_dir) / model_name.replace("/", "_")
-            if local_path.exists():
-                model_name = str(local_path)
-        self.model = SentenceTransformer(model_name, device=device, cache_folder=str(model_dir) if model_dir else None)
-        self.batch_size = batch_size
+        super().__init__(
+            model_name, batch_size, device, model_dir, revision, cache, backend, quantize
+        )
+        if batching not in BATCHING:
+            raise ValueError(f"Unknown batching: {batching}. Available: {', '.join(BATCHING)}")
+        self.workers = workers
+        self.batching = batching
+        self.token_budget = token_budget
+        self.token_cache_size = 100_000
+        self._token_counts: "OrderedDict[str, int]" = OrderedDict()
+        self._pool: Optional[EmbedPool] = None
+
+    @property
+    def pool(self) -> Optional[EmbedPool]:
+        """Worker processes used when ``workers > 1``, started on first use."""
+        if self.workers > 1 and self._pool is None:
+            from .embed_pool import EmbedPool
+
+            self._pool = EmbedPool(self._key(), self.workers, batch_size=self.batch_size)
+        return self._pool
+
+    def close(self) -> None:
+        """Shut down the worker processes, if any."""
+        if self._pool is not None:
+            self._pool.close()
+
+    def count_tokens(self, texts: Sequence[str]) -> List[int]:
+        """Model tokens in each of ``texts``, without special tokens or truncation.
+
+        Counts are cached per text and misses are tokenized together in one
+        batched call of the model's fast tokenizer; the oldest counts are
+        dropped beyond ``token_cache_size``. This loads the model in this
+        process, also when a worker pool does the encoding.
+        """
+        missing = [t for t in dict.fromkeys(texts) if t not in self._token_counts]
+        if missing:
+            ids = self.model.tokenizer(
+                missing,
+                add_special_tokens=False,
+                return_attention_mask=False,
+                return_token_type_ids=False,
+            )["input_ids"]
+            self._token_counts.update(zip(missing, map(len, ids)))
+        counts = [self._token_counts[t] for t in texts]
+        while len(self._token_counts) > self.token_cache_size:
+            self._token_counts.popitem(last=False)
+        return counts
+
+    @property
+    def max_tokens(self) -> int:
+        """Text tokens that fit in one model input, after special tokens."""
+        limit = getattr(self.model, "max_seq_length", None) or 512
+        tokenizer = getattr(self.model, "tokenizer", None)
+        special = tokenizer.num_special_tokens_to_add() if tokenizer is not None else 2
+        return limit - special
+
+    def token_lengths(self, texts: Sequence[str]) -> List[int]:
+        """Model input lengths of ``texts``, capped at the model's sequence limit.
 
-    def embed(self, texts: List[str]) -> np.ndarray:
+        Without an in-process model (worker pools) whitespace words are
+        counted instead, which is enough to order texts by length.
+        """
+        if self.pool is not None and not self.loaded:
+            return [len(t.split()) + 2 for t in texts]
+        limit = self.max_tokens
+        special = (getattr(self.model, "max_seq_length", None) or 512) - limit
+        return [min(n, limit) + special for n in self.count_tokens(texts)]
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        if self.batching == "length" and len(texts) > 1:
+            return self._encode_bucketed(texts)
+        if self.pool is not None:
+            return self.pool.encode(texts)
         return self.model.encode(
             texts,
             batch_size=self.batch_size,
             show_progress_bar=True,
         )
 
+    def _encode_bucketed(self, texts: List[str]) -> np.ndarray:
+        lengths = self.token_lengths(texts)
+        if self.pool is not None:
+            # Sorted shards keep each worker's batches to similar lengths.
+            order = sorted(range(len(texts)), key=lambda i: -lengths[i])
+            vecs = self.pool.encode([texts[i] for i in order])
+            out = np.empty_like(vecs)
+            out[order] = vecs
+            return out
+        out: Optional[np.ndarray] = None
+        for batch in token_budget_batches(lengths, self.token_budget):
+            vecs = np.asarray(
+                self.model.encode(
+                    [texts[i] for i in batch], batch_size=len(batch), show_progress_bar=False
+                ),
+                dtype=np.float32,
+            )
+            if out is None:
+                out = np.empty((len(texts), vecs.shape[1]), dtype=np.float32)
+            out[batch] = vecs
+        return out
+
+    def embed(self, texts: List[str], use_cache: bool = True) -> np.ndarray:
+        # The cache is not safe for concurrent use; concurrent callers skip it.
+        if self.cache is None or not use_cache:
+            return self._encode(texts)
+        keys = [text_key(self.cache_name, self.revision, t) for t in texts]
+        return _cached_encode(self.cache, keys, texts, self._encode)
+
 
-class VisionEmbedder:
+class VisionEmbedder(_LazyModel):
     def __init__(
         self,
         model_name: str = DEFAULT_CONFIG["default_vision_model"],
         batch_size: int = 16,
         device: Optional[str] = None,
         model_dir: Optional[Path] = None,
+        revision: Optional[str] = None,
+        cache: Optional[EmbeddingCache] = None,
+        decode_workers: int = 4,
+        prefetch: int = 64,
+        image_size: int = 224,
+        dedupe: bool = True,
     ):
-        model_name = select_model(model_name)
-        if model_dir:
-            local_path = Path(model_dir) / model_name.replace("/", "_")
-            if local_path.exists():
-                model_name = str(local_path)
-        self.model = SentenceTransformer(
+        super().__init__(model_name, batch_size, device, model_dir, revision, cache)
+        self.decode_workers = decode_workers
+        self.prefetch = prefetch
+        self.image_size = image_size
+        self.dedupe = dedupe
+        self._reset_stats()
+
+    def _reset_stats(self) -> None:
+        self.stats = {"decoded": 0, "failed": 0, "duplicates": 0}
+        self.errors: Dict[str, str] = {}
+
+    def _encode(self, images: List[Union[Path, Image.Image]]) -> np.ndarray:
+        """Stream, downscale and encode ``images`` a batch at a time.
+
+        Images that share a perceptual hash are encoded once. Unreadable
+        images get a NaN row, so callers can drop them, and are counted in
+        ``stats`` and ``errors``, which describe this call only.
+        """
+        from .image_loader import ImageLoader, phash
+
+        self._reset_stats()
+        loader = ImageLoader(self.image_size, self.decode_workers, self.prefetch)
+        rows: List[Optional[np.ndarray]] = [None] * len(images)
+        seen: Dict[int, int] = {}
+        copies: List[Tuple[int, int]] = []
+        batch: List[Image.Image] = []
+        batch_idx: List[int] = []
+
+        def flush():
+            vecs = self.model.encode(batch, batch_size=self.batch_size, show_progress_bar=False)
+            for i, vec in zip(batch_idx, vecs):
+                rows[i] = vec
+            batch.clear()
+            batch_idx.clear()
+
+        for i, image in loader.iter_images(images):
+            if image is None:
+                self.stats["failed"] += 1
+                continue
+            self.stats["decoded"] += 1
+            if self.dedupe:
+                first = seen.setdefault(phash(image), i)
+                if first != i:
+                    copies.append((i, first))
+                    self.stats["duplicates"] += 1
+                    continue
+            batch.append(image)
+            batch_idx.append(i)
+            if len(batch) >= self.batch_size:
+                flush()
+        if batch:
+            flush()
+        self.errors.update(loader.errors)
+        for i, first in copies:
+            rows[i] = rows[first]
+        dim = next((len(r) for r in rows if r is not None), None)
+        if dim is None:
+            dim = self.model.get_sentence_embedding_dimension() or 0
+        failed = np.full(dim, np.nan, dtype=np.float32)
+        return np.asarray([failed if r is None else r for r in rows], dtype=np.float32)
+
+    def embed(self, images: List[Union[Path, Image.Image]]) -> np.ndarray:
+        # Reset here too: when every image is cached ``_encode`` never runs.
+        self._reset_stats()
+        if self.cache is None:
+            return self._encode(images)
+        # In-memory images have no stable content hash and bypass the cache.
+        keys = [
+            image_key(self.cache_name, self.revision, p) if isinstance(p, Path) else None
+            for p in images
+        ]
+        return _cached_encode(self.cache, keys, images, self._encode)
+
+
+def embed_nuggets(
+    nuggets: Sequence[Union[str, Path]],
+    types: Sequence[str],
+    embedder: Embedder,
+    vision_embedder: VisionEmbedder,
+) -> np.ndarray:
+    """Embed mixed text and image nuggets in modality-grouped batches.
+
+    Text and image nuggets are encoded separately so each embedder sees real
+    batches. Rows are scattered back into the original nugget order and the
+    result is returned as one contiguous ``float32`` matrix. Images that could
+    not be decoded have NaN rows.
+    """
+    text_idx = [i for i, typ in enumerate(types) if typ != "image"]
+    image_idx = [i for i, typ in enumerate(types) if typ == "image"]
+    rows: List[Optional[np.ndarray]] = [None] * len(nuggets)
+    if text_idx:
+        vecs = embedder.embed([nuggets[i] for i in text_idx])
+        for i, vec in zip(text_idx, vecs):
+            rows[i] = vec
+    if image_idx:
+        # The vision embedder streams decoding, so it can take every image.
+        vecs = vision_embedder.embed([nuggets[i] for i in image_idx])
+        for i, vec in zip(image_idx, vecs):
+            rows[i] = vec
+    return np.ascontiguousarray(rows, dtype=np.float32)
+
+
+def compare_backends(
+    texts: Sequence[str],
+    model_name: str = DEFAULT_CONFIG["default_model"],
+    model_dir: Optional[Path] = None,
+    configs: Sequence[Tuple[str, bool]] = (("torch", False), ("onnx", False), ("onnx", True)),
+    batch_size: int = 32,
+) -> List[Dict[str, object]]:
+    """Compare CPU throughput and accuracy of the embedding backends.
+
+    Each ``(backend, quantize)`` in ``configs`` encodes ``texts`` on the CPU
+    after one warm-up batch. Accuracy is the cosine similarity of each row to
+    the first configuration's embeddings (the reference, normally ``torch``).
+    """
+    texts = list(texts)
+    reference: Optional[np.ndarray] = None
+    results = []
+    for backend, quantize in configs:
+        embedder = Embedder(
             model_name,
-            device=device,
-            cache_folder=str(model_dir) if model_dir else None,
+            batch_size=batch_size,
+            device="cpu",
+            model_dir=model_dir,
+            backend=backend,
+            quantize=quantize,
         )
-        self.batch_size = batch_size
+        embedder.model.encode(texts[:batch_size], batch_size=batch_size)
+        start = time.perf_counter()
+        vecs = embedder.model.encode(texts, batch_size=batch_size)
+        elapsed = time.perf_counter() - start
+        vecs = np.asarray(vecs, dtype=np.float32)
+        vecs /= np.maximum(np.linalg.norm(vecs, axis=1, keepdims=True), 1e-12)
+        if reference is None:
+            reference = vecs
+        cosine = np.sum(vecs * reference, axis=1)
+        results.append(
+            {
+                "backend": backend,
+                "quantized": quantize,
+                "texts_per_sec": round(len(texts) / elapsed, 1) if elapsed else None,
+                "load_seconds": round(embedder.load_seconds or 0.0, 3),
+                "mean_cosine": round(float(cosine.mean()), 6),
+                "min_cosine": round(float(cosine.min()), 6),
+            }
+        )
+    return results
 
-    def embed(self, images: List[Union[Path, Image.Image]]) -> np.ndarray:
-        imgs = [Image.open(p).convert("RGB") if isinstance(p, Path) else p for p in images]
-        return self.model.encode(imgs, batch_size=self.batch_size, show_progress_bar=True)
 
+
+def compare_batching(
+    texts: Sequence[str],
+    model_name: str = DEFAULT_CONFIG["default_model"],
+    model_dir: Optional[Path] = None,
+    batch_size: int = 32,
+    token_budget: int = 4096,
+) -> List[Dict[str, object]]:
+    """Compare fixed ``batch_size`` batching with token-budget batching on CPU.
+
+    Reports texts/sec and the share of padded token slots that hold real
+    tokens. Fixed batches are counted after the length sort that
+    ``SentenceTransformer.encode`` applies within a call.
+    """
+    texts = list(texts)
+    results = []
+    for batching in BATCHING:
+        embedder = Embedder(
+            model_name,
+            batch_size=batch_size,
+            device="cpu",
+            model_dir=model_dir,
+            batching=batching,
+            token_budget=token_budget,
+        )
+        lengths = embedder.token_lengths(texts)
+        if batching == "fixed":
+            order = sorted(range(len(texts)), key=lambda i: -lengths[i])
+            batches = [order[i : i + batch_size] for i in range(0, len(order), batch_size)]
+        else:
+            batches = token_budget_batches(lengths, token_budget)
+        padded = sum(len(b) * max(lengths[i] for i in b) for b in batches)
+        embedder.embed(texts[:batch_size], use_cache=False)
+        start = time.perf_counter()
+        embedder.embed(texts, use_cache=False)
+        elapsed = time.perf_counter() - start
+        results.append(
+            {
+                "batching": batching,
+                "batches": len(batches),
+                "texts_per_sec": round(len(texts) / elapsed, 1) if elapsed else None,
+                "token_efficiency": round(sum(lengths) / padded, 3) if padded else None,
+            }
+        )
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark text embedding settings on CPU")
+    parser.add_argument("--compare", choices=["backends", "batching"], default="backends")
+    parser.add_argument("--token-budget", type=int, default=4096)
+    parser.add_argument("--model", default=DEFAULT_CONFIG["default_model"])
+    parser.add_argument("--model-dir", type=Path, default=Path(DEFAULT_CONFIG["model_dir"]))
+    parser.add_argument("--texts", type=Path, help="File with one text per line")
+    parser.add_argument("--n", type=int, default=2000, help="Synthetic texts when --texts is not given")
+    parser.add_argument("--batch-size", type=int, default=32)
+    args = parser.parse_args()
+
+    if args.texts:
+        sample = [line for line in args.texts.read_text(encoding="utf-8").splitlines() if line.strip()]
+    else:
+        words = "the team reviewed budget risks launch customer feedback roadmap hiring".split()
+        # Mostly short texts with a long tail, like chat nuggets.
+        sample = [
+            " ".join(words[(i + j) % len(words)] for j in range(3 + (i * 7919) % 11 + (i % 13 == 0) * 90))
+            for i in range(args.n)
+        ]
+    if args.compare == "batching":
+        rows = compare_batching(
+            sample, args.model, args.model_dir, args.batch_size, args.token_budget
+        )
+    else:
+        rows = compare_backends(sample, args.model, args.model_dir, batch_size=args.batch_size)
+    for row in rows:
+        print(row)
@@ -1,16 +1,76 @@
+import hashlib
 import json
-from typing import Dict
+import uuid
+from collections import Counter, defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, Mapping, Optional, Sequence, Union
 
 import weaviate
 
-from .graph import TagGraph
+from .bulk_import import BulkImporter, ImportStats
+from .graph import Nugget, TagGraph
+
+# Namespace for deterministic object ids; changing it orphans stored objects.
+UUID_NAMESPACE = uuid.UUID("0d5bd3a6-3f86-5b0c-9a55-6b3c2a1e7f41")
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def nugget_uuid(source: Any, position: int, text: str) -> str:
+    """Stable id of the ``position``-th nugget of ``source`` with ``text``."""
+    digest = _sha256(text.encode("utf-8"))
+    return str(uuid.uuid5(UUID_NAMESPACE, f"nugget|{source}|{position}|{digest}"))
+
+
+def tag_uuid(name: str) -> str:
+    """Stable id of the tag called ``name``."""
+    return str(uuid.uuid5(UUID_NAMESPACE, f"tag|{name}"))
+
+
+def content_hash(properties: Dict[str, Any]) -> str:
+    """Hash of an object's properties."""
+    return _sha256(json.dumps(properties, sort_keys=True).encode("utf-8"))
+
+
+def vector_hash(vector: Sequence[float]) -> str:
+    """Hash of a vector, rounded so float noise does not force a rewrite."""
+    return _sha256(json.dumps([round(float(x), 6) for x in vector]).encode("utf-8"))
 
 
 class WeaviateStore:
-    """Simple wrapper to persist TagGraph objects in Weaviate."""
+    """Simple wrapper to persist TagGraph objects in Weaviate.
+
+    Objects get deterministic ids, so re-running the pipeline overwrites
+    rather than duplicates them. With ``ledger_path`` the content hash of
+    every uploaded object is remembered between runs; unchanged objects are
+    skipped and objects that disappeared from the graph are deleted. Without
+    it the server is not queried, so every object is re-sent and nothing is
+    deleted.
+    """
 
-    def __init__(self, url: str = "http://localhost:8080"):
+    def __init__(
+        self,
+        url: str = "http://localhost:8080",
+        *,
+        batch_size: int = 100,
+        concurrency: int = 4,
+        max_retries: int = 3,
+        backoff: float = 0.5,
+        headers: Optional[Dict[str, str]] = None,
+        ledger_path: Optional[Path] = None,
+    ):
         self.url = url
+        self.ledger_path = Path(ledger_path) if ledger_path is not None else None
+        self.import_options = {
+            "batch_size": batch_size,
+            "concurrency": concurrency,
+            "max_retries": max_retries,
+            "backoff": backoff,
+            "headers": headers,
+        }
         self.client = weaviate.Client(url)
         self.init_schema()
 
@@ -21,10 +81,12 @@ class WeaviateStore:
             self.client.schema.create_class(
                 {
                     "class": "Nugget",
+                    "vectorizer": "none",
                     "properties": [
                         {"name": "text", "dataType": ["text"]},
                         {"name": "cluster", "dataType": ["int"]},
                         {"name": "tags", "dataType": ["text[]"]},
+                        {"name": "source", "dataType": ["text"]},
                     ],
                 }
             )
@@ -39,18 +101,119 @@ class WeaviateStore:
                 }
             )
 
-    def add_tag_graph(self, tg: TagGraph) -> None:
-        for node, data in tg.graph.nodes(data=True):
-            if data.get("type") == "nugget":
-                tags = [n[4:] for n in tg.graph.neighbors(node) if n.startswith("tag_")]
-                self.client.data_object.create(
-                    {"text": data["text"], "cluster": data["cluster"], "tags": tags},
-                    "Nugget",
-                )
-            elif data.get("type") == "tag":
-                self.client.data_object.create(
-                    {"name": node[4:], "count": data.get("count", 0)}, "Tag"
-                )
+    def add_tag_graph(
+        self,
+        tg: TagGraph,
+        vectors: Optional[Mapping[int, Sequence[float]]] = None,
+        *,
+        wait: bool = True,
+    ) -> Union[ImportStats, "Future[ImportStats]"]:
+        """Upsert the nuggets and tags of ``tg`` in concurrent batches.
+
+        ``vectors`` maps nugget ids to embeddings sent as object vectors.
+        Returns the :class:`ImportStats`, or with ``wait=False`` a future
+        resolving to them while the upload runs on a background thread.
+        """
+        return self.add_nuggets(list(tg.iter_nuggets()), vectors, wait=wait)
+
+    def add_nuggets(
+        self,
+        nuggets: Sequence[Nugget],
+        vectors: Optional[Mapping[int, Sequence[float]]] = None,
+        *,
+        wait: bool = True,
+    ) -> Union[ImportStats, "Future[ImportStats]"]:
+        """Upsert ``nuggets`` and their tags; see :meth:`add_tag_graph`.
+
+        ``nuggets`` must be every nugget the store should hold, in graph
+        order, so callers can start the upload before the graph is built.
+        """
+        tag_counts = Counter(tag for nugget in nuggets for tag in nugget.tags)
+        if wait:
+            return self._import(nuggets, tag_counts, vectors)
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="weaviate-import")
+        future = executor.submit(self._import, nuggets, tag_counts, vectors)
+        executor.shutdown(wait=False)
+        return future
+
+    def _load_ledger(self) -> Dict[str, Dict[str, str]]:
+        if self.ledger_path is None or not self.ledger_path.exists():
+            return {}
+        with open(self.ledger_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data.get("objects", {}) if data.get("url") == self.url else {}
+
+    def _save_ledger(self, objects: Dict[str, Dict[str, str]]) -> None:
+        if self.ledger_path is None:
+            return
+        self.ledger_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.ledger_path, "w", encoding="utf-8") as f:
+            json.dump({"url": self.url, "objects": objects}, f)
+
+    def _objects(
+        self,
+        nuggets: Iterable[Nugget],
+        tag_counts: Mapping[str, int],
+        vectors: Optional[Mapping[int, Sequence[float]]],
+    ):
+        """Yield ``(class, uuid, properties, vector)`` for every nugget and tag."""
+        positions: Dict[str, int] = defaultdict(int)
+        for nugget in nuggets:
+            source = str(nugget.source)
+            # Image nuggets are stored by path.
+            text = str(nugget.text)
+            position = positions[source]
+            positions[source] += 1
+            properties = {
+                "text": text,
+                "cluster": nugget.cluster_id,
+                "tags": nugget.tags,
+                "source": source,
+            }
+            vector = vectors.get(nugget.id) if vectors is not None else None
+            yield "Nugget", nugget_uuid(source, position, text), properties, vector
+        for name, count in tag_counts.items():
+            yield "Tag", tag_uuid(name), {"name": name, "count": count}, None
+
+    def _import(
+        self,
+        nuggets: Iterable[Nugget],
+        tag_counts: Mapping[str, int],
+        vectors: Optional[Mapping[int, Sequence[float]]] = None,
+    ) -> ImportStats:
+        ledger = self._load_ledger()
+        current: Dict[str, Dict[str, str]] = {}
+        importer = BulkImporter(self.url, **self.import_options)
+        try:
+            objects = self._objects(nuggets, tag_counts, vectors)
+            for class_name, object_id, properties, vector in objects:
+                entry = {"class": class_name, "hash": content_hash(properties)}
+                if vector is not None:
+                    entry["vector"] = vector_hash(vector)
+                old = ledger.get(object_id)
+                # An object stored with a vector keeps it unless a new one is sent.
+                if (
+                    old is not None
+                    and old["hash"] == entry["hash"]
+                    and old.get("vector") == entry.get("vector", old.get("vector"))
+                ):
+                    current[object_id] = old
+                    importer.stats.skipped += 1
+                    continue
+                current[object_id] = entry
+                importer.add(class_name, properties, uuid=object_id, vector=vector)
+            for object_id, old in ledger.items():
+                if object_id not in current:
+                    importer.delete(old["class"], object_id)
+        finally:
+            stats = importer.close()
+        for object_id in importer.failed_ids:
+            if object_id in current:
+                del current[object_id]
+            elif object_id in ledger:
+                current[object_id] = ledger[object_id]
+        self._save_ledger(current)
+        return stats
 
     def save_summary(self, tg: TagGraph, path: str) -> None:
         summary = tg.summary()
@@ -1,6 +1,79 @@
 import sys
 from pathlib import Path
 
+import pytest
+
 # Ensure package root is on sys.path for test imports
 ROOT = Path(__file__).resolve().parents[1]
 sys.path.insert(0, str(ROOT))
+
+
+class RecordingEmbedder:
+    """Text embedder that records every text it encodes.
+
+    ``vectorize`` maps one text to its vector; by default ``[len(text), 1.0]``.
+    """
+
+    def __init__(self, vectorize=None):
+        self.vectorize = vectorize or (lambda text: [float(len(text)), 1.0])
+        self.embedded = []
+
+    def embed(self, texts, use_cache=True):
+        self.embedded.extend(texts)
+        return [self.vectorize(text) for text in texts]
+
+    def close(self):
+        pass
+
+
+class FakeClustering:
+    """Deterministic stand-in for k selection and KMeans.
+
+    ``labels(n)`` gives the labels of ``n`` nuggets (alternating 0/1 by
+    default) and ``k`` the selected k. Every clustered matrix is kept in
+    ``inputs`` as lists of floats.
+    """
+
+    def __init__(self):
+        self.k = 2
+        self.labels = lambda n: [i % 2 for i in range(n)]
+        self.inputs = []
+
+    def select_k(self, embeddings, **kwargs):
+        from semantic_tags.clustering import KSelection
+
+        return KSelection(self.k, "silhouette")
+
+    def cluster_embeddings(self, embeddings, k):
+        self.inputs.append([[float(x) for x in row] for row in embeddings])
+        return self.labels(len(embeddings)), None
+
+
+@pytest.fixture
+def fake_clustering(monkeypatch):
+    """Patch the kmeans backend's k selection and clustering with a :class:`FakeClustering`."""
+    # Imported here: test modules stub heavy dependencies before importing the package.
+    from semantic_tags import clustering
+
+    fake = FakeClustering()
+    monkeypatch.setattr(clustering, "select_k", fake.select_k)
+    monkeypatch.setattr(clustering, "cluster_embeddings", fake.cluster_embeddings)
+    return fake
+
+
+@pytest.fixture
+def make_pipeline(fake_clustering):
+    """Return a factory for pipelines that cluster with ``fake_clustering``.
+
+    The pipeline's text embedder is ``embedder`` if given, else a
+    :class:`RecordingEmbedder` built from ``vectorize``.
+    """
+
+    def make(embedder=None, vectorize=None, **options):
+        from semantic_tags.pipeline import Pipeline
+
+        pipeline = Pipeline(**options)
+        pipeline.embedder = embedder or RecordingEmbedder(vectorize)
+        return pipeline
+
+    return make
@@ -0,0 +1,90 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+if not hasattr(np, "zeros"):
+    pytest.skip("numpy is not installed", allow_module_level=True)
+sklearn_cluster = pytest.importorskip("sklearn.cluster")
+if sklearn_cluster.MiniBatchKMeans is sklearn_cluster.KMeans:
+    pytest.skip("scikit-learn is not installed", allow_module_level=True)
+
+from semantic_tags.ann_index import IVFFlatIndex, benchmark, exact_search
+
+
+def _clustered(n=6000, dim=16, centers=40, seed=0):
+    rng = np.random.default_rng(seed)
+    means = rng.normal(size=(centers, dim))
+    return means[rng.integers(centers, size=n)] + 0.3 * rng.normal(size=(n, dim))
+
+
+def test_ivf_index_recall_against_brute_force():
+    X = _clustered()
+    index = IVFFlatIndex.build(X, ids=np.arange(len(X)) + 100)
+    assert index.n_lists > 1
+    queries = X[:200]
+    rows, sims = exact_search(X, queries, 10)
+    ids, approx_sims = index.search(queries, 10, n_probe=8)
+    recall = np.mean([len(set(a) & set(b + 100)) / 10 for a, b in zip(ids, rows)])
+    assert recall > 0.95
+    assert np.all(np.diff(approx_sims, axis=1) <= 1e-6)
+    assert ids[0, 0] == 100
+
+    results = benchmark(index, queries, 10, n_probes=(1, index.n_lists))
+    assert results[0]["n_probe"] == "exact"
+    assert results[-1]["recall"] == pytest.approx(1.0)
+    assert all(r["ms_per_query"] >= 0 for r in results)
+
+
+def test_small_index_is_exact_and_pads():
+    X = _clustered(n=20)
+    index = IVFFlatIndex.build(X)
+    assert index.n_lists == 1
+    ids, sims = index.search(X[:2], k=25)
+    assert ids.shape == (2, 25)
+    assert (ids[:, 20:] == -1).all() and np.isinf(sims[:, 20:]).all()
+    assert ids[:, 0].tolist() == [0, 1]
+
+
+def test_save_load_mmap_and_update(tmp_path):
+    X = _clustered(n=500)
+    index = IVFFlatIndex.build(X, n_lists=8)
+    index.save(tmp_path / "idx")
+    loaded = IVFFlatIndex.load(tmp_path / "idx")
+    assert isinstance(loaded.vectors, np.memmap)
+    np.testing.assert_array_equal(loaded.search(X[:5], 5)[0], index.search(X[:5], 5)[0])
+
+    updated = loaded.updated([1000, 1001], X[:2], remove_ids=range(100))
+    assert len(updated) == 402
+    assert 1000 in updated.search(X[:1], 2)[0][0]
+    assert not set(range(100)) & set(updated.ids.tolist())
+
+
+def test_small_update_keeps_centroids():
+    X = _clustered(n=5000)
+    index = IVFFlatIndex.build(X[:4900], exact_below=1000)
+    updated = index.updated(np.arange(4900, 5000), X[4900:], remove_ids=[0, 1])
+    assert updated.centroids is index.centroids
+    assert len(updated) == 4998
+    ids, _ = updated.search(X[4900:4910], 1, n_probe=4)
+    assert ids[:, 0].tolist() == list(range(4900, 4910))
+
+
+def test_empty_index_and_zero_k():
+    index = IVFFlatIndex.build(np.zeros((0, 4)))
+    assert len(index) == 0 and not np.isnan(index.centroids).any()
+    ids, sims = index.search(np.ones((2, 4)), 3)
+    assert (ids == -1).all() and np.isinf(sims).all()
+    X = _clustered(n=20, dim=4)
+    assert len(index.updated(np.arange(20), X)) == 20
+    ids, sims = IVFFlatIndex.build(X).search(X[:2], 0)
+    assert ids.shape == sims.shape == (2, 0)
+
+
+def test_save_replaces_the_whole_directory(tmp_path):
+    X = _clustered(n=500)
+    IVFFlatIndex.build(X, n_lists=8).save(tmp_path / "idx")
+    first = IVFFlatIndex.load(tmp_path / "idx")
+    IVFFlatIndex.build(X[:100], n_lists=4).save(tmp_path / "idx")
+    # The old memory-mapped index stays readable and no temporary files remain.
+    assert len(first) == 500 and first.search(X[:1], 1)[0][0, 0] == 0
+    assert len(IVFFlatIndex.load(tmp_path / "idx")) == 100
+    assert [p.name for p in tmp_path.iterdir()] == ["idx"]
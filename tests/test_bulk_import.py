@@ -0,0 +1,161 @@
+import json
+import sys
+import threading
+import types
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+try:
+    import weaviate  # noqa: F401
+except ImportError:
+    sys.modules["weaviate"] = types.ModuleType("weaviate")
+
+from semantic_tags.bulk_import import BulkImporter
+
+
+class _Weaviate(BaseHTTPRequestHandler):
+    """Minimal stand-in for Weaviate's batch endpoint."""
+
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with server.lock:
+            server.requests += 1
+            if server.fail_requests:
+                server.fail_requests -= 1
+                self.send_response(503)
+                self.end_headers()
+                return
+            results = []
+            for obj in body["objects"]:
+                name = obj["properties"].get("name", "")
+                if server.flaky.get(name, 0) > 0:
+                    server.flaky[name] -= 1
+                    results.append({"result": {"errors": {"error": [{"message": "busy"}]}}})
+                elif name in server.broken:
+                    results.append({"result": {"errors": {"error": [{"message": "invalid"}]}}})
+                else:
+                    server.stored.append(obj)
+                    if "id" in obj:
+                        server.objects[obj["id"]] = obj
+                    results.append({"result": {}})
+        payload = json.dumps(results).encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_DELETE(self):
+        object_id = self.path.rsplit("/", 1)[-1]
+        with self.server.lock:
+            found = self.server.objects.pop(object_id, None) is not None
+        self.send_response(204 if found else 404)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Weaviate)
+    srv.lock = threading.Lock()
+    srv.requests = 0
+    srv.fail_requests = 0
+    srv.flaky = {}
+    srv.broken = set()
+    srv.stored = []
+    srv.objects = {}
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+def _url(srv):
+    return f"http://127.0.0.1:{srv.server_address[1]}"
+
+
+def test_bulk_import_batches_objects(server):
+    importer = BulkImporter(_url(server), batch_size=10, concurrency=3)
+    for i in range(95):
+        importer.add("Tag", {"name": f"t{i}", "count": i})
+    stats = importer.close()
+
+    assert stats.objects == 95 and stats.failed == 0
+    assert stats.batches == 10 == server.requests
+    assert sorted(o["properties"]["name"] for o in server.stored) == sorted(
+        f"t{i}" for i in range(95)
+    )
+    assert stats.as_metadata()["objects_per_sec"] > 0
+
+
+def test_bulk_import_retries_failures(server):
+    server.fail_requests = 1
+    server.flaky = {"t3": 2}
+    server.broken = {"t7"}
+    importer = BulkImporter(_url(server), batch_size=5, concurrency=1, max_retries=3, backoff=0)
+    for i in range(10):
+        importer.add("Tag", {"name": f"t{i}", "count": i})
+    stats = importer.close()
+
+    assert stats.objects == 9
+    assert stats.failed == 1
+    assert stats.errors == ["invalid"]
+    assert stats.retries == 1 + 2 + 3
+    assert "t3" in {o["properties"]["name"] for o in server.stored}
+
+
+def _graph(texts):
+    from semantic_tags.graph import Nugget, TagGraph
+
+    tg = TagGraph()
+    tg.add_nuggets(
+        [Nugget(i, text, ["recipe"], 0, Path("a.md")) for i, text in enumerate(texts)]
+    )
+    return tg
+
+
+def test_store_upserts_with_ledger(server, tmp_path, monkeypatch):
+    nx = pytest.importorskip("networkx")
+    if not hasattr(nx, "__version__"):
+        pytest.skip("networkx is not installed")
+    from semantic_tags import weaviate_store
+    from semantic_tags.weaviate_store import WeaviateStore, tag_uuid
+
+    schema = types.SimpleNamespace(get=lambda: {"classes": []}, create_class=lambda c: None)
+    monkeypatch.setattr(
+        weaviate_store.weaviate,
+        "Client",
+        lambda *a, **k: types.SimpleNamespace(schema=schema),
+        raising=False,
+    )
+
+    ledger = tmp_path / "ledger.json"
+    store = WeaviateStore(_url(server), ledger_path=ledger)
+    tg = _graph(["one", "two"])
+    stats = store.add_tag_graph(tg, {0: [0.5, 0.25], 1: [1.0, 0.0]})
+    assert stats.objects == 3 and stats.skipped == 0
+    assert len(server.objects) == 3
+    assert server.objects[tag_uuid("recipe")]["properties"]["count"] == 2
+    assert [o["vector"] for o in server.objects.values() if "vector" in o] == [
+        [0.5, 0.25],
+        [1.0, 0.0],
+    ]
+
+    # Same graph again: everything is skipped, vectors are kept.
+    stats = store.add_tag_graph(_graph(["one", "two"]), wait=False).result()
+    assert stats.objects == 0 and stats.skipped == 3
+    assert len(server.stored) == 3
+
+    # The second nugget changed: it is replaced and the old object deleted.
+    stats = store.add_tag_graph(_graph(["one", "deux"]), {1: [0.0, 1.0]})
+    assert stats.objects == 1 and stats.skipped == 2 and stats.deleted == 1
+    assert sorted(o["properties"].get("text", "") for o in server.objects.values()) == [
+        "",
+        "deux",
+        "one",
+    ]
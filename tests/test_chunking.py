@@ -0,0 +1,50 @@
+import pytest
+
+from semantic_tags.chunking import split_into_nuggets, split_sentences
+
+
+def _real_numpy():
+    np = pytest.importorskip("numpy")
+    if not hasattr(np, "linalg"):
+        pytest.skip("requires real numpy")
+    return np
+
+
+def test_split_sentences():
+    assert split_sentences("One. Two!  Three?") == ["One.", "Two!", "Three?"]
+
+
+def test_split_into_nuggets_with_model_token_counts():
+    calls = []
+
+    def count_tokens(texts):
+        calls.append(list(texts))
+        # Every word costs two model tokens.
+        return [2 * len(t.split()) for t in texts]
+
+    text = "a b c. d e f. " + " ".join(["w"] * 25) + "."
+    nuggets = split_into_nuggets(text, max_tokens=12, count_tokens=count_tokens)
+    assert nuggets[0] == "a b c. d e f."
+    assert all(count_tokens([n])[0] <= 12 for n in nuggets)
+    assert " ".join(nuggets).split() == text.split()
+    # Whitespace counting would have kept everything in one nugget.
+    assert split_into_nuggets(text, max_tokens=40) == [text]
+
+
+def test_semantic_segments_break_on_topic_shift_and_merge_small():
+    np = _real_numpy()
+    from semantic_tags.chunking import pool_vectors, semantic_segments
+
+    cooking, anime = np.array([1.0, 0.0]), np.array([0.0, 1.0])
+    vectors = np.array([cooking, cooking, anime, anime, cooking])
+    lengths = [15, 15, 15, 15, 5]
+    segments = semantic_segments(vectors, lengths, max_tokens=128, min_tokens=20)
+    # The trailing 5-token sentence is merged into its only neighbour.
+    assert segments == [[0, 1], [2, 3, 4]]
+
+    # The token cap still applies within one topic.
+    assert semantic_segments(vectors[:2], [100, 100], min_tokens=0) == [[0], [1]]
+
+    pooled = pool_vectors(vectors, segments)
+    assert np.allclose(pooled[0], [1.0, 0.0])
+    assert np.allclose(np.linalg.norm(pooled, axis=1), 1.0)
@@ -2,9 +2,17 @@ import sys
 import types
 
 # Stub heavy dependencies similarly to test_pipeline
-sys.modules["numpy"] = types.ModuleType("numpy")
-sys.modules["numpy"].ndarray = list
-sys.modules["numpy"].random = types.SimpleNamespace(rand=lambda *a, **k: [[0] * 2 for _ in range(a[0])])
+try:
+    import numpy  # noqa: F401
+except ImportError:
+    sys.modules["numpy"] = types.ModuleType("numpy")
+    sys.modules["numpy"].ndarray = list
+    sys.modules["numpy"].random = types.SimpleNamespace(rand=lambda *a, **k: [[0] * 2 for _ in range(a[0])])
+    sys.modules["numpy"].float32 = float
+    sys.modules["numpy"].asarray = lambda rows, dtype=None: [
+        list(r) if isinstance(r, (list, tuple)) else r for r in rows
+    ]
+    sys.modules["numpy"].ascontiguousarray = lambda rows, dtype=None: [list(r) for r in rows]
 
 st_module = types.ModuleType("sentence_transformers")
 st_module.SentenceTransformer = lambda *a, **k: types.SimpleNamespace(
@@ -14,16 +22,21 @@ st_module.SentenceTransformer = lambda *a, **k: types.SimpleNamespace(
 )
 sys.modules["sentence_transformers"] = st_module
 
-sklearn_mod = types.ModuleType("sklearn")
-cluster_mod = types.ModuleType("sklearn.cluster")
-cluster_mod.KMeans = lambda *a, **k: types.SimpleNamespace(fit_predict=lambda X: [0] * len(X))
-metrics_mod = types.ModuleType("sklearn.metrics")
-metrics_mod.silhouette_score = lambda X, labels: 0.0
-sklearn_mod.cluster = cluster_mod
-sklearn_mod.metrics = metrics_mod
-sys.modules["sklearn"] = sklearn_mod
-sys.modules["sklearn.cluster"] = cluster_mod
-sys.modules["sklearn.metrics"] = metrics_mod
+try:
+    import sklearn.cluster  # noqa: F401
+    import sklearn.metrics  # noqa: F401
+except ImportError:
+    sklearn_mod = types.ModuleType("sklearn")
+    cluster_mod = types.ModuleType("sklearn.cluster")
+    cluster_mod.KMeans = lambda *a, **k: types.SimpleNamespace(fit_predict=lambda X: [0] * len(X))
+    cluster_mod.MiniBatchKMeans = cluster_mod.KMeans
+    metrics_mod = types.ModuleType("sklearn.metrics")
+    metrics_mod.silhouette_score = lambda X, labels: 0.0
+    sklearn_mod.cluster = cluster_mod
+    sklearn_mod.metrics = metrics_mod
+    sys.modules["sklearn"] = sklearn_mod
+    sys.modules["sklearn.cluster"] = cluster_mod
+    sys.modules["sklearn.metrics"] = metrics_mod
 
 nx_mod = types.ModuleType("networkx")
 class Nodes(dict):
@@ -46,13 +59,24 @@ class Graph:
             elif v == node:
                 neigh.append(u)
         return neigh
+    def edges(self):
+        return list(self._edges)
+    def remove_edges_from(self, edges):
+        for u, v in edges:
+            self._edges.pop((u, v), None) or self._edges.pop((v, u), None)
+    def add_weighted_edges_from(self, edges):
+        for u, v, w in edges:
+            self.add_edge(u, v, weight=w)
     def number_of_nodes(self):
         return len(self.nodes)
     def number_of_edges(self):
         return len(self._edges)
 
 nx_mod.Graph = Graph
-sys.modules["networkx"] = nx_mod
+try:
+    import networkx  # noqa: F401
+except ImportError:
+    sys.modules["networkx"] = nx_mod
 
 weaviate_mod = types.ModuleType("weaviate")
 weaviate_mod.Client = lambda *a, **k: types.SimpleNamespace(
@@ -73,3 +97,78 @@ def test_cli_show_config(capsys):
     assert "batch_size" in captured.out
     assert "device" in captured.out
     assert "vision_model" in captured.out
+
+
+# Modules that metadata-only commands must not import.
+HEAVY_MODULES = {
+    "torch",
+    "sentence_transformers",
+    "sklearn",
+    "scipy",
+    "networkx",
+    "weaviate",
+    "PIL",
+    "numpy",
+    "semantic_tags.pipeline",
+}
+# Generous budget for ``import semantic_tags.cli``; a heavy import blows it.
+CLI_IMPORT_BUDGET_US = 300_000
+
+
+def test_cli_metadata_commands_import_fast(tmp_path):
+    import os
+    import subprocess
+    from pathlib import Path
+
+    code = (
+        "import sys; sys.argv = ['semantic_tags', '--list-models'];"
+        "from semantic_tags.cli import main; main()"
+    )
+    env = dict(os.environ, SEMANTIC_TAGS_CONFIG=str(tmp_path / "config.json"))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        cwd=Path(__file__).resolve().parents[1],
+        env=env,
+        check=True,
+    )
+    assert "Recommended models:" in proc.stdout
+    imported = {}
+    for line in proc.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line.split("|")
+            if cumulative.strip().isdigit():
+                imported[name.strip()] = int(cumulative)
+    heavy = [n for n in imported if n in HEAVY_MODULES or n.split(".")[0] in HEAVY_MODULES]
+    assert heavy == []
+    assert imported["semantic_tags.cli"] < CLI_IMPORT_BUDGET_US
+
+
+def test_cli_fails_when_the_weaviate_upload_fails(tmp_path, monkeypatch):
+    import pytest
+
+    import semantic_tags.pipeline as pipeline_mod
+    import semantic_tags.weaviate_store as store_mod
+
+    class FakePipeline:
+        def __init__(self, **kwargs):
+            self.model_name = "model"
+            self.device = "cpu"
+            self.embedder = types.SimpleNamespace(close=lambda: None)
+            self.last_metadata = {}
+
+        def run(self, path, **kwargs):
+            self.last_metadata = {"weaviate_error": "ConnectionError: weaviate is down"}
+            return types.SimpleNamespace(number_of_nodes=lambda: 0, number_of_edges=lambda: 0)
+
+    monkeypatch.setattr(pipeline_mod, "Pipeline", FakePipeline)
+    monkeypatch.setattr(store_mod, "WeaviateStore", lambda *args, **kwargs: object())
+    monkeypatch.setenv("SEMANTIC_TAGS_CONFIG", str(tmp_path / "config.json"))
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    monkeypatch.setattr(
+        sys, "argv", ["prog", str(tmp_path), "--tags", "a", "--weaviate-url", "http://weaviate"]
+    )
+    with pytest.raises(SystemExit) as exc:
+        main()
+    assert "weaviate is down" in str(exc.value.code)
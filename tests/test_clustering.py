@@ -0,0 +1,94 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+if not hasattr(np, "zeros"):  # stubbed by another test module
+    pytest.skip("numpy is not installed", allow_module_level=True)
+cluster = pytest.importorskip("sklearn.cluster")
+if not hasattr(cluster, "MiniBatchKMeans") or cluster.MiniBatchKMeans is cluster.KMeans:
+    pytest.skip("scikit-learn is not installed", allow_module_level=True)
+
+from semantic_tags.clustering import (
+    CLUSTERERS,
+    get_clusterer,
+    knn_graph,
+    knn_search,
+    select_k,
+    stratified_sample,
+)
+
+
+def _blobs(n_centers=4, per=300, dim=8, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(0, 6, (n_centers, dim))
+    return np.vstack([rng.normal(c, 0.3, (per, dim)) for c in centers]).astype(np.float32)
+
+
+def test_stratified_sample_keeps_every_label():
+    labels = np.array([0] * 990 + [1] * 9 + [2])
+    idx = stratified_sample(labels, 100, np.random.default_rng(0))
+    assert set(labels[idx]) == {0, 1, 2}
+    assert 95 <= len(idx) <= 105
+
+
+@pytest.mark.parametrize("strategy", ["silhouette", "elbow"])
+def test_select_k_finds_blobs(strategy):
+    result = select_k(_blobs(), k_max=10, strategy=strategy, sample_size=300, n_jobs=2)
+    assert result.k == 4
+    assert result.wcss and not result.stopped_early
+    meta = result.as_metadata()
+    assert meta["strategy"] == strategy and meta["k"] == 4
+    if strategy == "silhouette":
+        assert set(meta["silhouette"]) == {str(k) for k in range(2, 11)}
+
+
+def test_select_k_respects_budget():
+    result = select_k(_blobs(), k_max=10, budget=0.0)
+    assert result.stopped_early
+    assert list(result.wcss) == [2]
+
+
+def test_knn_search_approximate_matches_exact_on_clustered_data():
+    X = _blobs(n_centers=20, per=200, dim=16)
+    exact, _ = knn_search(X, 10, exact_below=len(X))
+    approx, dists = knn_search(X, 10, exact_below=0)
+    recall = np.mean([len(set(a) & set(b)) / 10 for a, b in zip(approx, exact)])
+    assert recall > 0.95
+    assert (approx != np.arange(len(X))[:, None]).all()
+    assert (np.diff(dists, axis=1) >= -1e-6).all()
+
+
+def test_knn_graph_is_connected_and_symmetric():
+    from scipy.sparse.csgraph import connected_components
+
+    graph = knn_graph(_blobs(), 5)
+    assert connected_components(graph, directed=False)[0] == 1
+    assert (graph != graph.T).nnz == 0
+
+
+def test_registry_lists_backends():
+    assert {"kmeans", "hdbscan", "leiden", "louvain"} <= set(CLUSTERERS)
+    with pytest.raises(ValueError):
+        get_clusterer("nope")
+
+
+@pytest.mark.parametrize("name", ["hdbscan", "louvain"])
+def test_graph_clusterers_recover_blobs(name):
+    if name == "louvain" and not hasattr(pytest.importorskip("networkx"), "community"):
+        pytest.skip("networkx is not installed")
+    labels, info = get_clusterer(name)(_blobs())
+    assert len(set(labels.tolist())) == 4
+    assert info["n_neighbors"] == 15
+
+
+def test_centroids_and_assignment_skip_noise():
+    from semantic_tags.clustering import assign_clusters, cluster_centroids
+
+    X = np.array([[0, 0], [0, 2], [10, 10], [50, 50]], dtype=np.float32)
+    ids, centroids = cluster_centroids(X, [0, 0, 1, -1])
+    assert ids.tolist() == [0, 1]
+    assert centroids.tolist() == [[0, 1], [10, 10]]
+    assert assign_clusters(X[[3]], ids, centroids).tolist() == [1]
+
+    ids, centroids = cluster_centroids(X, [-1] * 4)
+    assert len(ids) == 0 and centroids.shape == (0, 2)
+    assert assign_clusters(X, ids, centroids).tolist() == [-1] * 4
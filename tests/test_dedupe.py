@@ -0,0 +1,38 @@
+import pytest
+
+from semantic_tags.dedupe import dedupe
+
+
+def test_exact_dedupe_normalizes_text():
+    texts = ["Hello  there", "hello there", "something else", "HELLO THERE\n"]
+    result = dedupe(texts, ["text"] * 4, mode="exact")
+    assert result.keep == [0, 2]
+    assert result.positions == [0, 0, 1, 0]
+    assert result.as_metadata()["saved_encodes"] == 2
+
+
+def test_images_and_off_mode_are_kept():
+    texts = ["a b", "a b", "img"]
+    assert dedupe(texts, ["text", "text", "image"], mode="off").keep == [0, 1, 2]
+    assert dedupe(["x", "x"], ["image", "image"]).keep == [0, 1]
+    with pytest.raises(ValueError):
+        dedupe(texts, mode="fuzzy")
+
+
+def test_near_duplicates_share_a_representative():
+    pytest.importorskip("numpy")
+    import numpy as np
+
+    if not hasattr(np, "minimum"):
+        pytest.skip("requires real numpy")
+    log = " ".join(f"line {i} processed request id {i * 7} ok" for i in range(40))
+    texts = [
+        log,
+        "completely unrelated discussion about recipes and travel plans",
+        log + " done",
+        log.replace("line 3 ", "line three "),
+    ]
+    result = dedupe(texts, mode="near", threshold=0.8)
+    assert result.keep == [0, 1]
+    assert result.positions == [0, 1, 0, 0]
+    assert result.near == 2 and result.exact == 0
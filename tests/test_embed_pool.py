@@ -0,0 +1,78 @@
+import sys
+import types
+
+import pytest
+
+np = pytest.importorskip("numpy")
+if not hasattr(np, "concatenate"):
+    pytest.skip("requires real numpy", allow_module_level=True)
+
+from semantic_tags import vectorization
+from semantic_tags.embed_pool import EmbedPool
+
+
+class LengthModel:
+    def __init__(self, name, **kwargs):
+        pass
+
+    def encode(self, texts, batch_size=32, show_progress_bar=False):
+        if any(t == "boom" for t in texts):
+            raise RuntimeError("encode failed")
+        return np.array([[len(t), 1.0] for t in texts], dtype=np.float32)
+
+
+@pytest.fixture
+def fake_models(monkeypatch):
+    module = types.ModuleType("sentence_transformers")
+    module.SentenceTransformer = LengthModel
+    monkeypatch.setitem(sys.modules, "sentence_transformers", module)
+    vectorization.clear_models()
+    yield
+    vectorization.clear_models()
+
+
+def test_pool_encodes_in_order_and_recovers_from_errors(fake_models):
+    texts = ["x" * (i % 17 + 1) for i in range(101)]
+    # fork so the workers inherit the stand-in model module.
+    pool = EmbedPool(("m", None, None, None), 3, batch_size=4, start_method="fork")
+    try:
+        vecs = pool.encode(texts)
+        assert vecs[:, 0].tolist() == [len(t) for t in texts]
+        assert pool.encoded == len(texts) and pool.nuggets_per_sec
+
+        with pytest.raises(RuntimeError):
+            pool.encode(texts[:40] + ["boom"])
+        assert pool._pool is None
+        assert pool.encode(["ab"])[:, 0].tolist() == [2]
+    finally:
+        pool.close()
+
+
+class BrokenModel:
+    def __init__(self, name, **kwargs):
+        raise OSError("model files missing")
+
+
+def test_pool_raises_when_the_model_fails_to_load(monkeypatch):
+    module = types.ModuleType("sentence_transformers")
+    module.SentenceTransformer = BrokenModel
+    monkeypatch.setitem(sys.modules, "sentence_transformers", module)
+    vectorization.clear_models()
+    pool = EmbedPool(("broken", None, None, None), 2, batch_size=2, start_method="fork")
+    try:
+        with pytest.raises(OSError, match="model files missing"):
+            pool.encode(["a", "b", "c"])
+        assert pool._pool is None
+    finally:
+        pool.close()
+        vectorization.clear_models()
+
+
+def test_embedder_uses_pool(fake_models):
+    embedder = vectorization.Embedder("m", batch_size=2, workers=2)
+    embedder._pool = EmbedPool(embedder._key(), 2, batch_size=2, start_method="fork")
+    try:
+        assert embedder.embed(["a", "bbb"])[:, 0].tolist() == [1, 3]
+        assert not embedder.loaded
+    finally:
+        embedder.close()
@@ -0,0 +1,71 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+if not hasattr(np, "zeros"):  # stubbed by another test module
+    pytest.skip("numpy is not installed", allow_module_level=True)
+
+from semantic_tags.embedding_cache import EmbeddingCache, normalize_text, text_key
+from semantic_tags.vectorization import _cached_encode
+
+
+def test_text_key_normalizes_whitespace():
+    assert normalize_text("  hello \n world ") == "hello world"
+    assert text_key("m", None, "hello  world") == text_key("m", None, "hello world")
+    assert text_key("m", "r1", "hello") != text_key("m", "r2", "hello")
+
+
+def test_cache_roundtrip_and_persistence(tmp_path):
+    cache = EmbeddingCache(tmp_path, max_entries=10)
+    cache.put_many(["a", "b"], np.array([[1, 2], [3, 4]], dtype=np.float32))
+    got = cache.get_many(["b", "missing", "a"])
+    assert got[1] is None
+    assert got[0].tolist() == [3, 4] and got[2].tolist() == [1, 2]
+    assert (cache.hits, cache.misses) == (2, 1)
+    cache.close()
+
+    reopened = EmbeddingCache(tmp_path, max_entries=10)
+    assert reopened.get_many(["a"])[0].tolist() == [1, 2]
+    assert len(reopened) == 2
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = EmbeddingCache(tmp_path, max_entries=2)
+    cache.put_many(["a", "b"], np.eye(2, dtype=np.float32))
+    cache.get_many(["a"])
+    cache.put_many(["c"], np.ones((1, 2), dtype=np.float32))
+    assert cache.get_many(["b"]) == [None]
+    assert cache.get_many(["a"])[0] is not None
+    assert cache.get_many(["c"])[0].tolist() == [1, 1]
+    assert cache.stats()["evictions"] == 1
+    assert len(cache) == 2
+
+
+def test_reopening_with_a_smaller_bound_evicts(tmp_path):
+    cache = EmbeddingCache(tmp_path, max_entries=10)
+    keys = [f"k{i}" for i in range(6)]
+    cache.put_many(keys, np.arange(12, dtype=np.float32).reshape(6, 2))
+    cache.get_many(["k4", "k0"])
+    cache.close()
+
+    reopened = EmbeddingCache(tmp_path, max_entries=2)
+    assert len(reopened) == 2 and reopened.stats()["evictions"] == 4
+    assert reopened.get_many(["k0", "k4"])[1].tolist() == [8, 9]
+    assert reopened.get_many(["k0"])[0].tolist() == [0, 1]
+    assert np.load(tmp_path / "vectors.npy").shape == (2, 2)
+    reopened.put_many(["new"], np.ones((1, 2), dtype=np.float32))
+    assert len(reopened) == 2
+
+
+def test_cached_encode_only_encodes_misses(tmp_path):
+    cache = EmbeddingCache(tmp_path)
+    encoded = []
+
+    def encode(items):
+        encoded.append(list(items))
+        return np.array([[len(t), 0] for t in items], dtype=np.float32)
+
+    first = _cached_encode(cache, ["k1", "k2", "k1"], ["x", "yy", "x"], encode)
+    second = _cached_encode(cache, ["k2", "k3"], ["yy", "zzz"], encode)
+    assert encoded == [["x", "yy"], ["zzz"]]
+    assert first[:, 0].tolist() == [1, 2, 1]
+    assert second[:, 0].tolist() == [2, 3]
@@ -0,0 +1,182 @@
+import pytest
+
+nx = pytest.importorskip("networkx")
+if not hasattr(nx, "__version__"):  # stubbed by another test module
+    pytest.skip("networkx is not installed", allow_module_level=True)
+
+import pickle
+from pathlib import Path
+
+from semantic_tags.graph import CompactTagGraph, Nugget, TagGraph
+
+
+NUGGETS = [
+    Nugget(0, "a", ["x", "y", "z"], 0, "s.md", "Alice", "positive"),
+    Nugget(1, "b", ["x", "y"], 0, "s.md", "Bob", "neutral"),
+    Nugget(2, "c", ["x", "y", "w"], 1, "s.md"),
+    Nugget(3, "d", ["x", "z"], 1, "t.md", "Alice", "negative"),
+]
+
+
+def _graph(cls=TagGraph):
+    tg = cls()
+    tg.add_nuggets(NUGGETS)
+    return tg
+
+
+def _weights(tg):
+    return {
+        tuple(sorted((u[4:], v[4:]))): d["weight"]
+        for u, v, d in tg.graph.edges(data=True)
+        if "weight" in d
+    }
+
+
+def test_co_occurrence_edges_counts_shared_nuggets():
+    tg = _graph()
+    tg.co_occurrence_edges()
+    assert _weights(tg) == {
+        ("x", "y"): 3,
+        ("x", "z"): 2,
+        ("y", "z"): 1,
+        ("w", "x"): 1,
+        ("w", "y"): 1,
+    }
+
+
+def test_co_occurrence_edges_threshold_and_top_k():
+    tg = _graph()
+    tg.co_occurrence_edges()
+    tg.co_occurrence_edges(min_weight=2)
+    assert _weights(tg) == {("x", "y"): 3, ("x", "z"): 2}
+
+    tg.co_occurrence_edges(top_k=1)
+    # x and y keep their heaviest edge; z's and w's best edges survive too.
+    assert _weights(tg) == {("x", "y"): 3, ("x", "z"): 2, ("w", "x"): 1}
+
+
+@pytest.mark.parametrize("cls", [TagGraph, CompactTagGraph])
+@pytest.mark.parametrize("options", [{"min_weight": 3}, {"min_weight": 2, "top_k": 1}])
+def test_incremental_edges_match_rebuild_with_pruning(cls, options):
+    later = [
+        Nugget(4, "e", ["x", "z"], 2, "u.md"),
+        Nugget(5, "f", ["y", "z", "w"], 2, "u.md"),
+        Nugget(6, "g", ["w", "y"], 2, "u.md"),
+    ]
+    incremental = cls()
+    incremental.add_nuggets(NUGGETS[:2])
+    incremental.co_occurrence_edges(**options)
+    incremental.add_nuggets(NUGGETS[2:], update_edges=True)
+    for nugget in later:
+        incremental.add_nuggets([nugget], update_edges=True)
+    incremental.remove_nuggets([0])
+
+    rebuilt = cls()
+    rebuilt.add_nuggets(NUGGETS[1:] + later)
+    rebuilt.co_occurrence_edges(**options)
+    assert _weights(incremental) == _weights(rebuilt)
+    assert _weights(incremental)
+
+
+def _networkx_view(g):
+    nodes = {n: dict(d) for n, d in g.nodes(data=True)}
+    edges = {frozenset((u, v)): dict(d) for u, v, d in g.edges(data=True)}
+    return nodes, edges
+
+
+def test_compact_backend_matches_networkx():
+    reference = _graph()
+    compact = _graph(CompactTagGraph)
+    for tg in (reference, compact):
+        tg.co_occurrence_edges()
+        tg.remove_nuggets([2])
+        tg.add_nuggets([Nugget(4, "é", ["y", "v"], 2, "u.md")], update_edges=True)
+        # Re-adding an id replaces the nugget; image nuggets carry a path.
+        tg.add_nuggets([Nugget(1, "b2", ["z", "v"], 2, "s.md", "Bob")], update_edges=True)
+        tg.add_nuggets([Nugget(5, Path("p.png"), ["v"], 2, "p.png")], update_edges=True)
+
+    assert compact.summary({"k": 3}) == reference.summary({"k": 3})
+    assert compact.conversation_summary() == reference.conversation_summary()
+    assert _networkx_view(compact.to_networkx()) == _networkx_view(reference.graph)
+    assert compact.number_of_nodes() == reference.number_of_nodes()
+    assert compact.number_of_edges() == reference.number_of_edges()
+    assert [n.text for n in compact.iter_nuggets()] == ["a", "d", "é", "b2", Path("p.png")]
+    assert len(compact) == 5
+    assert compact.get_nugget(1).tags == ["z", "v"]
+
+
+def test_label_ties_break_by_name_in_both_backends():
+    tie = [Nugget(0, "a", ["z", "m"], 0, "s.md"), Nugget(1, "b", ["a"], 0, "s.md")]
+    reference = TagGraph()
+    compact = CompactTagGraph()
+    reference.add_nuggets(tie)
+    compact.add_nuggets(tie[::-1])
+    assert reference.summary() == compact.summary()
+    assert reference.summary()["clusters"] == {"0": "a"}
+
+
+def test_compact_backend_pickles_without_networkx_view():
+    compact = _graph(CompactTagGraph)
+    compact.graph
+    restored = pickle.loads(pickle.dumps(compact))
+    assert restored._nx is None
+    assert restored.summary() == compact.summary()
+
+
+@pytest.mark.parametrize("cls", [TagGraph, CompactTagGraph])
+def test_indexes_track_additions_and_removals(cls):
+    tg = _graph(cls)
+    assert tg.cluster_members(0) == [0, 1]
+    assert tg.source_members("s.md") == [0, 1, 2]
+    tg.remove_nuggets([1, 3])
+    assert tg.cluster_members(0) == [0]
+    assert tg.source_members("t.md") == []
+    # Cluster 1 ties x, y and w; ties go to the first name.
+    topics = {"x": 1, "w": 1}
+    assert tg.conversation_summary() == {"s.md": {"nugget_count": 2, "topics": topics}}
+    assert tg.summary()["cluster_count"] == 2
+    assert tg.tag_counts() == {"x": 2, "y": 2, "z": 1, "w": 1}
+
+
+def test_index_rebuilds_after_direct_graph_edits():
+    tg = _graph()
+    tg.graph.add_node("nugget_9", type="nugget", text="e", cluster=5, source="v.md")
+    tg.graph.add_edge("nugget_9", "tag_x")
+    assert tg.summary()["clusters"]["5"] == "x"
+    assert tg.cluster_members(5) == [9]
+
+
+def test_index_notices_edits_that_keep_the_counts():
+    tg = _graph()
+    tg.summary()
+    tg.graph.nodes["nugget_3"]["cluster"] = 7
+    assert tg.cluster_members(7) == [3]
+    # One edge swapped for another leaves node and edge counts unchanged.
+    tg.graph.remove_edge("nugget_3", "tag_z")
+    tg.graph.add_edge("nugget_3", "tag_w")
+    assert tg.summary()["cluster_count"] == 3
+    assert sorted(tg.get_nugget(3).tags) == ["w", "x"]
+    assert tg.cluster_members(1) == [2]
+
+
+def test_graph_pickled_before_the_indexes_loads():
+    current = _graph()
+    current.co_occurrence_edges()
+    old = TagGraph.__new__(TagGraph)
+    old.__dict__["graph"] = nx.Graph(current.graph)
+    restored = pickle.loads(pickle.dumps(old))
+    assert restored.summary() == current.summary()
+    restored.remove_nuggets([3])
+    restored.add_nuggets([NUGGETS[3]], update_edges=True)
+    assert restored.summary() == current.summary()
+    assert _weights(restored) == _weights(current)
+
+
+@pytest.mark.parametrize("cls", [TagGraph, CompactTagGraph])
+def test_removal_after_untracked_additions_recounts(cls):
+    tg = cls()
+    tg.add_nuggets(NUGGETS[:1])
+    tg.co_occurrence_edges()
+    tg.add_nuggets(NUGGETS[1:])
+    tg.remove_nuggets([0])
+    assert _weights(tg) == {("x", "y"): 2, ("x", "z"): 1, ("w", "x"): 1, ("w", "y"): 1}
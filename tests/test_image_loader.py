@@ -0,0 +1,90 @@
+import sys
+import types
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+Image = pytest.importorskip("PIL.Image")
+if not hasattr(np, "packbits"):
+    pytest.skip("requires real numpy", allow_module_level=True)
+
+from semantic_tags import vectorization
+from semantic_tags.embedding_cache import EmbeddingCache
+from semantic_tags.image_loader import ImageLoader, phash, prepare_image
+
+
+def _photo(path: Path, size, colour):
+    image = Image.new("RGB", size, colour)
+    image.paste((255, 255, 255), (0, 0, size[0] // 2, size[1] // 3))
+    image.save(path)
+    return path
+
+
+def test_loader_downscales_streams_in_order_and_counts_errors(tmp_path):
+    big = _photo(tmp_path / "big.jpg", (2000, 1000), (200, 10, 10))
+    small = _photo(tmp_path / "small.png", (64, 32), (10, 200, 10))
+    broken = tmp_path / "broken.png"
+    broken.write_bytes(b"not an image")
+
+    loader = ImageLoader(size=224, workers=2, prefetch=2)
+    out = list(loader.iter_images([big, broken, small, big]))
+    assert [i for i, _ in out] == [0, 1, 2, 3]
+    assert out[0][1].size == (448, 224) and out[0][1].mode == "RGB"
+    assert out[1][1] is None and str(broken) in loader.errors
+    assert out[2][1].size == (64, 32)
+    assert phash(out[0][1]) == phash(out[3][1]) != phash(out[2][1])
+    assert prepare_image(Image.new("L", (10, 10))).mode == "RGB"
+
+
+def test_vision_embedder_dedupes_and_skips_unreadable(tmp_path, monkeypatch):
+    encoded = []
+
+    class FakeClip:
+        def __init__(self, name, **kwargs):
+            pass
+
+        def encode(self, images, batch_size=16, show_progress_bar=False):
+            encoded.extend(images)
+            return np.array([[im.size[0], im.size[1]] for im in images], dtype=np.float32)
+
+        def get_sentence_embedding_dimension(self):
+            return 2
+
+    module = types.ModuleType("sentence_transformers")
+    module.SentenceTransformer = FakeClip
+    monkeypatch.setitem(sys.modules, "sentence_transformers", module)
+    vectorization.clear_models()
+    try:
+        a = _photo(tmp_path / "a.png", (300, 300), (1, 2, 3))
+        copy = _photo(tmp_path / "copy.png", (300, 300), (1, 2, 3))
+        other = _photo(tmp_path / "b.png", (100, 50), (250, 250, 0))
+        broken = tmp_path / "broken.jpg"
+        broken.write_bytes(b"\xff\xd8 truncated")
+
+        embedder = vectorization.VisionEmbedder("clip", batch_size=2)
+        vecs = embedder.embed([a, broken, copy, other])
+        assert np.isnan(vecs[1]).all()
+        assert vecs[[0, 2, 3]].tolist() == [[224, 224], [224, 224], [100, 50]]
+        assert len(encoded) == 2
+        assert embedder.stats == {"decoded": 3, "failed": 1, "duplicates": 1}
+
+        # Failures are never cached, and stats describe only the latest call.
+        cache = EmbeddingCache(tmp_path / "cache")
+        embedder = vectorization.VisionEmbedder("clip", cache=cache)
+        for _ in range(2):
+            vecs = embedder.embed([a, broken])
+            assert np.isnan(vecs[1]).all()
+            assert embedder.stats["failed"] == 1
+            assert str(broken) in embedder.errors
+        assert embedder.stats["decoded"] == 0
+        assert len(cache) == 1
+
+        # Vectors from another backend are cached under their own keys.
+        onnx = vectorization.VisionEmbedder("clip", cache=cache)
+        onnx.backend, onnx._model = "onnx", embedder.model
+        onnx.embed([a])
+        assert onnx.stats["decoded"] == 1
+        assert len(cache) == 2
+    finally:
+        vectorization.clear_models()
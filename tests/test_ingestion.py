@@ -1,7 +1,8 @@
 import os
 from pathlib import Path
 
-from semantic_tags.ingestion import load_transcripts
+from semantic_tags.diarization import diarize_and_chunk
+from semantic_tags.ingestion import load_transcripts, stream_files
 
 
 def test_load_transcripts_nested(tmp_path):
@@ -22,3 +23,55 @@ def test_load_transcripts_nested(tmp_path):
         Path("sub/nested/deep.json"),
     ])
     assert len(results) == 3
+
+
+def test_stream_files_is_lazy_and_filters(tmp_path):
+    (tmp_path / "a.md").write_text("alpha")
+    (tmp_path / "big.txt").write_text("x" * 100)
+    skip = tmp_path / "drafts"
+    skip.mkdir()
+    (skip / "b.md").write_text("beta")
+    (tmp_path / "notes.bin").write_text("ignored")
+
+    stream = stream_files(tmp_path, max_size=50, exclude=["drafts/*"])
+    assert not isinstance(stream, list)
+    assert list(stream) == [("alpha", Path("a.md"), False)]
+    only = stream_files(tmp_path, include=["*.txt"])
+    assert [rel for _, rel, _ in only] == [Path("big.txt")]
+
+
+def test_stream_files_reads_large_files_in_pieces(tmp_path):
+    lines = [f"line {i}\n" for i in range(100)]
+    (tmp_path / "log.txt").write_text("".join(lines))
+
+    pieces = list(stream_files(tmp_path, piece_chars=64))
+    assert len(pieces) > 1
+    assert all(rel == Path("log.txt") for _, rel, _ in pieces)
+    assert all(text.endswith("\n") for text, _, _ in pieces)
+    assert "".join(text for text, _, _ in pieces) == "".join(lines)
+
+
+def test_stream_files_replaces_undecodable_bytes(tmp_path):
+    (tmp_path / "bad.md").write_bytes(b"caf\xe9 ok")
+
+    [(text, _, _)] = stream_files(tmp_path)
+    assert text == "caf� ok"
+    [(text, _, _)] = stream_files(tmp_path, errors="ignore")
+    assert text == "caf ok"
+
+
+def test_stream_files_carries_speaker_across_pieces(tmp_path):
+    (tmp_path / "talk.md").write_text(
+        "Alice: opening remarks here\n"
+        "still Alice talking on\n"
+        "and Alice again\n"
+        "Bob: a reply\n"
+    )
+
+    pieces = [text for text, _, _ in stream_files(tmp_path, piece_chars=40)]
+    assert len(pieces) > 2
+    turns = [turn for piece in pieces for turn in diarize_and_chunk(piece)]
+    assert [speaker for _, speaker in turns] == ["Alice", "Alice", "Alice", "Bob"]
+    assert " ".join(text for text, _ in turns[:3]) == (
+        "opening remarks here still Alice talking on and Alice again"
+    )
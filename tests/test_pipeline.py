@@ -1,12 +1,24 @@
 import sys
 import types
-
-# Provide dummy numpy and sentence_transformers modules to avoid heavy dependencies
-sys.modules["numpy"] = types.ModuleType("numpy")
-sys.modules["numpy"].ndarray = list
-sys.modules["numpy"].random = types.SimpleNamespace(
-    rand=lambda *a, **k: [[0] * 2 for _ in range(a[0])]
-)
+from pathlib import Path
+
+import pytest
+
+# Provide dummy numpy (when it is not installed) and sentence_transformers
+# modules to avoid heavy dependencies
+try:
+    import numpy  # noqa: F401
+except ImportError:
+    sys.modules["numpy"] = types.ModuleType("numpy")
+    sys.modules["numpy"].ndarray = list
+    sys.modules["numpy"].random = types.SimpleNamespace(
+        rand=lambda *a, **k: [[0] * 2 for _ in range(a[0])]
+    )
+    sys.modules["numpy"].float32 = float
+    sys.modules["numpy"].asarray = lambda rows, dtype=None: [
+        list(r) if isinstance(r, (list, tuple)) else r for r in rows
+    ]
+    sys.modules["numpy"].ascontiguousarray = lambda rows, dtype=None: [list(r) for r in rows]
 
 
 st_module = types.ModuleType("sentence_transformers")
@@ -18,17 +30,22 @@ st_module.SentenceTransformer = lambda *a, **k: types.SimpleNamespace(
 )
 sys.modules["sentence_transformers"] = st_module
 
-# Stub sklearn modules used by clustering
-sklearn_mod = types.ModuleType("sklearn")
-cluster_mod = types.ModuleType("sklearn.cluster")
-cluster_mod.KMeans = lambda *a, **k: types.SimpleNamespace(fit_predict=lambda X: [0] * len(X))
-metrics_mod = types.ModuleType("sklearn.metrics")
-metrics_mod.silhouette_score = lambda X, labels: 0.0
-sklearn_mod.cluster = cluster_mod
-sklearn_mod.metrics = metrics_mod
-sys.modules["sklearn"] = sklearn_mod
-sys.modules["sklearn.cluster"] = cluster_mod
-sys.modules["sklearn.metrics"] = metrics_mod
+# Stub sklearn modules used by clustering when scikit-learn is not installed
+try:
+    import sklearn.cluster  # noqa: F401
+    import sklearn.metrics  # noqa: F401
+except ImportError:
+    sklearn_mod = types.ModuleType("sklearn")
+    cluster_mod = types.ModuleType("sklearn.cluster")
+    cluster_mod.KMeans = lambda *a, **k: types.SimpleNamespace(fit_predict=lambda X: [0] * len(X))
+    cluster_mod.MiniBatchKMeans = cluster_mod.KMeans
+    metrics_mod = types.ModuleType("sklearn.metrics")
+    metrics_mod.silhouette_score = lambda X, labels: 0.0
+    sklearn_mod.cluster = cluster_mod
+    sklearn_mod.metrics = metrics_mod
+    sys.modules["sklearn"] = sklearn_mod
+    sys.modules["sklearn.cluster"] = cluster_mod
+    sys.modules["sklearn.metrics"] = metrics_mod
 
 # Minimal networkx stub used by TagGraph
 nx_mod = types.ModuleType("networkx")
@@ -60,6 +77,17 @@ class Graph:
                 neigh.append(u)
         return neigh
 
+    def edges(self):
+        return list(self._edges)
+
+    def remove_edges_from(self, edges):
+        for u, v in edges:
+            self._edges.pop((u, v), None) or self._edges.pop((v, u), None)
+
+    def add_weighted_edges_from(self, edges):
+        for u, v, w in edges:
+            self.add_edge(u, v, weight=w)
+
     def number_of_nodes(self):
         return len(self.nodes)
 
@@ -68,7 +96,10 @@ class Graph:
 
 
 nx_mod.Graph = Graph
-sys.modules["networkx"] = nx_mod
+try:
+    import networkx  # noqa: F401
+except ImportError:
+    sys.modules["networkx"] = nx_mod
 
 # Stub weaviate client used by Pipeline
 weaviate_mod = types.ModuleType("weaviate")
@@ -102,26 +133,15 @@ sys.modules["sklearn.linear_model"] = linear_mod
 sys.modules["sklearn.feature_extraction"] = fe_mod
 sys.modules["sklearn.feature_extraction.text"] = fe_text_mod
 
-from semantic_tags import pipeline as pipeline_mod
+from semantic_tags import clustering as clustering_mod
 from semantic_tags.pipeline import Pipeline
 
 
-class DummyEmbedder:
-    def embed(self, texts):
-        # return simple deterministic vectors without numpy
-        return [[float(i)] * 2 for i in range(len(texts))]
-
-
-def test_pipeline_run(tmp_path):
+def test_pipeline_run(tmp_path, make_pipeline):
     (tmp_path / "a.md").write_text("This recipe is great. I love to cook.")
     (tmp_path / "b.md").write_text("Anime is a popular genre of manga.")
 
-    pipeline = Pipeline()
-    pipeline.embedder = DummyEmbedder()
-    # Patch clustering functions to avoid heavy dependencies
-    pipeline_mod.choose_k = lambda embeddings, k_min=2, k_max=None: 2
-    pipeline_mod.cluster_embeddings = lambda embeddings, k: (list(range(len(embeddings))), None)
-    graph = pipeline.run(tmp_path)
+    graph = make_pipeline().run(tmp_path)
 
     assert graph.graph.number_of_nodes() > 0
     assert graph.graph.number_of_edges() > 0
@@ -134,6 +154,110 @@ def test_pipeline_run(tmp_path):
     assert summary["cluster_count"] == 2
 
 
+def _requires_real(*names):
+    import pytest
+
+    for name in names:
+        if not hasattr(sys.modules.get(name) or pytest.importorskip(name), "__version__"):
+            pytest.skip(f"{name} is not installed")
+
+
+def test_pipeline_incremental_run(tmp_path, make_pipeline):
+    _requires_real("numpy", "networkx")
+    from semantic_tags.graph import TagGraph
+
+    corpus = tmp_path / "corpus"
+    corpus.mkdir()
+    (corpus / "a.md").write_text("This recipe is great. I love to cook.")
+    (corpus / "b.md").write_text("Anime is a popular genre of manga.")
+    (corpus / "c.md").write_text("An anime recipe.")
+
+    pipeline = make_pipeline()
+    embedded = pipeline.embedder.embedded
+    state = tmp_path / "state"
+    pipeline.run(corpus, state_dir=state, summary_path=tmp_path / "s.json")
+
+    (corpus / "b.md").write_text("Manga and anime recipe ideas.")
+    (corpus / "c.md").unlink()
+    (corpus / "d.md").write_text("Another recipe.")
+    embedded.clear()
+    graph = pipeline.run(corpus, state_dir=state, summary_path=tmp_path / "s.json")
+
+    assert sorted(embedded) == ["Another recipe.", "Manga and anime recipe ideas."]
+    assert graph.summary()["tag_counts"] == {"recipe": 3, "anime": 1}
+    assert graph.graph.get_edge_data("tag_recipe", "tag_anime")["weight"] == 1
+    sources = {d["source"] for _, d in graph.graph.nodes(data=True) if d.get("type") == "nugget"}
+    assert sources == {"a.md", "b.md", "d.md"}
+
+    rebuilt = TagGraph()
+    rebuilt.graph = graph.graph.copy()
+    rebuilt.co_occurrence_edges()
+
+    def weights(g):
+        return {tuple(sorted((u, v))): d.get("weight") for u, v, d in g.edges(data=True)}
+
+    assert weights(rebuilt.graph) == weights(graph.graph)
+
+    import json
+
+    meta = json.loads((tmp_path / "s.json").read_text())["metadata"]["incremental"]
+    assert meta == {"added": 1, "changed": 1, "deleted": 1, "unchanged": 1, "resumed": True}
+
+    from semantic_tags.ann_index import IVFFlatIndex
+
+    index = IVFFlatIndex.load(tmp_path / "s.ann")
+    assert sorted(index.ids.tolist()) == sorted(n.id for n in graph.iter_nuggets())
+
+
+def test_incremental_run_indexes_every_nugget_for_a_new_summary_path(tmp_path, make_pipeline):
+    _requires_real("numpy", "networkx")
+    import numpy as np
+
+    from semantic_tags.ann_index import IVFFlatIndex
+
+    corpus = tmp_path / "corpus"
+    corpus.mkdir()
+    (corpus / "a.md").write_text("This recipe is great.")
+    (corpus / "b.md").write_text("Anime is a popular genre.")
+    pipeline = make_pipeline()
+    pipeline.run(corpus, state_dir=tmp_path / "state")
+
+    (corpus / "c.md").write_text("Another recipe.")
+    graph = make_pipeline().run(
+        corpus, state_dir=tmp_path / "state", summary_path=tmp_path / "s.json"
+    )
+
+    index = IVFFlatIndex.load(tmp_path / "s.ann")
+    assert sorted(index.ids.tolist()) == sorted(n.id for n in graph.iter_nuggets())
+    ids, _ = index.search(np.asarray([[float(len("Anime is a popular genre.")), 1.0]]), 1)
+    assert graph.get_nugget(int(ids[0, 0])).text == "Anime is a popular genre."
+
+
+def test_embed_nuggets_batches_by_modality():
+    from semantic_tags.vectorization import embed_nuggets
+
+    calls = []
+
+    class Recorder:
+        def __init__(self, offset, batch_size=2):
+            self.offset = offset
+            self.batch_size = batch_size
+
+        def embed(self, items):
+            calls.append((self.offset, list(items)))
+            return [[self.offset + i] * 2 for i in range(len(items))]
+
+    nuggets = ["a", Path("x.png"), "b", Path("y.png"), Path("z.png"), "c"]
+    types_ = ["text", "image", "text", "image", "image", "text"]
+    out = embed_nuggets(nuggets, types_, Recorder(0), Recorder(100))
+
+    assert calls == [
+        (0, ["a", "b", "c"]),
+        (100, [Path("x.png"), Path("y.png"), Path("z.png")]),
+    ]
+    assert [row[0] for row in out] == [0, 100, 1, 101, 102, 2]
+
+
 def test_suggest_missing_tags_openai():
     from semantic_tags.graph import TagGraph
     from semantic_tags.rag import suggest_missing_tags
@@ -174,3 +298,336 @@ def test_train_tag_classifier():
 
     result = train_tag_classifier(tg)
     assert result is not None
+
+
+def test_service_ingests_incrementally_and_answers_queries(tmp_path, make_pipeline):
+    _requires_real("numpy", "networkx", "sklearn")
+    import json
+    import threading
+    import urllib.error
+    import urllib.request
+
+    from semantic_tags.server import TagServer, TagService
+
+    pipeline = make_pipeline(
+        vectorize=lambda t: [t.lower().count("recipe"), t.lower().count("anime"), 0.1]
+    )
+    embedded = pipeline.embedder.embedded
+    service = TagService(pipeline, tmp_path / "state", persist_interval=60)
+    server = TagServer(("127.0.0.1", 0), service)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+
+    def call(path, payload=None):
+        data = json.dumps(payload).encode() if payload is not None else None
+        with urllib.request.urlopen(urllib.request.Request(base + path, data=data)) as resp:
+            return json.loads(resp.read())
+
+    try:
+        docs = [
+            {"name": "a.md", "text": "This recipe is great. I love to cook."},
+            {"name": "b.md", "text": "Anime is a popular genre of manga."},
+        ]
+        job = call("/ingest", {"documents": docs, "wait": True})
+        assert job["status"] == "done", job
+        embedded.clear()
+        job = call("/ingest", {"documents": [{"name": "c.md", "text": "Another anime."}], "wait": True})
+        assert job["incremental"]["added"] == 1 and job["incremental"]["unchanged"] == 2
+        assert embedded == ["Another anime."]
+
+        results = call("/query", {"text": "anime", "k": 2})["results"]
+        assert {r["source"] for r in results} == {"b.md", "c.md"}
+        assert call("/summary")["tag_counts"]["anime"] == 2
+
+        queued = call("/ingest", {"documents": [{"name": "d.md", "text": "More recipe."}]})
+        assert service.wait(queued["id"], timeout=30)["status"] == "done"
+        assert call(f"/jobs/{queued['id']}")["status"] == "done"
+        # Persistence is debounced: nothing has been written to disk yet.
+        assert not (tmp_path / "state" / "graph.pkl").exists()
+
+        for path, payload in [
+            ("/query?q=anime&k=abc", None),
+            ("/query?q=anime&k=0", None),
+            ("/query", {"text": "anime", "k": "x"}),
+            ("/query", {"text": "anime", "n_probe": -1}),
+            ("/ingest", {"documents": "a.md"}),
+            ("/ingest", ["a.md"]),
+        ]:
+            with pytest.raises(urllib.error.HTTPError) as err:
+                call(path, payload)
+            assert err.value.code == 400
+            assert "error" in json.loads(err.value.read())
+    finally:
+        server.shutdown()
+        server.server_close()
+        service.close()
+
+    # A new service over the same state resumes without re-running the pipeline.
+    resumed = TagService(Pipeline(), tmp_path / "state")
+    assert resumed.summary()["nugget_count"] == 4
+
+
+def test_service_reclusters_as_the_corpus_grows(tmp_path, make_pipeline):
+    _requires_real("numpy", "networkx", "sklearn")
+    from semantic_tags.server import TagService
+
+    pipeline = make_pipeline(
+        vectorize=lambda t: [t.lower().count("recipe"), t.lower().count("anime"), 0.1]
+    )
+    service = TagService(pipeline, tmp_path / "state", persist_interval=0, max_jobs=2)
+    try:
+        first = service.submit([{"name": "a.md", "text": "This recipe is great."}])
+        assert service.wait(first, timeout=30)["status"] == "done"
+        assert service.summary()["cluster_count"] == 1
+
+        # Assigned to the only centroid, then re-fitted: the corpus doubled.
+        job = service.submit([{"name": "b.md", "text": "Anime is a popular genre."}])
+        job = service.wait(job, timeout=30)
+        assert job["reclustered"] and job["k"] == 2
+        assert service.summary()["cluster_count"] == 2
+        clusters = {r["source"]: r["cluster"] for r in service.query("anime", k=2)}
+        assert clusters["a.md"] != clusters["b.md"]
+        # Later nuggets are assigned to the re-fitted clusters.
+        job = service.submit([{"name": "c.md", "text": "More anime."}])
+        assert "reclustered" not in service.wait(job, timeout=30)
+        clusters = {r["source"]: r["cluster"] for r in service.query("anime", k=3)}
+        assert clusters["c.md"] == clusters["b.md"]
+
+        # An explicit job re-fits as well, and old finished jobs expire.
+        job = service.recluster()
+        assert service.wait(job, timeout=30)["status"] == "done"
+        assert first not in service.jobs and len(service.jobs) == 2
+    finally:
+        service.close()
+
+    resumed = make_pipeline()
+    assert resumed.resume(tmp_path / "state").summary()["cluster_count"] == 2
+
+
+def test_models_load_lazily_and_are_shared(monkeypatch):
+    from semantic_tags import vectorization
+
+    loaded = []
+
+    def fake_model(name, **kwargs):
+        loaded.append(name)
+        return types.SimpleNamespace(device=kwargs.get("device") or "cpu", model_name=name)
+
+    monkeypatch.setitem(sys.modules, "sentence_transformers", st_module)
+    monkeypatch.setattr(st_module, "SentenceTransformer", fake_model)
+    vectorization.clear_models()
+    try:
+        first, second = Pipeline(), Pipeline()
+        assert loaded == []
+        assert first.embedder.model is second.embedder.model
+        assert loaded == [first.model_name]
+        assert not first.vision_embedder.loaded
+        assert list(first.model_load_times()) == [first.model_name]
+        assert first.device == "cpu"
+    finally:
+        vectorization.clear_models()
+
+
+def test_onnx_backend_exports_once(monkeypatch, tmp_path):
+    from semantic_tags import vectorization
+
+    calls = []
+
+    class FakeModel:
+        def __init__(self, name, **kwargs):
+            calls.append(("load", name, kwargs.get("backend"), kwargs.get("model_kwargs")))
+
+        def save(self, path):
+            calls.append(("save", path))
+            (Path(path) / "onnx").mkdir(parents=True, exist_ok=True)
+            (Path(path) / "onnx" / "model.onnx").write_bytes(b"onnx")
+
+    def fake_quantize(model, config, path):
+        calls.append(("quantize", config))
+        (Path(path) / "onnx" / f"model_qint8_{config}.onnx").write_bytes(b"int8")
+
+    monkeypatch.setitem(sys.modules, "sentence_transformers", st_module)
+    monkeypatch.setattr(st_module, "SentenceTransformer", FakeModel, raising=False)
+    monkeypatch.setattr(st_module, "export_dynamic_quantized_onnx_model", fake_quantize, raising=False)
+    vectorization.clear_models()
+    try:
+        pipe = Pipeline(model_dir=tmp_path, embed_backend="onnx", quantize=True)
+        pipe.embedder.model
+        kinds = [c[0] for c in calls]
+        assert kinds.count("save") == 1 and kinds.count("quantize") == 1
+        file_name = f"onnx/model_qint8_{vectorization.QUANTIZATION_CONFIG}.onnx"
+        assert calls[-1][2] == "onnx" and calls[-1][3] == {"file_name": file_name}
+        assert pipe.embedder.cache_name.endswith("@onnx-int8")
+
+        # A fresh process would find the cached export and skip both steps.
+        vectorization.clear_models()
+        calls.clear()
+        Pipeline(model_dir=tmp_path, embed_backend="onnx", quantize=True).embedder.model
+        assert [c[0] for c in calls] == ["load"]
+        with pytest.raises(ValueError):
+            vectorization.load_model("m", quantize=True)
+    finally:
+        vectorization.clear_models()
+
+
+def test_duplicate_nuggets_share_one_encode(tmp_path, make_pipeline, fake_clustering):
+    _requires_real("numpy", "networkx")
+    (tmp_path / "a.md").write_text("Thanks for the recipe!")
+    (tmp_path / "b.md").write_text("thanks  for the recipe!")
+    (tmp_path / "c.md").write_text("Anime is a popular genre of manga.")
+
+    pipeline = make_pipeline()
+    graph = pipeline.run(tmp_path)
+
+    assert len(pipeline.embedder.embedded) == 2
+    [rows] = fake_clustering.inputs
+    assert rows[0] == rows[1]
+    sources = sorted(str(n.source) for n in graph.iter_nuggets())
+    assert sources == ["a.md", "b.md", "c.md"]
+    assert pipeline.last_metadata["embedding"]["dedupe"]["saved_encodes"] == 1
+
+
+def test_undecodable_images_are_dropped(tmp_path, make_pipeline, fake_clustering):
+    _requires_real("numpy", "networkx")
+    import numpy as np
+
+    (tmp_path / "a.md").write_text("This recipe is great.")
+    (tmp_path / "b.md").write_text("Anime is a popular genre of manga.")
+    (tmp_path / "ok.png").write_bytes(b"png")
+    (tmp_path / "broken.png").write_bytes(b"png")
+
+    class FakeVision:
+        model_name = "clip"
+        stats = {"decoded": 1, "failed": 1, "duplicates": 0}
+
+        def embed(self, images):
+            return np.array([[np.nan] * 2 if p.name == "broken.png" else [9.0, 9.0] for p in images])
+
+    pipeline = make_pipeline()
+    pipeline.vision_embedder = FakeVision()
+    graph = pipeline.run(tmp_path)
+
+    assert len(fake_clustering.inputs[0]) == 3
+    assert sorted(str(n.source) for n in graph.iter_nuggets()) == ["a.md", "b.md", "ok.png"]
+    assert pipeline.last_metadata["embedding"]["images"]["failed"] == 1
+
+
+def test_weaviate_upload_starts_early_and_failures_are_recorded(tmp_path, make_pipeline):
+    _requires_real("numpy", "networkx")
+    import json
+    from concurrent.futures import Future
+
+    corpus = tmp_path / "corpus"
+    corpus.mkdir()
+    (corpus / "a.md").write_text("This recipe is great.")
+    (corpus / "b.md").write_text("Anime is a popular genre of manga.")
+    state = tmp_path / "state"
+
+    class FailingStore:
+        url = "http://weaviate:8080"
+
+        def add_nuggets(self, nuggets, vectors, wait=True):
+            self.sent = sorted(str(n.source) for n in nuggets)
+            self.state_written = state.exists()
+            future = Future()
+            future.set_exception(ConnectionError("weaviate is down"))
+            return future
+
+    store = FailingStore()
+    make_pipeline().run(corpus, store=store, state_dir=state, summary_path=tmp_path / "s.json")
+
+    assert store.sent == ["a.md", "b.md"]
+    assert not store.state_written
+    assert (state / "graph.pkl").exists()
+    meta = json.loads((tmp_path / "s.json").read_text())["metadata"]
+    assert meta["weaviate_error"] == "ConnectionError: weaviate is down"
+
+
+def test_semantic_chunking_pools_sentence_vectors(tmp_path, make_pipeline, fake_clustering):
+    _requires_real("numpy", "networkx")
+    (tmp_path / "a.md").write_text(
+        "I love this pasta recipe with lots of garlic and fresh basil from the garden today. "
+        "The recipe needs slow simmered tomatoes and a generous splash of good olive oil. "
+        "Anime fans watched the new manga adaptation together on the big screen last night. "
+        "The anime studio animated every manga panel with care and bright vivid colours."
+    )
+    fake_clustering.labels = lambda n: [0] * n
+    pipeline = make_pipeline(
+        vectorize=lambda t: [t.lower().count("recipe"), t.lower().count("anime"), 0.0],
+        chunking="semantic",
+        dedupe="off",
+    )
+    graph = pipeline.run(tmp_path)
+
+    texts = sorted(n.text for n in graph.iter_nuggets())
+    assert len(texts) == 2
+    assert texts[0].startswith("Anime fans") and texts[1].startswith("I love")
+    # Only the four sentences were encoded, never the pooled nuggets.
+    assert len(pipeline.embedder.embedded) == 4
+
+
+def test_token_chunking_uses_model_limit(tmp_path, make_pipeline, fake_clustering):
+    _requires_real("numpy", "networkx")
+    (tmp_path / "a.md").write_text(" ".join(f"Sentence number {i} here." for i in range(10)))
+
+    fake_clustering.k = 1
+    fake_clustering.labels = lambda n: [0] * n
+    pipeline = make_pipeline(chunking="tokens")
+    pipeline.embedder.max_tokens = 16
+    calls = []
+
+    def count_tokens(texts):
+        calls.append(list(texts))
+        return [2 * len(t.split()) for t in texts]
+
+    pipeline.embedder.count_tokens = count_tokens
+    graph = pipeline.run(tmp_path)
+
+    # Eight model tokens per sentence: two sentences per 16-token nugget.
+    texts = [n.text for n in graph.iter_nuggets()]
+    assert len(texts) == 5
+    assert pipeline.last_metadata["embedding"]["max_tokens"] == 16
+    # Every sentence is tokenized once, up front, and never again.
+    assert len(calls) == 1 and len(calls[0]) == 10
+
+
+def test_infer_topics_with_topic_model(tmp_path, make_pipeline):
+    _requires_real("numpy", "networkx", "scipy")
+    (tmp_path / "a.md").write_text("The pasta recipe is great.")
+    (tmp_path / "b.md").write_text("The anime episode is great.")
+
+    graph = make_pipeline().run(tmp_path, infer_topics=True, topic_model="ctfidf")
+
+    tags = {str(n.source): n.tags for n in graph.iter_nuggets()}
+    assert tags["a.md"][-1] in {"pasta recipe", "recipe pasta"}
+    assert tags["b.md"][-1] in {"anime episode", "episode anime"}
+
+
+@pytest.mark.parametrize("backend", ["networkx", "compact"])
+def test_noise_points_get_no_cluster(tmp_path, monkeypatch, make_pipeline, backend):
+    _requires_real("numpy", "networkx", "scipy")
+    import numpy as np
+
+    (tmp_path / "a.md").write_text("The pasta recipe is great.")
+    (tmp_path / "b.md").write_text("The anime episode is great.")
+    (tmp_path / "c.md").write_text("Weather today.")
+
+    monkeypatch.setitem(
+        clustering_mod.CLUSTERERS,
+        "hdbscan",
+        lambda embeddings: (np.array([0, 1, -1]), {"noise": 1}),
+    )
+    pipeline = make_pipeline(clusterer="hdbscan", graph_backend=backend)
+    state = tmp_path / "state"
+    graph = pipeline.run(tmp_path, infer_topics=True, state_dir=state)
+
+    tags = {str(n.source): n.tags for n in graph.iter_nuggets()}
+    assert tags["c.md"] == []
+    assert pipeline.last_metadata["k"] == 2
+    assert np.load(state / "clusters.npz")["ids"].tolist() == [0, 1]
+    summary = graph.summary()
+    assert summary["cluster_count"] == 2 and summary["noise_count"] == 1
+    assert "-1" not in summary["clusters"]
+    per_source = graph.conversation_summary()["c.md"]
+    assert per_source == {"nugget_count": 1, "topics": {}, "noise_count": 1}
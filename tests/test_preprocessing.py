@@ -0,0 +1,30 @@
+from pathlib import Path
+
+from semantic_tags.preprocessing import chunk_text, iter_chunked
+
+
+def _items():
+    items = []
+    for i in range(25):
+        text = f"Alice: I love file {i}. It is great.\nBob: I hate waiting {i}."
+        items.append((text, Path(f"f{i}.md"), False))
+        if i % 7 == 0:
+            items.append((Path(f"img{i}.png"), Path(f"img{i}.png"), True))
+    return items
+
+
+def test_chunk_text_records():
+    records = chunk_text("Alice: I love it.\nBob: I hate it.")
+    assert records == [
+        ("I love it.", "Alice", "positive"),
+        ("I hate it.", "Bob", "negative"),
+    ]
+
+
+def test_iter_chunked_parallel_matches_serial():
+    items = _items()
+    serial = list(iter_chunked(items))
+    parallel = list(iter_chunked(iter(items), workers=2, group_files=3))
+    assert parallel == serial
+    assert [rel for _, rel, _, _ in parallel] == [rel for _, rel, _ in items]
+    assert all(records is None for _, _, is_image, records in parallel if is_image)
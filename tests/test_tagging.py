@@ -0,0 +1,40 @@
+import re
+
+from semantic_tags.tagging import HeuristicTagger, LiteralMatcher
+
+
+def _naive(patterns, texts):
+    compiled = {k: [re.compile(p, re.I) for p in v] for k, v in patterns.items()}
+    return [[k for k, rs in compiled.items() if any(r.search(t) for r in rs)] for t in texts]
+
+
+def test_tagger_matches_per_label_regexes():
+    labels = ["new", "new york", "york", "ice cream", "c++", "#tag", "Recipe"]
+    texts = [
+        "I moved to New York.",
+        "newyork is one word",
+        "ice creamery and c++ code",
+        "c++, #tag and a#tag",
+        "recipe: ice cream",
+        "",
+    ]
+    tagger = HeuristicTagger(labels=labels)
+    patterns = {l: [rf"\b{re.escape(l)}\b"] for l in labels}
+    assert tagger.tag(texts) == _naive(patterns, texts)
+    assert tagger.tag(["New York"]) == [["new", "new york", "york"]]
+
+
+def test_tagger_keeps_arbitrary_regexes():
+    patterns = {"recipe": [r"\brecipe\b", r"cook(ing)?s?"], "anime": [r"\banime\b"]}
+    texts = ["Cooking anime", "a recipe", "nothing here"]
+    assert HeuristicTagger(patterns).tag(texts) == _naive(patterns, texts)
+
+
+def test_literal_matcher_scans_in_chunks():
+    matcher = LiteralMatcher(["alpha", "beta"], chunk_chars=8)
+    assert matcher.find(["alpha", "x", "beta alpha", "alphabet"]) == [
+        {"alpha"},
+        set(),
+        {"alpha", "beta"},
+        set(),
+    ]
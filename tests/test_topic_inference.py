@@ -7,3 +7,42 @@ def test_infer_cluster_tags():
     topics = infer_cluster_tags(nuggets, labels)
     assert 0 in topics and 1 in topics
     assert isinstance(topics[0], str)
+
+
+def test_ctfidf_prefers_distinctive_terms():
+    import pytest
+
+    np = pytest.importorskip("numpy")
+    pytest.importorskip("scipy.sparse")
+    if not hasattr(np, "searchsorted"):
+        pytest.skip("requires real numpy")
+    nuggets = [
+        "The pasta recipe and the sauce recipe",
+        "A recipe for pasta with the garlic",
+        "The anime and the manga series",
+        "The new anime episode and the manga",
+        "The",
+    ]
+    labels = [0, 0, 1, 1, -1]
+    topics = infer_cluster_tags(nuggets, labels, method="ctfidf")
+    assert set(topics) == {0, 1}
+    assert set(topics[0].split()) == {"recipe", "pasta"}
+    assert set(topics[1].split()) == {"anime", "manga"}
+    # The raw frequency heuristic is still available.
+    assert "the" in infer_cluster_tags(nuggets, labels, method="frequency")[0].split()
+    with pytest.raises(ValueError):
+        infer_cluster_tags(nuggets, labels, method="lda")
+
+
+def test_topic_model_aliases_warn():
+    import pytest
+
+    from semantic_tags.topic_inference import resolve_topic_method
+
+    with pytest.warns(FutureWarning, match="deprecated"):
+        assert resolve_topic_method("fastopic") == "ctfidf"
+    with pytest.warns(UserWarning, match="does not run BERTopic"):
+        assert resolve_topic_method("bertopic") == "ctfidf"
+    assert resolve_topic_method(None) == "ctfidf"
+    with pytest.raises(ValueError, match="Unknown topic model"):
+        resolve_topic_method("lda")
@@ -0,0 +1,81 @@
+import sys
+import types
+
+import pytest
+
+np = pytest.importorskip("numpy")
+if not hasattr(np, "concatenate"):
+    pytest.skip("requires real numpy", allow_module_level=True)
+
+from semantic_tags import vectorization
+from semantic_tags.vectorization import Embedder, token_budget_batches
+
+
+class WordTokenizer:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts, add_special_tokens=True, **kwargs):
+        self.calls.append(list(texts))
+        extra = 2 if add_special_tokens else 0
+        return {"input_ids": [[0] * (len(t.split()) + extra) for t in texts]}
+
+    def num_special_tokens_to_add(self, pair=False):
+        return 2
+
+
+class TokenModel:
+    max_seq_length = 16
+
+    def __init__(self, name, **kwargs):
+        self.batches = []
+        self.tokenizer = WordTokenizer()
+
+    def encode(self, texts, batch_size=32, show_progress_bar=False):
+        self.batches.append(len(texts))
+        return np.array([[len(t.split()), 1.0] for t in texts], dtype=np.float32)
+
+
+def test_token_budget_batches():
+    lengths = [3, 50, 4, 50, 3, 10]
+    batches = token_budget_batches(lengths, token_budget=100, max_batch=4)
+    assert sorted(i for b in batches for i in b) == list(range(len(lengths)))
+    assert batches[0] == [1, 3]
+    assert all(len(b) * max(lengths[i] for i in b) <= 100 for b in batches)
+    assert token_budget_batches([500], token_budget=100) == [[0]]
+
+
+def test_length_batching_restores_order(monkeypatch):
+    module = types.ModuleType("sentence_transformers")
+    module.SentenceTransformer = TokenModel
+    monkeypatch.setitem(sys.modules, "sentence_transformers", module)
+    vectorization.clear_models()
+    try:
+        texts = ["w " * n for n in (1, 30, 2, 1, 12, 3)]
+        embedder = Embedder("m", batching="length", token_budget=32)
+        assert embedder.token_lengths(texts) == [3, 16, 4, 3, 14, 5]
+        vecs = embedder.embed(texts)
+        assert vecs[:, 0].tolist() == [len(t.split()) for t in texts]
+        # Two long texts alone, then the four short ones together.
+        assert embedder.model.batches == [2, 4]
+    finally:
+        vectorization.clear_models()
+
+
+def test_count_tokens_is_batched_and_cached(monkeypatch):
+    module = types.ModuleType("sentence_transformers")
+    module.SentenceTransformer = TokenModel
+    monkeypatch.setitem(sys.modules, "sentence_transformers", module)
+    vectorization.clear_models()
+    try:
+        embedder = Embedder("m")
+        assert embedder.max_tokens == 14
+        assert embedder.count_tokens(["a b", "c", "a b"]) == [2, 1, 2]
+        assert embedder.count_tokens(["c", "d e f"]) == [1, 3]
+        assert embedder.model.tokenizer.calls == [["a b", "c"], ["d e f"]]
+        embedder.token_cache_size = 2
+        embedder.count_tokens(["g"])
+        # The oldest count is evicted first.
+        assert list(embedder._token_counts) == ["d e f", "g"]
+    finally:
+        vectorization.clear_models()